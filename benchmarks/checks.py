@@ -0,0 +1,103 @@
+"""Behaviour the timings depend on, checked before the suite measures anything.
+
+A regression here wouldn't necessarily make a case slower on its own, but it
+would make the bot slower under load, which the cases don't exercise.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+
+
+def check_capped_command_waiters():
+    """A request waiting on a capped command mustn't hold a lane worker."""
+    from f1bot.command.command_protocol import CostClass
+    from f1bot.command.executor import CommandExecutor
+    from f1bot.command.requester import ANONYMOUS
+
+    class Executor(CommandExecutor):
+        # Two light workers, with schedule capped at one of them.
+        def _limits_for(self, name):
+            return 5.0, 1 if name == 'schedule' else 2, CostClass.LIGHT
+
+    unblock = threading.Event()
+
+    def blocked(_args):
+        unblock.wait(5.0)
+
+    def fast(_args):
+        return 'fast'
+
+    async def check():
+        executor = Executor(max_workers=2)
+        try:
+            capped = [
+                asyncio.ensure_future(executor._prepare(
+                    blocked, ['schedule'], ANONYMOUS))
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(executor._prepare(
+                    fast, ['standings'], ANONYMOUS), 1.0)
+            except asyncio.TimeoutError:
+                result = None
+            seconds = time.perf_counter() - start
+            unblock.set()
+            await asyncio.gather(*capped)
+        finally:
+            unblock.set()
+            executor.shutdown()
+        if result != 'fast' or seconds > 0.2:
+            raise RuntimeError(
+                f'A fast command waited {seconds:.2f}s behind a capped one')
+
+    asyncio.run(check())
+
+
+def check_slow_query_timing():
+    """A failed statement mustn't change how long the next one is logged as."""
+    import sqlalchemy as sql  # type: ignore
+    from f1bot.mysql import profiling
+
+    logged: list[str] = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            logged.append(record.getMessage())
+
+    engine = sql.create_engine('sqlite://')
+    profiling.profile_queries(engine, threshold_seconds=0.0)
+    handler = Handler()
+    level = profiling.LOGGER.level
+    profiling.LOGGER.addHandler(handler)
+    profiling.LOGGER.setLevel(logging.INFO)
+    try:
+        with engine.connect() as conn:
+            try:
+                conn.exec_driver_sql('SELECT * FROM no_such_table')
+            except sql.exc.OperationalError:
+                pass
+            time.sleep(0.2)
+            start = time.perf_counter()
+            conn.exec_driver_sql(
+                'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL '
+                'SELECT x + 1 FROM c WHERE x < 100000) SELECT count(*) FROM c')
+            seconds = time.perf_counter() - start
+    finally:
+        profiling.LOGGER.removeHandler(handler)
+        profiling.LOGGER.setLevel(level)
+        engine.dispose()
+
+    logged_ms = float(re.match(r'([\d.]+) ms', logged[-1]).group(1))
+    if logged_ms > seconds * 1000 + 1:
+        raise RuntimeError(
+            f'A {seconds * 1000:.1f} ms statement was logged as taking '
+            f'{logged_ms:.1f} ms')
+
+
+def run_all():
+    check_capped_command_waiters()
+    check_slow_query_timing()
@@ -0,0 +1,102 @@
+"""Compares building DataFrames row by row against the columnar data classes.
+
+Run with: python -m benchmarks.dataframes
+"""
+from f1bot.data.schedule import Row as ScheduleRow, Schedule
+from f1bot.data.standings import Row as StandingsRow, Standings
+
+import datetime as dt
+import timeit
+
+import pandas
+
+# A modern season, and roughly every driver who has ever started a race.
+SCHEDULE_ROWS = 24
+STANDINGS_ROWS = 860
+
+REPEATS = 5
+NUMBER = 50
+
+
+def make_schedule(num_rows: int) -> Schedule:
+    start = dt.datetime(2022, 3, 20, 15)
+    race = [start + dt.timedelta(weeks=i) for i in range(num_rows)]
+    return Schedule(
+        race_names=[f'Grand Prix {i}' for i in range(num_rows)],
+        round_nums=list(range(1, num_rows + 1)),
+        circuits=[f'Circuit {i}' for i in range(num_rows)],
+        locations=[f'Location {i}' for i in range(num_rows)],
+        race=race,
+        sprint=[None] * num_rows,
+        qualifying=[t - dt.timedelta(days=1) for t in race],
+        fp3=[t - dt.timedelta(days=1, hours=3) for t in race],
+        fp2=[t - dt.timedelta(days=2) for t in race],
+        fp1=[t - dt.timedelta(days=2, hours=3) for t in race],
+    )
+
+
+def make_standings(num_rows: int) -> Standings:
+    return Standings(
+        names=[f'Driver {i}' for i in range(num_rows)],
+        positions=list(range(1, num_rows + 1)),
+        points=[float(num_rows - i) for i in range(num_rows)],
+    )
+
+
+def schedule_by_row(schedule: Schedule) -> pandas.DataFrame:
+    """The previous implementation: one Series per row."""
+    def to_series(r: ScheduleRow) -> pandas.Series:
+        return pandas.Series(data={
+            "Name": r.race_name,
+            "Round": r.round_num,
+            "Circuit": r.circuit,
+            "Location": r.location,
+            "Race": r.race,
+            "Sprint": r.sprint,
+            "Qualifying": r.qualifying,
+            "FP3": r.fp3,
+            "FP2": r.fp2,
+            "FP1": r.fp1,
+        })
+    return pandas.DataFrame(
+        columns=ScheduleRow.keys(),
+        data=(to_series(r) for r in schedule.rows))
+
+
+def standings_by_row(standings: Standings) -> pandas.DataFrame:
+    """The previous implementation: one Series per row."""
+    def to_series(r: StandingsRow) -> pandas.Series:
+        return pandas.Series(data={
+            "Name": r.name,
+            "Position": r.position,
+            "Points": r.points,
+        })
+    return pandas.DataFrame(
+        columns=StandingsRow.keys(),
+        data=(to_series(r) for r in standings.rows))
+
+
+def best_ms(func) -> float:
+    times = timeit.repeat(func, repeat=REPEATS, number=NUMBER)
+    return min(times) / NUMBER * 1000
+
+
+def main():
+    schedule = make_schedule(SCHEDULE_ROWS)
+    standings = make_standings(STANDINGS_ROWS)
+
+    cases = [
+        (f'schedule ({SCHEDULE_ROWS} rows)',
+         lambda: schedule_by_row(schedule), schedule.to_dataframe),
+        (f'standings ({STANDINGS_ROWS} rows)',
+         lambda: standings_by_row(standings), standings.to_dataframe),
+    ]
+    print(f'{"case":<24}{"by row (ms)":>14}{"columnar (ms)":>16}{"speedup":>10}')
+    for name, by_row, columnar in cases:
+        row_ms = best_ms(by_row)
+        col_ms = best_ms(columnar)
+        print(f'{name:<24}{row_ms:>14.3f}{col_ms:>16.3f}{row_ms / col_ms:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
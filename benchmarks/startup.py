@@ -0,0 +1,72 @@
+"""Checks that the CLI starts within its import-time budget.
+
+Runs `cli.py help` in fresh interpreters, reports how long the imports took,
+and exits with an error if they're over budget or if any module that should
+only load with a command's implementation was imported.
+
+Run with: python -m benchmarks.startup
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cli.py')
+
+# Total import time allowed for `cli.py help`, in milliseconds.
+BUDGET_MS = float(os.getenv('F1_BOT_STARTUP_BUDGET_MS', '250'))
+
+# Only the commands that need these should import them.
+HEAVY_MODULES = ['pandas', 'numpy', 'fastf1', 'sqlalchemy', 'thefuzz']
+
+RUNS = 5
+
+# `import time: self [us] | cumulative | imported package`
+_IMPORT_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)')
+
+
+def measure(args: list[str]) -> tuple[float, set[str]]:
+    """Returns the import time in ms and the top level modules imported."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', CLI, *args],
+        capture_output=True, text=True, check=True)
+    total_us = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, indent, name = match.groups()
+        modules.add(name.split('.')[0])
+        # Only count top level imports, nested ones are in their cumulative time.
+        if not indent:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def main():
+    times = []
+    modules: set[str] = set()
+    for _ in range(RUNS):
+        ms, imported = measure(['help'])
+        times.append(ms)
+        modules |= imported
+
+    median_ms = statistics.median(times)
+    print(f'cli.py help imports: {median_ms:.1f} ms (budget {BUDGET_MS:.0f} ms)')
+
+    failures = []
+    if median_ms > BUDGET_MS:
+        failures.append(f'Over budget by {median_ms - BUDGET_MS:.1f} ms.')
+    heavy = sorted(m for m in HEAVY_MODULES if m in modules)
+    if heavy:
+        failures.append(f'Imported heavy modules: {", ".join(heavy)}.')
+
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
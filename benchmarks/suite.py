@@ -0,0 +1,297 @@
+"""Benchmarks commands, ergast queries and conversions on synthetic data.
+
+Each scale gets its own synthetic SQLite database (see benchmarks.synthetic),
+generated on first use and reused afterwards. Every case is run end to end
+with the query cache cleared first, and reports p50/p95 latency and the peak
+memory traced while running it once.
+
+Run with:
+    python -m benchmarks.suite --scales 1 10 100 --output bench.json
+    python -m benchmarks.suite --scales 1 --compare bench.json
+"""
+from benchmarks import checks, synthetic
+
+import argparse
+import datetime as dt
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from typing import Any, Callable, Optional
+
+DATA_DIR = os.getenv(
+    'F1_BOT_BENCH_DATA', os.path.join(os.path.dirname(__file__), '.data'))
+
+ITERATIONS = 30
+
+# Tables whose sizes are recorded alongside the results.
+COUNTED_TABLES = [
+    'races', 'drivers', 'results', 'qualifying', 'driverStandings',
+    'constructorStandings',
+]
+
+# A case is timed as a whole, so it should do one request's worth of work.
+Case = tuple[str, Callable[[], Any]]
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    index = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def _measure(func: Callable[[], Any], iterations: int, reset: Callable[[], None]
+) -> dict[str, float]:
+    # One untimed run so imports and the resolver's indexes are loaded.
+    reset()
+    func()
+
+    times = []
+    for _ in range(iterations):
+        reset()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+
+    reset()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times.sort()
+    return {
+        'p50_ms': round(statistics.median(times), 3),
+        'p95_ms': round(_percentile(times, 95), 3),
+        'mean_ms': round(statistics.fmean(times), 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _cases() -> tuple[list[Case], list[str]]:
+    """Builds the cases. Must run in a process configured for the dataset."""
+    import f1bot
+    import f1bot.commands
+    from f1bot import command as cmd
+    from f1bot.command.command_registry import REGISTRY
+    from f1bot.lib import render
+    from f1bot.mysql import ergast, resolver
+
+    f1bot.init()
+
+    # The current season is usually incomplete, so use the last full one.
+    year = dt.date.today().year - 1
+    schedule = ergast.get_schedule(year)
+    race_name = schedule.race_names[len(schedule.race_names) // 2]
+    race_id = ergast.resolve_fuzzy_race_query(year, race_name)
+    assert race_id is not None
+
+    # Replies naming a weekend that doesn't resolve mustn't be shared between
+    # spellings, see SessionResults.normalize.
+    unresolved = [
+        cmd.cache_key(['results', f'{year - 1},{year}', weekend, 'r'])
+        for weekend in ('zzqx', 'qqzx')
+    ]
+    if unresolved[0] == unresolved[1] and unresolved[0] is not None and any(
+            race_id is None for _, race_id in unresolved[0][1][0]):
+        raise RuntimeError(f'Cache keys collide: {unresolved[0]}')
+
+    def run(argv: list[str]) -> Callable[[], Any]:
+        def run_command():
+            result = cmd.run_command(argv)
+            if result.is_error():
+                raise RuntimeError(f'{argv} failed: {result.value}')
+            return result
+        return run_command
+
+    command_args: dict[str, list[list[str]]] = {
+        'schedule': [
+            ['schedule', str(year)],
+            ['schedule', f'{year - 4}-{year}'],
+        ],
+        'standings': [
+            ['standings', 'wdc', str(year)],
+            ['standings', 'wcc', str(year)],
+            ['standings', 'wdc', f'{year - 9}-{year}'],
+        ],
+        'results': [
+            ['results', str(year), race_name, 'r'],
+            ['results', str(year), race_name, 'q'],
+            ['results', f'{year - 2},{year - 1},{year}', race_name, 'r'],
+        ],
+        'upcoming': [['upcoming']],
+        'career': [
+            ['career', 'driver', ergast.get_driver_standings(year).names[0]],
+            ['career', 'constructor',
+             ergast.get_constructor_standings(year).names[0], '--seasons'],
+        ],
+    }
+
+    cases: list[Case] = []
+    skipped = []
+    for entry in REGISTRY.all():
+        if entry.manifest.name not in command_args:
+            # e.g. teammate_delta, which needs fastf1 session data.
+            skipped.append(entry.manifest.name)
+            continue
+        for argv in command_args[entry.manifest.name]:
+            cases.append((f'command: {" ".join(argv)}', run(argv)))
+
+    race_df = ergast.get_race_session(race_id)
+    standings_df = ergast.get_driver_standings(year).to_dataframe()
+    cases += [
+        ('query: get_schedule', lambda: ergast.get_schedule(year)),
+        ('query: get_driver_standings',
+         lambda: ergast.get_driver_standings(year)),
+        ('query: get_constructor_standings',
+         lambda: ergast.get_constructor_standings(year)),
+        ('query: get_race_session', lambda: ergast.get_race_session(race_id)),
+        ('query: get_qualifying_session',
+         lambda: ergast.get_qualifying_session(race_id)),
+        ('query: get_last_race_of_year',
+         lambda: ergast.get_last_race_of_year(year)),
+        ('query: resolve_fuzzy_race_query',
+         lambda: ergast.resolve_fuzzy_race_query(year, race_name)),
+        ('query: resolver index load', lambda: resolver.Resolver().circuit('x')),
+        ('convert: Schedule.to_dataframe', schedule.to_dataframe),
+        ('convert: Standings.to_dataframe',
+         ergast.get_driver_standings(year).to_dataframe),
+        ('convert: render.to_discord (standings)',
+         lambda: render.to_discord(standings_df)),
+        ('convert: render.to_discord (race)',
+         lambda: render.to_discord(race_df)),
+        ('convert: render.to_text (race)', lambda: render.to_text(race_df)),
+    ]
+    return cases, skipped
+
+
+def run_child(iterations: int):
+    """Runs every case and prints the results as JSON."""
+    from f1bot.mysql import cache
+
+    cases, skipped = _cases()
+    checks.run_all()
+    results = {
+        name: _measure(func, iterations, cache.RESULTS.clear)
+        for name, func in cases
+    }
+    json.dump({'cases': results, 'skipped': skipped}, sys.stdout)
+
+
+def _count_rows(path: str) -> dict[str, int]:
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in COUNTED_TABLES
+        }
+    finally:
+        conn.close()
+
+
+def run_scale(scale: int, iterations: int, regenerate: bool) -> dict[str, Any]:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'ergast-{scale}x.db')
+    if regenerate or not os.path.exists(path):
+        print(f'Generating {path}...', file=sys.stderr)
+        synthetic.generate(path, scale=scale)
+
+    # The database engine is configured at import time, so each dataset is
+    # benchmarked in a fresh interpreter.
+    env = dict(
+        os.environ,
+        F1_BOT_ERGAST_BACKEND='sqlite',
+        F1_BOT_ERGAST_SQLITE_PATH=path,
+        F1_BOT_ERGAST_GENERATION=f'{path}.generation')
+    proc = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.suite',
+         '--child', '--iterations', str(iterations)],
+        env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'Benchmarking scale {scale} failed:\n{proc.stderr}')
+    result = json.loads(proc.stdout)
+    result['rows'] = _count_rows(path)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict[str, Any], baseline: Optional[dict[str, Any]]):
+    for scale, result in report['scales'].items():
+        print(f'\nScale {scale}x: {result["rows"]}')
+        header = f'{"case":<44}{"p50 ms":>10}{"p95 ms":>10}{"peak KiB":>11}'
+        if baseline is not None:
+            header += f'{"vs base":>10}'
+        print(header)
+        base_cases = (
+            baseline['scales'].get(scale, {}).get('cases', {})
+            if baseline is not None else {})
+        for name, stats in result['cases'].items():
+            line = (f'{name:<44}{stats["p50_ms"]:>10.3f}{stats["p95_ms"]:>10.3f}'
+                    f'{stats["peak_kib"]:>11.1f}')
+            if baseline is not None:
+                base = base_cases.get(name)
+                line += (f'{stats["p50_ms"] / base["p50_ms"]:>9.2f}x'
+                         if base and base['p50_ms'] else f'{"-":>10}')
+            print(line)
+        if result['skipped']:
+            print(f'Skipped commands: {", ".join(result["skipped"])}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the bot against synthetic ergast data.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1])
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument(
+        '--regenerate', action='store_true',
+        help='Rebuild the synthetic databases even if they exist.')
+    parser.add_argument('--output', help='Where to save the results as JSON.')
+    parser.add_argument(
+        '--compare', help='Results JSON from an earlier run to compare with.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.iterations)
+        return
+
+    report = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'created': dt.datetime.now().isoformat(timespec='seconds'),
+        'iterations': args.iterations,
+        'scales': {
+            str(scale): run_scale(scale, args.iterations, args.regenerate)
+            for scale in args.scales
+        },
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
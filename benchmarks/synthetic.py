@@ -0,0 +1,310 @@
+"""Generates a synthetic ergast database for benchmarking.
+
+At scale 1 the dataset is roughly the size of the real one (every season
+since 1950, ~850 drivers, ~25k results). Larger scales multiply the number
+of rounds per season and the pools of drivers, constructors and circuits, so
+queries for a single season get proportionally bigger too.
+
+The tables are created from mysqldump style CREATE TABLE statements and go
+through the same post-load pass as init-ergast-db.py, so the indexes and
+derived tables match a real load.
+
+Run with: python -m benchmarks.synthetic --scale 10 --output ergast-10x.db
+"""
+from f1bot.mysql import dump, schema
+
+import argparse
+import datetime as dt
+import os
+import random
+import sqlite3
+
+from typing import Iterator
+
+FIRST_YEAR = 1950
+
+# Per season, at scale 1.
+ROUNDS = 15
+DRIVERS = 24
+CONSTRUCTORS = 11
+ENTRANTS = 22
+
+# Pool sizes at scale 1.
+DRIVER_POOL = 850
+CONSTRUCTOR_POOL = 210
+CIRCUIT_POOL = 77
+
+POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+
+STATUSES = [(1, 'Finished'), (3, 'Accident'), (5, 'Engine'), (11, '+1 Lap')]
+
+_CREATE_TABLES = [
+    """CREATE TABLE `circuits` (
+  `circuitId` int(11) NOT NULL AUTO_INCREMENT,
+  `circuitRef` varchar(255) NOT NULL DEFAULT '',
+  `name` varchar(255) NOT NULL DEFAULT '',
+  `location` varchar(255) DEFAULT NULL,
+  `country` varchar(255) DEFAULT NULL,
+  PRIMARY KEY (`circuitId`)
+);""",
+    """CREATE TABLE `races` (
+  `raceId` int(11) NOT NULL AUTO_INCREMENT,
+  `year` int(11) NOT NULL DEFAULT '0',
+  `round` int(11) NOT NULL DEFAULT '0',
+  `circuitId` int(11) NOT NULL DEFAULT '0',
+  `name` varchar(255) NOT NULL DEFAULT '',
+  `date` date NOT NULL DEFAULT '0000-00-00',
+  `time` time DEFAULT NULL,
+  `fp1_date` date DEFAULT NULL,
+  `fp1_time` time DEFAULT NULL,
+  `fp2_date` date DEFAULT NULL,
+  `fp2_time` time DEFAULT NULL,
+  `fp3_date` date DEFAULT NULL,
+  `fp3_time` time DEFAULT NULL,
+  `quali_date` date DEFAULT NULL,
+  `quali_time` time DEFAULT NULL,
+  `sprint_date` date DEFAULT NULL,
+  `sprint_time` time DEFAULT NULL,
+  PRIMARY KEY (`raceId`),
+  KEY `year` (`year`)
+);""",
+    """CREATE TABLE `drivers` (
+  `driverId` int(11) NOT NULL AUTO_INCREMENT,
+  `driverRef` varchar(255) NOT NULL DEFAULT '',
+  `number` int(11) DEFAULT NULL,
+  `code` varchar(3) DEFAULT NULL,
+  `forename` varchar(255) NOT NULL DEFAULT '',
+  `surname` varchar(255) NOT NULL DEFAULT '',
+  PRIMARY KEY (`driverId`)
+);""",
+    """CREATE TABLE `constructors` (
+  `constructorId` int(11) NOT NULL AUTO_INCREMENT,
+  `constructorRef` varchar(255) NOT NULL DEFAULT '',
+  `name` varchar(255) NOT NULL DEFAULT '',
+  PRIMARY KEY (`constructorId`)
+);""",
+    """CREATE TABLE `status` (
+  `statusId` int(11) NOT NULL AUTO_INCREMENT,
+  `status` varchar(255) NOT NULL DEFAULT '',
+  PRIMARY KEY (`statusId`)
+);""",
+    """CREATE TABLE `results` (
+  `resultId` int(11) NOT NULL AUTO_INCREMENT,
+  `raceId` int(11) NOT NULL DEFAULT '0',
+  `driverId` int(11) NOT NULL DEFAULT '0',
+  `constructorId` int(11) NOT NULL DEFAULT '0',
+  `number` int(11) DEFAULT NULL,
+  `grid` int(11) NOT NULL DEFAULT '0',
+  `position` int(11) DEFAULT NULL,
+  `positionText` varchar(255) NOT NULL DEFAULT '',
+  `points` float NOT NULL DEFAULT '0',
+  `time` varchar(255) DEFAULT NULL,
+  `statusId` int(11) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`resultId`),
+  KEY `raceId` (`raceId`)
+);""",
+    """CREATE TABLE `qualifying` (
+  `qualifyId` int(11) NOT NULL AUTO_INCREMENT,
+  `raceId` int(11) NOT NULL DEFAULT '0',
+  `driverId` int(11) NOT NULL DEFAULT '0',
+  `constructorId` int(11) NOT NULL DEFAULT '0',
+  `number` int(11) NOT NULL DEFAULT '0',
+  `position` int(11) DEFAULT NULL,
+  `q1` varchar(255) DEFAULT NULL,
+  `q2` varchar(255) DEFAULT NULL,
+  `q3` varchar(255) DEFAULT NULL,
+  PRIMARY KEY (`qualifyId`)
+);""",
+    """CREATE TABLE `driverStandings` (
+  `driverStandingsId` int(11) NOT NULL AUTO_INCREMENT,
+  `raceId` int(11) NOT NULL DEFAULT '0',
+  `driverId` int(11) NOT NULL DEFAULT '0',
+  `points` float NOT NULL DEFAULT '0',
+  `position` int(11) DEFAULT NULL,
+  `wins` int(11) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`driverStandingsId`)
+);""",
+    """CREATE TABLE `constructorStandings` (
+  `constructorStandingsId` int(11) NOT NULL AUTO_INCREMENT,
+  `raceId` int(11) NOT NULL DEFAULT '0',
+  `constructorId` int(11) NOT NULL DEFAULT '0',
+  `points` float NOT NULL DEFAULT '0',
+  `position` int(11) DEFAULT NULL,
+  `wins` int(11) NOT NULL DEFAULT '0',
+  PRIMARY KEY (`constructorStandingsId`)
+);""",
+]
+
+
+def _lap_time(rng: random.Random, base: float) -> str:
+    seconds = base + rng.random() * 3
+    return f'{int(seconds // 60)}:{seconds % 60:06.3f}'
+
+
+class _Generator:
+    def __init__(self, scale: int, last_year: int, seed: int):
+        self.scale = scale
+        self.last_year = last_year
+        self.rng = random.Random(seed)
+        self.today = dt.date.today()
+        self.ids = {
+            'races': 0, 'results': 0, 'qualifying': 0,
+            'driverStandings': 0, 'constructorStandings': 0,
+        }
+
+    def _next_id(self, table: str) -> int:
+        self.ids[table] += 1
+        return self.ids[table]
+
+    def circuits(self) -> Iterator[tuple]:
+        for i in range(1, CIRCUIT_POOL * self.scale + 1):
+            yield (i, f'circuit_{i}', f'Circuit {i} Raceway',
+                   f'Town {i}', f'Country {i % 40}')
+
+    def drivers(self) -> Iterator[tuple]:
+        for i in range(1, DRIVER_POOL * self.scale + 1):
+            yield (i, f'driver_{i}', i % 100, f'D{i % 100:02d}',
+                   f'Forename{i}', f'Surname{i}')
+
+    def constructors(self) -> Iterator[tuple]:
+        for i in range(1, CONSTRUCTOR_POOL * self.scale + 1):
+            yield (i, f'team_{i}', f'Team {i}')
+
+    def _season_pool(self, year: int, pool: int, size: int) -> list[int]:
+        # Walk through the pool over the decades so careers overlap a bit.
+        seasons = self.last_year - FIRST_YEAR + 1
+        start = (year - FIRST_YEAR) * max(pool - size, 1) // seasons
+        return [start + i + 1 for i in range(size)]
+
+    def load(self, conn: sqlite3.Connection):
+        for statement in _CREATE_TABLES:
+            table_schema = dump.parse_create_table(statement)
+            assert table_schema is not None
+            for create in table_schema.sqlite_create_statements():
+                conn.execute(create)
+
+        conn.executemany('INSERT INTO circuits VALUES (?, ?, ?, ?, ?)',
+                         self.circuits())
+        conn.executemany('INSERT INTO drivers VALUES (?, ?, ?, ?, ?, ?)',
+                         self.drivers())
+        conn.executemany('INSERT INTO constructors VALUES (?, ?, ?)',
+                         self.constructors())
+        conn.executemany('INSERT INTO status VALUES (?, ?)', STATUSES)
+
+        for year in range(FIRST_YEAR, self.last_year + 1):
+            self._load_season(conn, year)
+
+    def _load_season(self, conn: sqlite3.Connection, year: int):
+        rng = self.rng
+        rounds = ROUNDS * self.scale
+        drivers = self._season_pool(year, DRIVER_POOL * self.scale, DRIVERS)
+        constructors = self._season_pool(
+            year, CONSTRUCTOR_POOL * self.scale, CONSTRUCTORS)
+        circuits = rng.sample(
+            range(1, CIRCUIT_POOL * self.scale + 1),
+            min(rounds, CIRCUIT_POOL * self.scale))
+
+        races, results, qualifying = [], [], []
+        driver_standings, constructor_standings = [], []
+        driver_points = dict.fromkeys(drivers, 0.0)
+        constructor_points = dict.fromkeys(constructors, 0.0)
+
+        for round_num in range(1, rounds + 1):
+            race_id = self._next_id('races')
+            race_date = dt.date(year, 3, 1) + dt.timedelta(
+                days=(round_num - 1) * 270 // rounds)
+            circuit = circuits[(round_num - 1) % len(circuits)]
+            modern = year >= 2006
+            fp_date = (race_date - dt.timedelta(days=2)).isoformat()
+            quali_date = (race_date - dt.timedelta(days=1)).isoformat()
+            races.append((
+                race_id, year, round_num, circuit,
+                f'Grand Prix {circuit}', race_date.isoformat(),
+                '13:00:00' if modern else None,
+                fp_date if modern else None, '11:30:00' if modern else None,
+                fp_date if modern else None, '15:00:00' if modern else None,
+                quali_date if modern else None, '11:00:00' if modern else None,
+                quali_date if modern else None, '14:00:00' if modern else None,
+                None, None))
+
+            # Like the real database, races that haven't happened yet have no
+            # results.
+            if race_date >= self.today:
+                continue
+
+            entrants = rng.sample(drivers, ENTRANTS)
+            for position, driver in enumerate(entrants, start=1):
+                constructor = constructors[drivers.index(driver) // 2 % CONSTRUCTORS]
+                points = float(POINTS[position - 1]) if position <= 10 else 0.0
+                driver_points[driver] += points
+                constructor_points[constructor] += points
+                status = 1 if position <= 16 else rng.choice(STATUSES[1:])[0]
+                results.append((
+                    self._next_id('results'), race_id, driver, constructor,
+                    driver % 100, rng.randint(1, ENTRANTS),
+                    position if status == 1 else None,
+                    str(position) if status == 1 else 'R', points,
+                    '1:32:10.500' if position == 1 else f'+{position * 1.7:.3f}',
+                    status))
+                if modern:
+                    qualifying.append((
+                        self._next_id('qualifying'), race_id, driver,
+                        constructor, driver % 100, position,
+                        _lap_time(rng, 80),
+                        _lap_time(rng, 79) if position <= 15 else None,
+                        _lap_time(rng, 78) if position <= 10 else None))
+
+            ranked = sorted(driver_points.items(), key=lambda kv: -kv[1])
+            for position, (driver, points) in enumerate(ranked, start=1):
+                driver_standings.append((
+                    self._next_id('driverStandings'), race_id, driver, points,
+                    position, 0))
+            ranked = sorted(constructor_points.items(), key=lambda kv: -kv[1])
+            for position, (constructor, points) in enumerate(ranked, start=1):
+                constructor_standings.append((
+                    self._next_id('constructorStandings'), race_id,
+                    constructor, points, position, 0))
+
+        conn.executemany(
+            f'INSERT INTO races VALUES ({", ".join("?" * 17)})', races)
+        conn.executemany(
+            f'INSERT INTO results VALUES ({", ".join("?" * 11)})', results)
+        conn.executemany(
+            f'INSERT INTO qualifying VALUES ({", ".join("?" * 9)})', qualifying)
+        conn.executemany(
+            'INSERT INTO driverStandings VALUES (?, ?, ?, ?, ?, ?)',
+            driver_standings)
+        conn.executemany(
+            'INSERT INTO constructorStandings VALUES (?, ?, ?, ?, ?, ?)',
+            constructor_standings)
+
+
+def generate(path: str, scale: int = 1, seed: int = 0):
+    """Writes a synthetic ergast SQLite database to path."""
+    staging_path = f'{path}.staging'
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+
+    conn = sqlite3.connect(staging_path)
+    try:
+        _Generator(scale, dt.date.today().year, seed).load(conn)
+        for statement in schema.post_load_statements('sqlite'):
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(staging_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generates a synthetic ergast SQLite database.')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+    generate(args.output, scale=args.scale, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
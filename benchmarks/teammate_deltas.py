@@ -0,0 +1,85 @@
+"""Compares the per-driver teammate delta loops against the vectorized engine.
+
+Run with: python -m benchmarks.teammate_deltas
+"""
+from f1bot.lib import teammate_deltas
+
+from collections import defaultdict
+
+import random
+import timeit
+
+import pandas
+
+# Roughly every championship season, with a modern sized calendar and grid.
+SEASONS = 72
+ROUNDS = 22
+DRIVERS = 20
+
+REPEATS = 3
+NUMBER = 1
+
+
+def make_drivers(seasons: int) -> pandas.DataFrame:
+    rng = random.Random(0)
+    frames = []
+    for year in range(1950, 1950 + seasons):
+        for round_num in range(1, ROUNDS + 1):
+            numbers = [str(n) for n in range(1, DRIVERS + 1)]
+            frames.append(pandas.DataFrame({
+                'year': year,
+                'round': round_num,
+                'session_type': 'R',
+                'number': numbers,
+                'abbreviation': [f'D{year % 10}{n}' for n in numbers],
+                'full_name': [f'Driver {year % 10} {n}' for n in numbers],
+                'team': [f'Team {int(n) % (DRIVERS // 2)}' for n in numbers],
+                'finish_pos': [
+                    float(p) for p in rng.sample(range(1, DRIVERS + 1), DRIVERS)
+                ],
+                'best_lap': [90 + rng.random() for _ in numbers],
+            }))
+    return pandas.concat(frames, ignore_index=True)
+
+
+def by_loop(drivers: pandas.DataFrame) -> dict[str, float]:
+    """The previous implementation: Python loops per session and driver."""
+    totals: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for _, session in drivers.groupby(['year', 'round']):
+        teams = defaultdict(list)
+        for row in session.itertuples():
+            teams[row.team].append(row)
+        for pair in teams.values():
+            if len(pair) != 2:
+                continue
+            d1, d2 = pair
+            delta = int(d2.finish_pos - d1.finish_pos)
+            totals[d1.abbreviation][0] += delta
+            totals[d1.abbreviation][1] += 1
+            totals[d2.abbreviation][0] -= delta
+            totals[d2.abbreviation][1] += 1
+    return {abbrev: total / count for abbrev, (total, count) in totals.items()}
+
+
+def vectorized(drivers: pandas.DataFrame) -> pandas.DataFrame:
+    return teammate_deltas.aggregate(teammate_deltas.compute_deltas(drivers))
+
+
+def best_ms(func) -> float:
+    times = timeit.repeat(func, repeat=REPEATS, number=NUMBER)
+    return min(times) / NUMBER * 1000
+
+
+def main():
+    print(f'{"sessions":<12}{"loops (ms)":>14}{"vectorized (ms)":>18}{"speedup":>10}')
+    for seasons in [SEASONS // 8, SEASONS]:
+        drivers = make_drivers(seasons)
+        loop_ms = best_ms(lambda: by_loop(drivers))
+        vec_ms = best_ms(lambda: vectorized(drivers))
+        print(
+            f'{seasons * ROUNDS:<12}{loop_ms:>14.1f}{vec_ms:>18.1f}'
+            f'{loop_ms / vec_ms:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,47 @@
 import f1bot
 from f1bot import command as cmd
+from f1bot.command import jobs, metrics
+from f1bot.lib import render, reply_cache
 import f1bot.commands
+import asyncio
+import logging
 import os
-import tabulate
+import time
 from discord.ext import commands
-import pandas
 
 TOKEN = os.getenv('F1_BOT_TOKEN')
 
+LOGGER = logging.getLogger('f1bot.bot')
+
+# Discord user ids allowed to run admin_only commands, comma separated.
+ADMIN_IDS = {
+    int(user_id) for user_id in os.getenv('F1_BOT_ADMIN_IDS', '').split(',')
+    if user_id.strip()
+}
+
 bot = commands.Bot(command_prefix='\\')
 
+# Rendered replies of cacheable commands, see f1bot/lib/reply_cache.py.
+replies = reply_cache.ReplyCache()
+
+# Background commands, see f1bot/command/jobs.py.
+job_store = jobs.JobStore()
+
+# Minimum seconds between progress updates posted for a job.
+JOB_PROGRESS_SECONDS = float(os.getenv('F1_BOT_JOB_PROGRESS_SECONDS', '60'))
+
+executor = cmd.CommandExecutor(
+    max_workers=int(os.getenv('F1_BOT_MAX_WORKERS', '4')),
+    default_timeout=float(os.getenv('F1_BOT_COMMAND_TIMEOUT', '60')),
+    use_processes=os.getenv('F1_BOT_USE_PROCESSES', '') == '1',
+    max_queued=int(os.getenv('F1_BOT_MAX_QUEUED', '32')),
+    heavy_limits=cmd.LaneLimits(
+        workers=int(os.getenv('F1_BOT_HEAVY_WORKERS', '1')),
+        max_queued=int(os.getenv('F1_BOT_MAX_QUEUED_HEAVY', '4')),
+        max_queued_per_user=1),
+)
+metrics.METRICS.register_collector(executor.samples)
+
 @bot.command()
 async def f1(ctx, *args: str):
     """Creates f1 command to interface with the underlying CLI.
@@ -19,30 +51,146 @@ async def f1(ctx, *args: str):
 
     Args are passed straight through to the underlying CLI.
     """
-    result = cmd.run_command(list(args))
+    manifest = cmd.find_manifest(args[0]) if len(args) > 0 else None
+    if manifest is not None and manifest.admin_only and (
+            ctx.author.id not in ADMIN_IDS):
+        await ctx.send(f"'{manifest.name}' is only available to admins.")
+        return
+
+    requester = cmd.Requester(
+        user=ctx.author.id, guild=ctx.guild.id if ctx.guild else None)
+    normalized = key = None
+    try:
+        if manifest is not None and manifest.background:
+            if await submit_job(ctx, list(args), requester):
+                return
+
+        if manifest is not None and manifest.cacheable:
+            normalized = await executor.cache_key(list(args), requester)
+            if normalized is not None:
+                key = replies.key(normalized)
+                cached = replies.get(key)
+                if cached is not None:
+                    for message in cached:
+                        await ctx.send(message)
+                    return
+    except cmd.Busy as e:
+        await ctx.send(str(e))
+        return
+
+    # Identical requests made while this one runs share its result.
+    result = await executor.run(
+        list(args), key=normalized, requester=requester)
+    if result.is_busy():
+        await ctx.send(result.value)
+        return
     if result.is_error():
         await ctx.send(f'{result.status.name}: {result.value}')
         return
 
-    results = result.value if isinstance(result.value, list) else [result.value]
+    # Another coalesced request may have rendered it already.
+    messages = replies.get(key) if key is not None else None
+    if messages is None:
+        messages = render_result(
+            result, manifest.name if manifest else metrics.NO_COMMAND)
+        if key is not None:
+            replies.put(key, messages)
+    for message in messages:
+        await ctx.send(message)
 
-    for v in results:
-        await ctx.send(format_command_value(v))
 
+def render_result(result: cmd.CommandResult, name: str) -> tuple[str, ...]:
+    results = (
+        result.value if isinstance(result.value, list) else [result.value])
+    with metrics.span('format', command=name):
+        return tuple(render.to_discord(v) for v in results)
 
-def format_command_value(value: cmd.CommandValue) -> str:
-    if isinstance(value, pandas.DataFrame):
-        print(value.keys())
-        tabulated = tabulate.tabulate(value, headers='keys', showindex=False)
-        return f"```{tabulated}```"
-    elif isinstance(value, str):
-        return f"```{value}```"
+
+async def submit_job(ctx, args: list[str], requester: cmd.Requester) -> bool:
+    """Queues args as a job. Returns False if they don't parse."""
+    normalized = await executor.normalize(args, requester)
+    if normalized is None:
+        # Left to the executor, which replies with the usage.
+        return False
+
+    job, created = await asyncio.to_thread(
+        job_store.submit, args, jobs.job_key(normalized), ctx.channel.id)
+    if job.finished:
+        await send_job_result(ctx.channel, job)
+    elif created:
+        await ctx.send(
+            f"Started job #{job.id}, I'll post the result here when it's "
+            'done.')
     else:
-        return f"Error, unrecognized type: {type(value)}"
+        await ctx.send(f"{job.describe()} I'll post the result here too.")
+    return True
+
+
+async def send_job_result(channel, job: jobs.Job):
+    assert job.result is not None
+    if job.result.is_error():
+        await channel.send(
+            f'Job #{job.id} failed: {job.result.status.name}: '
+            f'{job.result.value}')
+        return
+    for message in render_result(job.result, job.args[0]):
+        await channel.send(message)
+
+
+async def deliver_jobs():
+    """Posts job progress and results to the channels waiting on them."""
+    # (job id, channel id) -> (completed, time) of the last progress posted.
+    posted: dict[tuple[int, int], tuple[int, float]] = {}
+    while True:
+        await asyncio.sleep(jobs.POLL_SECONDS)
+        # This is the only delivery task, so nothing may stop the loop. A
+        # failed round (e.g. the store was locked) is retried on the next.
+        try:
+            await _deliver_updates(posted)
+        except Exception:
+            LOGGER.exception('Delivering job updates failed')
+
+
+async def _deliver_updates(posted: dict[tuple[int, int], tuple[int, float]]):
+    for job, channel_ids in await asyncio.to_thread(job_store.subscribed):
+        for channel_id in channel_ids:
+            channel = bot.get_channel(channel_id)
+            try:
+                if job.finished:
+                    posted.pop((job.id, channel_id), None)
+                    if channel is not None:
+                        await send_job_result(channel, job)
+                elif channel is not None and job.total:
+                    last_completed, last_time = posted.get(
+                        (job.id, channel_id), (0, 0.0))
+                    now = time.monotonic()
+                    if job.completed != last_completed and (
+                            now - last_time >= JOB_PROGRESS_SECONDS):
+                        await channel.send(job.describe())
+                        posted[(job.id, channel_id)] = (job.completed, now)
+            except Exception:
+                LOGGER.exception(
+                    'Failed to post job #%d to %d', job.id, channel_id)
+            if job.finished:
+                await asyncio.to_thread(
+                    job_store.unsubscribe, job.id, channel_id)
+
+
+_delivering = False
+
+@bot.event
+async def on_ready():
+    # on_ready runs again after every reconnect.
+    global _delivering
+    if not _delivering:
+        _delivering = True
+        bot.loop.create_task(deliver_jobs())
 
 
 def main():
     f1bot.init()
+    metrics.maybe_serve_http()
+    jobs.start_workers()
     bot.run(TOKEN)
 
 if __name__ == "__main__":
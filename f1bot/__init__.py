@@ -1,7 +1,27 @@
-import fastf1
 import os
+import sys
+
+CACHE_DIR = '.f1-cache'
+
+_initialized = False
 
 def init():
-    if not os.path.exists('.f1-cache'):
-        os.makedirs(".f1-cache")
-    fastf1.Cache.enable_cache('.f1-cache')
+    """Sets up fastf1's on-disk cache.
+
+    fastf1 (and pandas with it) is slow to import, so it isn't imported here.
+    The cache is enabled as soon as something that needs fastf1 imports it
+    through f1bot.lib.sessions.
+    """
+    global _initialized
+    _initialized = True
+    if 'fastf1' in sys.modules:
+        enable_fastf1_cache()
+
+def enable_fastf1_cache():
+    """Enables fastf1's cache if init() has been called."""
+    if not _initialized:
+        return
+    import fastf1
+    if not os.path.exists(CACHE_DIR):
+        os.makedirs(CACHE_DIR)
+    fastf1.Cache.enable_cache(CACHE_DIR)
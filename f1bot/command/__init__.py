@@ -1,4 +1,8 @@
-from .command_protocol import CommandValue, Manifest
-from .runner import CommandError, run_command
+from .command_protocol import CommandValue, CostClass, Manifest
+from .command_registry import declare, find_manifest
+from .runner import CommandError, CommandResult, cache_key, run_command
+from .executor import CommandExecutor
+from .lanes import Busy, LaneLimits
+from .requester import Requester
 from .base_command import Command
-
+from . import metrics
@@ -1,10 +1,36 @@
-from .command_registry import CommandRegistrar
+from .command_protocol import Manifest
+from .command_registry import CommandRegistrar, REGISTRY
 
 import argparse
 
+from typing import Any, Hashable
+
 class Command(metaclass=CommandRegistrar):
 
+    @classmethod
+    def manifest(cls) -> Manifest:
+        # Declared commands (see f1bot/commands/__init__.py) don't need to
+        # repeat their manifest.
+        manifest = REGISTRY.declared_manifest(cls)
+        if manifest is None:
+            raise NotImplementedError(
+                f"'{cls.__name__}' must be declared or implement manifest().")
+        return manifest
+
     @classmethod
     def init_parser(cls, _parser: argparse.ArgumentParser):
         pass
 
+    @classmethod
+    def normalize(cls, args: argparse.Namespace) -> Hashable:
+        # Override to resolve fuzzy names, so e.g. 'spain' and 'barcelona'
+        # share a key.
+        return freeze(vars(args))
+
+def freeze(value: Any) -> Hashable:
+    """Converts dicts and lists in parsed args into hashable tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
@@ -1,18 +1,55 @@
 import attrs
 import argparse
-import pandas
+import enum
 
-from typing import Protocol, runtime_checkable, Union
+from typing import (
+    Hashable, Optional, Protocol, runtime_checkable, TYPE_CHECKING, Union)
 
-CommandPrimitive = Union[str, pandas.DataFrame]
+# Commands are declared before pandas is needed, so it's only imported when
+# type checking.
+if TYPE_CHECKING:
+    import pandas
+
+CommandPrimitive = Union[str, 'pandas.DataFrame']
 CommandValue = Union[CommandPrimitive, list[CommandPrimitive]]
 
+class CostClass(enum.Enum):
+    """How expensive a command is to run, which picks its executor lane."""
+    # A handful of queries, done in well under a second.
+    LIGHT = 'light'
+    # Loads lots of data (e.g. fastf1 sessions) and can take minutes.
+    HEAVY = 'heavy'
+
 @attrs.define()
 class Manifest:
     name: str
     description: str
     disabled: bool = False
 
+    # Wall-clock limit, in seconds, for a single run of this command. None
+    # falls back to the executor's default.
+    timeout: Optional[float] = None
+
+    # Maximum number of concurrent runs of this command. None falls back to
+    # the executor's default.
+    max_concurrency: Optional[int] = None
+
+    # Only admins (see bot.py) may run this command through the bot. It's
+    # also left out of the help listing.
+    admin_only: bool = False
+
+    # The output only depends on the arguments and the ergast database, so
+    # the bot can reuse rendered replies until the database is rebuilt.
+    cacheable: bool = False
+
+    # Heavy commands run on their own workers so they can't hold up light
+    # ones.
+    cost: CostClass = CostClass.LIGHT
+
+    # The bot runs this as a background job (see jobs.py): it replies with a
+    # job id straight away and posts the output once a worker finishes.
+    background: bool = False
+
 @runtime_checkable
 class CommandProtocol(Protocol):
 
@@ -33,6 +70,14 @@ class CommandProtocol(Protocol):
         """
         raise NotImplementedError
 
+    @classmethod
+    def normalize(cls, args: argparse.Namespace) -> Hashable:
+        """Returns a key that's equal for args that give the same output.
+
+        Only used for cacheable commands.
+        """
+        raise NotImplementedError
+
     def run(self, args: argparse.Namespace) -> CommandValue:
         """Implementation of the actual command."""
         raise NotImplementedError
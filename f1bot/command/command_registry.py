@@ -4,20 +4,77 @@ import f1bot.argparser as argparser
 
 import attrs
 import argparse
+import importlib
 
-from typing import Type, Any
+from typing import Callable, Optional, Type, Any
+
+ParserInitializer = Callable[[argparse.ArgumentParser], None]
 
 @attrs.define()
 class RegistryEntry:
     manifest: Manifest
     parser: argparse.ArgumentParser
-    command_constructor: Type[CommandProtocol]
+
+    # Where a declared command's class lives, like "f1bot.commands.schedule:Schedule".
+    # None for commands registered by defining their class.
+    implementation: Optional[str] = None
+
+    _command: Optional[Type[CommandProtocol]] = None
+
+    @property
+    def command_constructor(self) -> Type[CommandProtocol]:
+        """The command's class, importing its module the first time."""
+        if self._command is None:
+            assert self.implementation is not None
+            module_name, class_name = self.implementation.split(':')
+            module = importlib.import_module(module_name)
+            self._command = getattr(module, class_name)
+        return self._command
+
+def implementation_path(command: Type[Any]) -> str:
+    return f'{command.__module__}:{command.__qualname__}'
 
 class CommandRegistry:
     def __init__(self):
         self._commands: dict[str, RegistryEntry] = {}
+        self._declared: dict[str, RegistryEntry] = {}
+
+    def declare(
+        self,
+        manifest: Manifest,
+        implementation: str,
+        init_parser: Optional[ParserInitializer] = None,
+    ):
+        """Registers a command without importing its implementation.
+
+        Args:
+            manifest: The command's manifest.
+            implementation: "module:Class" of the command. The module is only
+                imported when the command first runs.
+            init_parser: Adds the command's arguments to its parser.
+        """
+        if manifest.disabled:
+            return
+
+        parser = argparser.add_command_parser(
+            manifest.name, description=manifest.description)
+        if init_parser is not None:
+            init_parser(parser)
+
+        entry = RegistryEntry(
+                manifest=manifest,
+                parser=parser,
+                implementation=implementation)
+        self._commands[manifest.name] = entry
+        self._declared[implementation] = entry
 
     def register(self, command: Type[CommandProtocol]):
+        declared = self._declared.get(implementation_path(command))
+        if declared is not None:
+            # The class of a declared command was just imported.
+            declared._command = command
+            return
+
         manifest = command.manifest()
         if manifest.disabled:
             return
@@ -30,7 +87,11 @@ class CommandRegistry:
         self._commands[manifest.name] = RegistryEntry(
                 manifest=manifest,
                 parser=parser,
-                command_constructor=command)
+                command=command)
+
+    def declared_manifest(self, command: Type[Any]) -> Optional[Manifest]:
+        entry = self._declared.get(implementation_path(command))
+        return None if entry is None else entry.manifest
 
     def __contains__(self, name: str) -> bool:
         return name in self._commands
@@ -44,6 +105,19 @@ class CommandRegistry:
 
 REGISTRY = CommandRegistry()
 
+def find_manifest(name: str) -> Optional[Manifest]:
+    """Returns the manifest of the command called name, if there is one."""
+    if name not in REGISTRY:
+        return None
+    return REGISTRY.get(name).manifest
+
+def declare(
+    manifest: Manifest,
+    implementation: str,
+    init_parser: Optional[ParserInitializer] = None,
+):
+    REGISTRY.declare(manifest, implementation, init_parser)
+
 
 class CommandRegistrar(type):
     def __init__(cls, name: str, bases: Any, clsdict: dict[str, Any]):
@@ -0,0 +1,244 @@
+from . import metrics
+from .command_protocol import CostClass
+from .command_registry import REGISTRY
+from .lanes import QUEUE_FULL, Busy, Lane, LaneLimits
+from .requester import ANONYMOUS, Requester
+from .runner import CommandResult, cache_key, normalize, run_command
+
+import asyncio
+import collections
+import concurrent.futures
+
+from typing import Callable, Hashable, Optional, TypeVar
+
+T = TypeVar('T')
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+# Light commands get max_workers workers. Heavy ones get their own, so a
+# fastf1 analysis never takes a worker a quick lookup needs.
+DEFAULT_HEAVY_LIMITS = LaneLimits(
+    workers=1, max_queued=4, max_queued_per_user=1)
+DEFAULT_MAX_QUEUED = 32
+
+
+def _label(name: str) -> str:
+    # Unknown names share one entry, so typos can't grow per-command state.
+    return name if name in REGISTRY else metrics.NO_COMMAND
+
+
+def _init_process_worker():
+    """Prepares a freshly spawned worker process to run commands."""
+    import f1bot
+    import f1bot.commands
+    f1bot.init()
+
+
+class CommandExecutor:
+    """Runs commands on a worker pool so they don't block the event loop.
+
+    Each cost class (see Manifest.cost) has its own lane: a thread (or
+    process) pool, a worker budget and a fair queue with depth limits (see
+    lanes.py). Each command name also gets its own semaphore so a single slow
+    command can't take every worker, and each run is bounded by a wall-clock
+    timeout. Identical requests that arrive while one is running wait for its
+    result instead of running again.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        default_timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        use_processes: bool = False,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        heavy_limits: LaneLimits = DEFAULT_HEAVY_LIMITS,
+    ):
+        self._default_timeout = default_timeout
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._waiting: collections.Counter[str] = collections.Counter()
+        self._in_flight: dict[Hashable, asyncio.Future[CommandResult]] = {}
+        self._lanes = {
+            CostClass.LIGHT: Lane(LaneLimits(
+                workers=max_workers, max_queued=max_queued)),
+            CostClass.HEAVY: Lane(heavy_limits),
+        }
+        self._pools: dict[CostClass, concurrent.futures.Executor] = {}
+        for cost, lane in self._lanes.items():
+            if use_processes:
+                self._pools[cost] = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=lane.limits.workers,
+                    initializer=_init_process_worker)
+            else:
+                self._pools[cost] = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=lane.limits.workers,
+                    thread_name_prefix=f'f1bot-{cost.value}')
+
+    async def run(
+        self,
+        args: list[str],
+        key: Optional[Hashable] = None,
+        requester: Requester = ANONYMOUS,
+    ) -> CommandResult:
+        """Runs the command described by args without blocking the loop.
+
+        Concurrent runs with the same key share a single execution and all
+        get its result. key defaults to the args themselves, but callers can
+        pass a normalized one (see cache_key) so differently spelled requests
+        for the same thing are coalesced too.
+        """
+        if key is None:
+            key = ('args', tuple(args))
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self._run(args, requester))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(
+                lambda _: self._in_flight.pop(key, None))
+            # Shielded so one caller giving up doesn't cancel it for the
+            # others.
+            return await asyncio.shield(in_flight)
+
+        label = _label(args[0] if len(args) > 0 else '')
+        with metrics.span('coalesced', command=label):
+            return await asyncio.shield(in_flight)
+
+    async def _run(self, args: list[str], requester: Requester) -> CommandResult:
+        name = args[0] if len(args) > 0 else ''
+        timeout, _, cost = self._limits_for(name)
+        label = _label(name)
+        try:
+            with metrics.span('queued', command=label):
+                release = await self._acquire(name, requester)
+        except Busy as e:
+            metrics.METRICS.count_error(label, 'busy')
+            return CommandResult.busy(str(e))
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pools[cost], run_command, list(args))
+
+        # A timed out command can't be interrupted, so its slots are only
+        # handed back once the worker actually finishes.
+        future.add_done_callback(lambda _: release())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            metrics.METRICS.count_error(label, 'timeout')
+            return CommandResult.error(
+                f"Command '{name}' timed out after {timeout:g} seconds.")
+        except Exception as e:
+            # run_command never raises, so this is a failure of the pool itself
+            # (e.g. a worker process that died).
+            metrics.METRICS.count_error(label, 'executor_error')
+            return CommandResult.error(str(e))
+
+    async def cache_key(
+        self, args: list[str], requester: Requester = ANONYMOUS
+    ) -> Optional[Hashable]:
+        """Runs runner.cache_key in the command's lane.
+
+        Raises Busy if the lane can't take the request.
+        """
+        return await self._prepare(cache_key, args, requester)
+
+    async def normalize(
+        self, args: list[str], requester: Requester = ANONYMOUS
+    ) -> Optional[Hashable]:
+        """Runs runner.normalize in the command's lane, see cache_key."""
+        return await self._prepare(normalize, args, requester)
+
+    async def _prepare(
+        self,
+        func: Callable[[list[str]], Optional[T]],
+        args: list[str],
+        requester: Requester,
+    ) -> Optional[T]:
+        # Normalizing can resolve names against the database, so it takes a
+        # slot (and counts against the queue limits) like running does.
+        name = args[0] if len(args) > 0 else ''
+        timeout, _, cost = self._limits_for(name)
+        release = await self._acquire(name, requester)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pools[cost], func, list(args))
+        future.add_done_callback(lambda _: release())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # The request goes ahead with its own args as the key.
+            return None
+        except Exception:
+            return None
+
+    def samples(self) -> list[metrics.Sample]:
+        """Each lane's queue depth, for metrics.METRICS.register_collector."""
+        queued = {cost: lane.queued for cost, lane in self._lanes.items()}
+        # Requests waiting on a command's semaphore haven't reached its lane's
+        # queue yet, but they're just as stuck.
+        for label, waiting in list(self._waiting.items()):
+            queued[self._limits_for(label)[2]] += waiting
+        return [
+            metrics.Sample(
+                f'lane_{cost.value}_queued', count, 'gauge',
+                f'Requests waiting for a worker in the {cost.value} lane.')
+            for cost, count in queued.items()
+        ]
+
+    async def _acquire(
+        self, name: str, requester: Requester
+    ) -> Callable[[], None]:
+        """Takes the command's semaphore, then a worker slot in its lane.
+
+        Returns the function that hands both back. Raises Busy if either
+        queue is full.
+        """
+        _, max_concurrency, cost = self._limits_for(name)
+        lane = self._lanes[cost]
+        label = _label(name)
+        semaphore = self._semaphores.get(label)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            self._semaphores[label] = semaphore
+
+        # The semaphore comes first so a request waiting behind a capped
+        # command doesn't sit on a worker other commands could use. Its
+        # waiters are bounded like the lane's own queue.
+        if semaphore.locked() and (
+                self._waiting[label] >= lane.limits.max_queued):
+            raise Busy(QUEUE_FULL)
+        self._waiting[label] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[label] -= 1
+
+        try:
+            await lane.acquire(requester)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release():
+            lane.release()
+            semaphore.release()
+        return release
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _limits_for(self, name: str) -> tuple[float, int, CostClass]:
+        timeout = self._default_timeout
+        cost = CostClass.LIGHT
+        max_concurrency = None
+        if name in REGISTRY:
+            manifest = REGISTRY.get(name).manifest
+            cost = manifest.cost
+            if manifest.timeout is not None:
+                timeout = manifest.timeout
+            max_concurrency = manifest.max_concurrency
+        workers = self._lanes[cost].limits.workers
+        if max_concurrency is not None:
+            workers = min(max_concurrency, workers)
+        return timeout, workers, cost
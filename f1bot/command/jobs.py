@@ -0,0 +1,396 @@
+"""SQLite backed queue of background jobs and the processes that run them.
+
+Commands whose manifest sets background (e.g. teammate_delta) take minutes,
+so the bot submits them here instead of running them itself. Worker
+processes claim queued jobs, record progress as they go and save the result.
+The bot polls the store and posts progress and results to the channels that
+asked for them.
+
+A job that runs past its command's timeout can't be interrupted from inside
+the worker, so the process that started the workers fails the job and
+replaces the worker. Workers that die are replaced the same way.
+
+Results are kept for RESULT_SECONDS, so asking for the same thing again (by
+runner.normalize, so spelling doesn't matter) is answered straight from the
+store. A request for a job that's already queued or running joins it.
+"""
+import atexit
+import contextvars
+import enum
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+
+from .command_registry import REGISTRY
+from .runner import CommandResult, run_command
+from f1bot.lib import sqlite_db
+
+from typing import Callable, Hashable, Optional
+
+import attrs
+
+STORE_PATH = os.getenv(
+    'F1_BOT_JOB_STORE', os.path.join('.f1-cache', 'jobs.sqlite'))
+
+# Worker processes the bot starts.
+WORKERS = int(os.getenv('F1_BOT_JOB_WORKERS', '1'))
+
+# How long a finished job's result answers identical requests.
+RESULT_SECONDS = float(
+    os.getenv('F1_BOT_JOB_RESULT_SECONDS', str(7 * 24 * 60 * 60)))
+
+# How often idle workers look for jobs, the bot looks for updates and
+# workers are checked on.
+POLL_SECONDS = 2.0
+
+# For commands whose manifest doesn't set a timeout.
+DEFAULT_TIMEOUT_SECONDS = float(
+    os.getenv('F1_BOT_JOB_TIMEOUT_SECONDS', str(60 * 60)))
+
+# Bump whenever the tables below change. Stores written with a different
+# version are wiped, queued jobs and saved results included.
+SCHEMA_VERSION = 2
+
+_SCHEMA = [
+    '''
+    CREATE TABLE jobs (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      -- repr of the normalized args, identical requests share it.
+      key TEXT NOT NULL,
+      -- JSON list of the args to run.
+      args TEXT NOT NULL,
+      status TEXT NOT NULL,
+      completed INTEGER NOT NULL DEFAULT 0,
+      total INTEGER NOT NULL DEFAULT 0,
+      -- pid of the worker running it, when it started and how long it has.
+      worker INTEGER,
+      started REAL,
+      timeout REAL,
+      -- Pickled CommandResult, once finished.
+      result BLOB,
+      created REAL NOT NULL,
+      finished REAL
+    )
+    ''',
+    'CREATE INDEX jobs_key_status ON jobs (key, status)',
+    'CREATE INDEX jobs_status_id ON jobs (status, id)',
+    # Channels waiting for a job's progress and result.
+    '''
+    CREATE TABLE subscribers (
+      job_id INTEGER NOT NULL,
+      channel INTEGER NOT NULL,
+      PRIMARY KEY (job_id, channel)
+    )
+    ''',
+]
+
+# Called with (completed, total) as a job makes progress.
+ProgressCallback = Callable[[int, int], None]
+
+LOGGER = logging.getLogger(__name__)
+
+_PROGRESS: contextvars.ContextVar[Optional[ProgressCallback]] = (
+    contextvars.ContextVar('f1bot_job_progress', default=None))
+
+
+class JobStatus(enum.Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    # Finished with an error. Kept for anyone waiting on it, but not reused.
+    FAILED = 'failed'
+
+
+@attrs.frozen()
+class Job:
+    id: int
+    args: list[str]
+    status: JobStatus
+    completed: int = 0
+    total: int = 0
+    # Set once the job is DONE or FAILED.
+    result: Optional[CommandResult] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+    def describe(self) -> str:
+        progress = (
+            f', {self.completed}/{self.total} loaded' if self.total else '')
+        return (f"Job #{self.id} ('{' '.join(self.args)}') is "
+                f'{self.status.value}{progress}.')
+
+
+def job_key(normalized: Hashable) -> str:
+    """Returns the key identical requests share, from runner.normalize."""
+    return repr(normalized)
+
+
+def job_timeout(args: list[str]) -> float:
+    if len(args) > 0 and args[0] in REGISTRY:
+        timeout = REGISTRY.get(args[0]).manifest.timeout
+        if timeout is not None:
+            return timeout
+    return DEFAULT_TIMEOUT_SECONDS
+
+
+def progress_callback() -> Optional[ProgressCallback]:
+    """Returns the running job's progress callback, None outside of a job."""
+    return _PROGRESS.get()
+
+
+_COLUMNS = 'id, args, status, completed, total, result'
+
+
+def _job(row: tuple) -> Job:
+    job_id, args, status, completed, total, result = row
+    return Job(
+        id=job_id,
+        args=json.loads(args),
+        status=JobStatus(status),
+        completed=completed,
+        total=total,
+        result=pickle.loads(result) if result is not None else None)
+
+
+class JobStore:
+    """The queue of jobs, their results and who's waiting for them."""
+
+    def __init__(self, path: str = STORE_PATH):
+        # Workers and the bot write from different processes.
+        self._db = sqlite_db.VersionedDatabase(
+            path, SCHEMA_VERSION, _SCHEMA, tables=['subscribers', 'jobs'],
+            timeout=30, wal=True, immediate=True)
+
+    def submit(
+        self, args: list[str], key: str, channel: Optional[int] = None
+    ) -> tuple[Job, bool]:
+        """Finds or queues the job for args.
+
+        Returns the job and whether it was newly queued. A recent finished
+        job, or one that's queued or running, is returned instead of queueing
+        another. channel, if given, is subscribed to the job unless it's
+        already done.
+        """
+        with self._db.connect() as conn:
+            row = conn.execute(
+                f'SELECT {_COLUMNS} FROM jobs '
+                'WHERE key = ? AND (status IN (?, ?) '
+                '  OR (status = ? AND finished >= ?)) '
+                'ORDER BY id DESC LIMIT 1',
+                (key, JobStatus.QUEUED.value, JobStatus.RUNNING.value,
+                 JobStatus.DONE.value, time.time() - RESULT_SECONDS)
+            ).fetchone()
+            created = row is None
+            if created:
+                job_id = conn.execute(
+                    'INSERT INTO jobs (key, args, status, created) '
+                    'VALUES (?, ?, ?, ?)',
+                    (key, json.dumps(args), JobStatus.QUEUED.value,
+                     time.time())).lastrowid
+                job = Job(id=job_id, args=list(args), status=JobStatus.QUEUED)
+            else:
+                job = _job(row)
+            if channel is not None and not job.finished:
+                conn.execute(
+                    'INSERT OR IGNORE INTO subscribers VALUES (?, ?)',
+                    (job.id, channel))
+        return job, created
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._db.connect() as conn:
+            row = conn.execute(
+                f'SELECT {_COLUMNS} FROM jobs WHERE id = ?',
+                (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def claim(self, worker: int) -> Optional[Job]:
+        """Marks the oldest queued job as run by worker and returns it."""
+        with self._db.connect() as conn:
+            row = conn.execute(
+                f'SELECT {_COLUMNS} FROM jobs WHERE status = ? '
+                'ORDER BY id LIMIT 1',
+                (JobStatus.QUEUED.value,)).fetchone()
+            if row is None:
+                return None
+            job = attrs.evolve(_job(row), status=JobStatus.RUNNING)
+            conn.execute(
+                'UPDATE jobs SET status = ?, worker = ?, started = ?, '
+                'timeout = ? WHERE id = ?',
+                (job.status.value, worker, time.time(),
+                 job_timeout(job.args), job.id))
+        return job
+
+    def set_progress(self, job_id: int, completed: int, total: int):
+        with self._db.connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET completed = ?, total = ? WHERE id = ?',
+                (completed, total, job_id))
+
+    def finish(self, job_id: int, result: CommandResult):
+        """Saves a running job's result. Jobs failed meanwhile stay failed."""
+        status = JobStatus.DONE if result.is_ok() else JobStatus.FAILED
+        with self._db.connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, finished = ? '
+                'WHERE id = ? AND status = ?',
+                (status.value, pickle.dumps(result), time.time(), job_id,
+                 JobStatus.RUNNING.value))
+
+    def fail_overdue(self, now: float) -> list[int]:
+        """Fails running jobs past their timeout, returning their workers."""
+        with self._db.connect() as conn:
+            overdue = conn.execute(
+                'SELECT id, worker, timeout FROM jobs '
+                'WHERE status = ? AND started + timeout < ?',
+                (JobStatus.RUNNING.value, now)).fetchall()
+            conn.executemany(
+                'UPDATE jobs SET status = ?, result = ?, finished = ? '
+                'WHERE id = ?',
+                [(JobStatus.FAILED.value,
+                  pickle.dumps(CommandResult.error(
+                      f'Timed out after {timeout:g} seconds.')),
+                  now, job_id)
+                 for job_id, _, timeout in overdue])
+        return [worker for _, worker, _ in overdue]
+
+    def fail_worker(self, worker: int, reason: str):
+        """Fails whatever job worker was running."""
+        with self._db.connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, finished = ? '
+                'WHERE status = ? AND worker = ?',
+                (JobStatus.FAILED.value,
+                 pickle.dumps(CommandResult.error(reason)), time.time(),
+                 JobStatus.RUNNING.value, worker))
+
+    def requeue_running(self) -> int:
+        """Queues running jobs again, for when their workers are gone."""
+        with self._db.connect() as conn:
+            return conn.execute(
+                'UPDATE jobs SET status = ?, completed = 0, total = 0 '
+                'WHERE status = ?',
+                (JobStatus.QUEUED.value, JobStatus.RUNNING.value)).rowcount
+
+    def subscribed(self) -> list[tuple[Job, list[int]]]:
+        """Returns every job with subscribers, and their channels."""
+        with self._db.connect() as conn:
+            rows = conn.execute(
+                f'SELECT {", ".join("j." + c for c in _COLUMNS.split(", "))}, '
+                's.channel FROM subscribers s JOIN jobs j ON j.id = s.job_id '
+                'ORDER BY j.id').fetchall()
+        by_id: dict[int, tuple[Job, list[int]]] = {}
+        for row in rows:
+            if row[0] not in by_id:
+                by_id[row[0]] = (_job(row[:-1]), [])
+            by_id[row[0]][1].append(row[-1])
+        return list(by_id.values())
+
+    def unsubscribe(self, job_id: int, channel: int):
+        with self._db.connect() as conn:
+            conn.execute(
+                'DELETE FROM subscribers WHERE job_id = ? AND channel = ?',
+                (job_id, channel))
+
+
+def run_job(store: JobStore, job: Job):
+    """Runs a claimed job, recording its progress and result in store."""
+    def progress(completed: int, total: int):
+        store.set_progress(job.id, completed, total)
+
+    token = _PROGRESS.set(progress)
+    try:
+        result = run_command(job.args)
+    finally:
+        _PROGRESS.reset(token)
+    store.finish(job.id, result)
+
+
+def work(path: str = STORE_PATH, parent: Optional[int] = None):
+    """Runs queued jobs until the parent process (if any) goes away."""
+    import f1bot
+    import f1bot.commands
+    f1bot.init()
+
+    store = JobStore(path)
+    while parent is None or os.getppid() == parent:
+        job = store.claim(os.getpid())
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        run_job(store, job)
+
+
+class WorkerPool:
+    """Worker processes, replaced when they die or overrun a job's timeout."""
+
+    def __init__(self, count: int = WORKERS, path: str = STORE_PATH):
+        self._count = count
+        self._path = path
+        self._store = JobStore(path)
+        # Not daemonic, since commands can start process pools of their own.
+        self._context = multiprocessing.get_context('spawn')
+        self._workers: list[multiprocessing.Process] = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Starts the workers and a thread that checks on them.
+
+        Jobs left running by an earlier set of workers are queued again
+        first, so these must be the only workers using the store.
+        """
+        self._store.requeue_running()
+        self._workers = [self._spawn(i) for i in range(self._count)]
+        atexit.register(self.stop)
+        threading.Thread(
+            target=self._supervise_forever, name='f1bot-job-supervisor',
+            daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        for worker in self._workers:
+            worker.terminate()
+
+    def check(self):
+        """Fails overdue jobs and replaces their workers and dead ones."""
+        if self._stopped.is_set():
+            return
+        overdue = set(self._store.fail_overdue(time.time()))
+        for index, worker in enumerate(self._workers):
+            if worker.pid in overdue:
+                worker.terminate()
+                worker.join()
+            elif worker.is_alive():
+                continue
+            else:
+                self._store.fail_worker(
+                    worker.pid, 'The worker running this job exited.')
+            self._workers[index] = self._spawn(index)
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        worker = self._context.Process(
+            target=work, args=(self._path, os.getpid()),
+            name=f'f1bot-job-worker-{index}')
+        worker.start()
+        return worker
+
+    def _supervise_forever(self):
+        while not self._stopped.wait(POLL_SECONDS):
+            try:
+                self.check()
+            except Exception:
+                LOGGER.exception('Checking on job workers failed')
+
+
+def start_workers(
+    count: int = WORKERS, path: str = STORE_PATH
+) -> WorkerPool:
+    """Starts worker processes that are stopped when this process exits."""
+    pool = WorkerPool(count, path)
+    pool.start()
+    return pool
@@ -0,0 +1,126 @@
+"""Worker budgets and fair queueing for each command cost class.
+
+A lane owns a fixed number of worker slots. Requests that can't get a slot
+wait in a queue that's served round-robin across guilds and then across
+users within a guild, so one busy server or one user spamming a command
+can't starve everyone else. Requests beyond the queue limits are turned away
+immediately rather than waiting indefinitely.
+"""
+from .requester import Requester
+
+import asyncio
+import collections
+
+from typing import Hashable, Optional
+
+import attrs
+
+
+@attrs.frozen()
+class LaneLimits:
+    # Commands from this lane that can run at once.
+    workers: int
+    # Requests waiting for a worker. Beyond this, new requests are busy.
+    max_queued: int
+    # Requests a single user can have waiting.
+    max_queued_per_user: int = 2
+
+
+QUEUE_FULL = 'Too many requests are waiting, try again in a bit.'
+
+
+class Busy(Exception):
+    """The lane can't take any more requests right now."""
+    pass
+
+
+class _FairQueue:
+    """Waiters grouped by guild, then user, served round-robin at both."""
+
+    def __init__(self):
+        self._guilds: collections.OrderedDict[
+            Optional[Hashable],
+            collections.OrderedDict[Hashable, collections.deque]
+        ] = collections.OrderedDict()
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def queued_for(self, requester: Requester) -> int:
+        users = self._guilds.get(requester.guild)
+        if users is None:
+            return 0
+        return len(users.get(requester.user, ()))
+
+    def push(self, requester: Requester, waiter: asyncio.Future):
+        users = self._guilds.setdefault(
+            requester.guild, collections.OrderedDict())
+        users.setdefault(requester.user, collections.deque()).append(waiter)
+        self._len += 1
+
+    def pop(self) -> Optional[asyncio.Future]:
+        """Returns the next waiter, moving its guild and user to the back."""
+        while self._guilds:
+            guild, users = next(iter(self._guilds.items()))
+            user, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            self._len -= 1
+
+            if waiters:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            if users:
+                self._guilds.move_to_end(guild)
+            else:
+                del self._guilds[guild]
+
+            # Waiters whose caller gave up are skipped.
+            if not waiter.done():
+                return waiter
+        return None
+
+
+class Lane:
+    """Hands out a lane's worker slots, queueing fairly when they're taken."""
+
+    def __init__(self, limits: LaneLimits):
+        self.limits = limits
+        self._running = 0
+        self._queue = _FairQueue()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    async def acquire(self, requester: Requester):
+        """Waits for a worker slot. Raises Busy if the queue is full."""
+        if self._running < self.limits.workers and not self._queue:
+            self._running += 1
+            return
+
+        if len(self._queue) >= self.limits.max_queued:
+            raise Busy(QUEUE_FULL)
+        if self._queue.queued_for(requester) >= (
+                self.limits.max_queued_per_user):
+            raise Busy(
+                'You already have requests waiting, try again in a bit.')
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.push(requester, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot was handed over just as the caller gave up.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Hands the slot to the next waiter, or frees it."""
+        waiter = self._queue.pop()
+        if waiter is None:
+            self._running -= 1
+        else:
+            waiter.set_result(None)
@@ -0,0 +1,253 @@
+"""Per-command, per-phase latency histograms and error counters.
+
+The runner times each phase of a command (parsing arguments, importing the
+command, running it) and lower layers add their own spans (SQL, name
+resolution, building DataFrames, formatting output). Spans are attributed to
+whichever command is running in the current context.
+
+Metrics live in the process that recorded them, so commands run on a process
+pool (F1_BOT_USE_PROCESSES) aren't visible to the bot's process.
+"""
+import bisect
+import collections
+import contextlib
+import contextvars
+import http.server
+import math
+import os
+import threading
+import time
+
+from typing import Callable, Iterator, Optional
+
+import attrs
+
+# Serves Prometheus text metrics on this local port when set.
+METRICS_PORT = os.getenv('F1_BOT_METRICS_PORT')
+
+# Upper bounds of the histogram buckets, in seconds.
+BUCKETS = [
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0, 30.0, 60.0,
+]
+
+# Percentiles are computed over this many of the most recent samples.
+WINDOW = 1024
+
+# Used when a span happens outside of any command.
+NO_COMMAND = '-'
+
+_COMMAND: contextvars.ContextVar[str] = contextvars.ContextVar(
+    'f1bot_metrics_command', default=NO_COMMAND)
+
+
+@attrs.define()
+class Histogram:
+    # One count per BUCKETS entry, plus one for everything larger.
+    bucket_counts: list[int] = attrs.field(
+        factory=lambda: [0] * (len(BUCKETS) + 1))
+    count: int = 0
+    total_seconds: float = 0.0
+    recent: collections.deque = attrs.field(
+        factory=lambda: collections.deque(maxlen=WINDOW))
+
+    def observe(self, seconds: float):
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Returns the pct percentile of the recent samples, in seconds."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+        return ordered[index]
+
+
+@attrs.define()
+class PhaseStats:
+    command: str
+    phase: str
+    count: int
+    p50_seconds: float
+    p95_seconds: float
+    p99_seconds: float
+
+
+@attrs.frozen()
+class Sample:
+    """A value kept by another layer, e.g. a connection pool counter."""
+    # Exported as f1bot_{name}.
+    name: str
+    value: float
+    # 'counter' or 'gauge'.
+    kind: str
+    description: str
+
+
+# Returns the current samples of whatever it watches.
+Collector = Callable[[], list[Sample]]
+
+
+class Metrics:
+    """Thread-safe store of histograms keyed by (command, phase)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._errors: dict[tuple[str, str], int] = collections.Counter()
+        self._collectors: list[Collector] = []
+
+    def register_collector(self, collector: Collector):
+        """Adds collector's samples to samples() and the exported metrics.
+
+        This lets lower layers (e.g. the database engine) export their own
+        counters without this module needing to know about them.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def samples(self) -> list[Sample]:
+        with self._lock:
+            collectors = list(self._collectors)
+        return [sample for collector in collectors for sample in collector()]
+
+    def observe(self, command: str, phase: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((command, phase))
+            if histogram is None:
+                histogram = Histogram()
+                self._histograms[(command, phase)] = histogram
+            histogram.observe(seconds)
+
+    def count_error(self, command: str, kind: str):
+        with self._lock:
+            self._errors[(command, kind)] += 1
+
+    def phase_stats(self) -> list[PhaseStats]:
+        with self._lock:
+            return [
+                PhaseStats(
+                    command=command,
+                    phase=phase,
+                    count=histogram.count,
+                    p50_seconds=histogram.percentile(50),
+                    p95_seconds=histogram.percentile(95),
+                    p99_seconds=histogram.percentile(99))
+                for (command, phase), histogram in sorted(
+                    self._histograms.items())
+            ]
+
+    def errors(self) -> dict[tuple[str, str], int]:
+        with self._lock:
+            return dict(self._errors)
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = [
+            '# HELP f1bot_phase_seconds Time spent in each phase of a command.',
+            '# TYPE f1bot_phase_seconds histogram',
+        ]
+        with self._lock:
+            for (command, phase), histogram in sorted(self._histograms.items()):
+                labels = f'command="{_escape(command)}",phase="{_escape(phase)}"'
+                cumulative = 0
+                for bound, count in zip(
+                    BUCKETS + [float('inf')], histogram.bucket_counts
+                ):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    lines.append(
+                        f'f1bot_phase_seconds_bucket{{{labels},le="{le}"}} '
+                        f'{cumulative}')
+                lines.append(
+                    f'f1bot_phase_seconds_sum{{{labels}}} '
+                    f'{histogram.total_seconds:.6f}')
+                lines.append(
+                    f'f1bot_phase_seconds_count{{{labels}}} {histogram.count}')
+
+            lines += [
+                '# HELP f1bot_command_errors_total Commands that failed.',
+                '# TYPE f1bot_command_errors_total counter',
+            ]
+            for (command, kind), count in sorted(self._errors.items()):
+                lines.append(
+                    f'f1bot_command_errors_total{{command="{_escape(command)}",'
+                    f'kind="{_escape(kind)}"}} {count}')
+
+        for sample in self.samples():
+            lines += [
+                f'# HELP f1bot_{sample.name} {sample.description}',
+                f'# TYPE f1bot_{sample.name} {sample.kind}',
+                f'f1bot_{sample.name} {sample.value:g}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(label_value: str) -> str:
+    return (label_value.replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+METRICS = Metrics()
+
+
+@contextlib.contextmanager
+def command_context(command: str) -> Iterator[None]:
+    """Attributes spans recorded inside the block to command."""
+    token = _COMMAND.set(command)
+    try:
+        yield
+    finally:
+        _COMMAND.reset(token)
+
+
+def current_command() -> str:
+    return _COMMAND.get()
+
+
+@contextlib.contextmanager
+def span(phase: str, command: Optional[str] = None) -> Iterator[None]:
+    """Records how long the block takes as phase of the current command."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(
+            command or _COMMAND.get(), phase, time.perf_counter() - start)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        # Scrapes are frequent, don't fill the log with them.
+        pass
+
+
+def serve_http(port: int, host: str = '127.0.0.1') -> http.server.HTTPServer:
+    """Serves /metrics on a background thread."""
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, name='f1bot-metrics', daemon=True)
+    thread.start()
+    return server
+
+
+def maybe_serve_http() -> Optional[http.server.HTTPServer]:
+    """Serves /metrics if F1_BOT_METRICS_PORT is set."""
+    if not METRICS_PORT:
+        return None
+    return serve_http(int(METRICS_PORT))
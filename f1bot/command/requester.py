@@ -0,0 +1,13 @@
+import attrs
+
+from typing import Hashable, Optional
+
+@attrs.frozen()
+class Requester:
+    """Who asked for a command, used to share workers fairly."""
+    user: Hashable
+    # None for direct messages and the CLI.
+    guild: Optional[Hashable] = None
+
+# Used when the caller doesn't say who's asking.
+ANONYMOUS = Requester(user=None)
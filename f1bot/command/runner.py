@@ -1,10 +1,14 @@
+from . import metrics
 from .command_protocol import CommandValue
 from .command_registry import REGISTRY
 import attrs
+import contextlib
 import enum
 import traceback
 import io
 
+from typing import Any, Callable, ContextManager, Hashable, Optional
+
 import f1bot.argparser as argparser
 
 class CommandError(Exception):
@@ -19,6 +23,8 @@ class CommandError(Exception):
 class CommandStatus(enum.Enum):
     OK = 0
     INTERNAL_ERROR = 1
+    # The command wasn't run because too many requests were waiting.
+    BUSY = 2
 
 @attrs.define(frozen=True)
 class CommandResult:
@@ -33,17 +39,67 @@ class CommandResult:
     def ok(value: CommandValue) -> 'CommandResult':
         return CommandResult(status=CommandStatus.OK, value=value)
 
+    @staticmethod
+    def busy(value: CommandValue) -> 'CommandResult':
+        return CommandResult(status=CommandStatus.BUSY, value=value)
+
     def is_ok(self) -> bool:
         return self.status == CommandStatus.OK
 
+    def is_busy(self) -> bool:
+        return self.status == CommandStatus.BUSY
+
     def is_error(self) -> bool:
-        return self.status == CommandStatus.INTERNAL_ERROR
+        return self.status != CommandStatus.OK
+
+CommandScope = Callable[[], ContextManager[Any]]
+
+_COMMAND_SCOPES: list[CommandScope] = []
+
+def register_command_scope(scope: CommandScope):
+    """Registers a context manager factory entered around every command run.
+
+    This lets lower layers (e.g. the database engine) share per-request state
+    without the runner needing to know about them.
+    """
+    _COMMAND_SCOPES.append(scope)
 
 def run_command(args: list[str]) -> CommandResult:
-    try:
-        return _run_command(args)
-    except Exception as e:
-        return CommandResult.error(str(e))
+    name = args[0] if len(args) > 0 and args[0] in REGISTRY else metrics.NO_COMMAND
+    with metrics.command_context(name), metrics.span('total'):
+        try:
+            return _run_command(args)
+        except Exception as e:
+            metrics.METRICS.count_error(name, 'internal_error')
+            return CommandResult.error(str(e))
+
+def cache_key(args: list[str]) -> Optional[Hashable]:
+    """Returns a key for args' output if the command is cacheable.
+
+    Args naming the same thing (e.g. 'wdc' and 'drivers', or two spellings of
+    a race) get the same key. Returns None for commands that aren't cacheable
+    and for args that don't parse, which are left for run_command to report.
+    """
+    if len(args) == 0 or args[0] not in REGISTRY:
+        return None
+    if not REGISTRY.get(args[0]).manifest.cacheable:
+        return None
+    return normalize(args)
+
+def normalize(args: list[str]) -> Optional[Hashable]:
+    """Like cache_key, but for any command, cacheable or not."""
+    if len(args) == 0 or args[0] not in REGISTRY:
+        return None
+    entry = REGISTRY.get(args[0])
+    with metrics.command_context(entry.manifest.name), \
+            metrics.span('normalize'):
+        try:
+            parsed_args = argparser.get().parse_args(args)
+            return (
+                entry.manifest.name,
+                entry.command_constructor.normalize(parsed_args))
+        except Exception:
+            return None
 
 def _run_command(args: list[str]) -> CommandResult:
     """Looks up a command and runs it.
@@ -57,32 +113,47 @@ def _run_command(args: list[str]) -> CommandResult:
         return CommandResult.ok(show_help(args[1:]))
 
     try:
-        parsed_args = argparser.get().parse_args(args)
+        with metrics.span('parse'):
+            parsed_args = argparser.get().parse_args(args)
     except argparser.ArgumentError as e:
+        metrics.METRICS.count_error(metrics.current_command(), 'usage')
         if args[0] not in REGISTRY:
             return CommandResult.error(str(e))
         return CommandResult.ok(
             argparser.get_usage(REGISTRY.get(args[0]).parser))
 
 
-    command = REGISTRY.get(parsed_args.command).command_constructor
+    entry = REGISTRY.get(parsed_args.command)
+    name = entry.manifest.name
     try:
-        return CommandResult.ok(command().run(parsed_args))
+        # Importing the command can register more scopes (e.g. the database
+        # engine's), so this has to happen before they're entered.
+        with metrics.span('load'):
+            command = entry.command_constructor
+        with contextlib.ExitStack() as stack:
+            for scope in _COMMAND_SCOPES:
+                stack.enter_context(scope())
+            with metrics.span('run'):
+                value = command().run(parsed_args)
+            return CommandResult.ok(value)
     except CommandError as e:
+        metrics.METRICS.count_error(name, 'command_error')
         return CommandResult.error(
-            f"Failed to run command '{command.manifest().name}' with error:"
+            f"Failed to run command '{name}' with error:"
             f"\n{str(e)}")
 
     except Exception as e:
-
+        metrics.METRICS.count_error(name, 'internal_error')
         return CommandResult.error(
-            f"Internal error running command: {command.manifest().name}.\n\n"
+            f"Internal error running command: {name}.\n\n"
             f"{str(e)}\n{traceback.format_exc()}")
 
 def show_help(args: list[str]) -> str:
     if len(args) == 0:
         lines = ["Commands:"]
         for entry in REGISTRY.all():
+            if entry.manifest.admin_only:
+                continue
             lines.append(
                 f"  {entry.manifest.name} -- {entry.manifest.description}")
         return "\n".join(lines)
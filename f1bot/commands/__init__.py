@@ -1,5 +1,109 @@
-from .schedule import Schedule
-from .session_results import SessionResults
-from .standings import Standings
-from .teammate_delta import TeammateDelta
-from .upcoming import Upcoming
+"""Declares the bot's commands.
+
+Only manifests and argument parsers live here, so listing commands, showing
+help and parsing arguments are cheap. A command's module, along with heavy
+dependencies like pandas, fastf1 and the database engine, is imported the
+first time the command runs.
+"""
+from f1bot import command as cmd
+from f1bot.lib import parsers
+from f1bot.lib.session_types import SessionType
+
+import argparse
+
+_YEARS_HELP = "A year, a range like 2010-2020 or a list like 2019,2021."
+
+def _years_parser(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        'years', metavar='year', type=parsers.parse_years, help=_YEARS_HELP)
+
+cmd.declare(
+    cmd.Manifest(
+        name='schedule',
+        description="Show the results for a session.",
+        cacheable=True,
+    ),
+    'f1bot.commands.schedule:Schedule',
+    init_parser=_years_parser)
+
+def _results_parser(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        'years', metavar='year', type=parsers.parse_years, help=_YEARS_HELP)
+    parser.add_argument('weekend', type=str)
+    parser.add_argument('session_type', type=SessionType.parse)
+
+cmd.declare(
+    cmd.Manifest(
+        name='results',
+        description="Show the results for a session.",
+        cacheable=True,
+    ),
+    'f1bot.commands.session_results:SessionResults',
+    init_parser=_results_parser)
+
+def _standings_parser(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        'standings_type',
+        choices=['drivers', 'wdc', 'constructors', 'wcc'],
+        default='drivers',
+        help="Determines which type of standings to fetch")
+    parser.add_argument(
+        'years', metavar='year', type=parsers.parse_years, help=_YEARS_HELP)
+
+cmd.declare(
+    cmd.Manifest(
+        name='standings',
+        description="Returns the driver standings for the year.",
+        cacheable=True,
+    ),
+    'f1bot.commands.standings:Standings',
+    init_parser=_standings_parser)
+
+def _career_parser(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        'career_type',
+        choices=['driver', 'constructor'],
+        help="Whether name is a driver or a constructor.")
+    parser.add_argument('name', nargs='+')
+    parser.add_argument(
+        '--seasons', action='store_true',
+        help="Also show a season by season breakdown.")
+
+cmd.declare(
+    cmd.Manifest(
+        name='career',
+        description=(
+            "Career wins, poles, podiums, points, starts and DNFs for a "
+            "driver or constructor."),
+        cacheable=True,
+    ),
+    'f1bot.commands.career:Career',
+    init_parser=_career_parser)
+
+def _teammate_delta_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('session_type', choices=['race', 'qualifying'])
+
+cmd.declare(
+    cmd.Manifest(
+        name="teammate_delta",
+        description=(
+            "Average delta between teammates for a given session type."),
+        # A cold run loads every session since 2010 from fastf1. Later
+        # runs only load sessions the delta store doesn't have yet.
+        timeout=30 * 60,
+        max_concurrency=1,
+        cost=cmd.CostClass.HEAVY,
+        background=True,
+    ),
+    'f1bot.commands.teammate_delta:TeammateDelta',
+    init_parser=_teammate_delta_parser)
+
+cmd.declare(
+    cmd.Manifest(
+        name="upcoming",
+        description="Show the results for a session.",
+    ),
+    'f1bot.commands.upcoming:Upcoming')
+
+# Registered when its class is defined, see stats.py.
+from .stats import Stats
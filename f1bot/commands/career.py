@@ -0,0 +1,80 @@
+from f1bot import command as cmd
+from f1bot.mysql import ergast
+
+import argparse
+import pandas
+
+from typing import Hashable
+
+class Career(cmd.Command):
+    """Career totals for a driver or constructor.
+
+    Answered from the career tables init-ergast-db.py builds after every
+    load, so this is a couple of primary key lookups.
+    """
+
+    @classmethod
+    def normalize(cls, args: argparse.Namespace) -> Hashable:
+        query = ' '.join(args.name)
+        if args.career_type == 'driver':
+            entity_id = ergast.resolve_driver(query)
+        else:
+            entity_id = ergast.resolve_constructor(query)
+        # Names that don't resolve fail, which is quick without a cache.
+        if entity_id is None:
+            raise cmd.CommandError(f"Could not find '{query}'.")
+        return (args.career_type, entity_id, args.seasons)
+
+    def run(self, args: argparse.Namespace) -> cmd.CommandValue:
+        query = ' '.join(args.name)
+        if args.career_type == 'driver':
+            driver_id = ergast.resolve_driver(query)
+            if driver_id is None:
+                raise cmd.CommandError(f"Could not find driver '{query}'.")
+            career = ergast.get_driver_career(driver_id)
+            names = career['forename'] + ' ' + career['surname']
+            seasons = (
+                ergast.get_driver_seasons(driver_id)
+                if args.seasons else None)
+        else:
+            constructor_id = ergast.resolve_constructor(query)
+            if constructor_id is None:
+                raise cmd.CommandError(
+                    f"Could not find constructor '{query}'.")
+            career = ergast.get_constructor_career(constructor_id)
+            names = career['name']
+            seasons = (
+                ergast.get_constructor_seasons(constructor_id)
+                if args.seasons else None)
+
+        if career.empty:
+            raise cmd.CommandError(f"'{query}' has never started a race.")
+
+        summary = pandas.DataFrame({
+            'Name': names,
+            'Seasons': [
+                f'{first}-{last} ({count})' for first, last, count in zip(
+                    career['first_year'], career['last_year'],
+                    career['seasons'])
+            ],
+            'Starts': career['starts'],
+            'Wins': career['wins'],
+            'Podiums': career['podiums'],
+            'Poles': career['poles'],
+            'Points': career['points'],
+            'DNFs': career['dnfs'],
+            'Titles': career['championships'],
+        })
+        if seasons is None:
+            return summary
+
+        return [summary, pandas.DataFrame({
+            'Year': seasons['year'],
+            'Starts': seasons['starts'],
+            'Wins': seasons['wins'],
+            'Podiums': seasons['podiums'],
+            'Poles': seasons['poles'],
+            'Points': seasons['points'],
+            'DNFs': seasons['dnfs'],
+            'Position': seasons['championship_position'],
+        })]
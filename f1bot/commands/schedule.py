@@ -1,40 +1,33 @@
 from f1bot import command as cmd
-from f1bot.lib import parsers
+from f1bot.lib import frames
 from f1bot.mysql import ergast
 
 import argparse
 
 class Schedule(cmd.Command):
 
-    @classmethod
-    def manifest(cls) -> cmd.Manifest:
-        return cmd.Manifest(
-            name='schedule',
-            description="Show the results for a session.",
-        )
-
-    @classmethod
-    def init_parser(cls, parser: argparse.ArgumentParser):
-        parser.add_argument('year', type=parsers.parse_year)
-
-
     def run(self, args: argparse.Namespace) -> cmd.CommandValue:
-        year: int = args.year
+        years: list[int] = args.years
 
         none_df_error = cmd.CommandError(
             'Something went wrong. Didn\'t get a DataFrame '
             'after dropping "Time" column.')
 
+        schedules = {}
+        for year, season in ergast.get_schedules_for_years(
+                tuple(years)).items():
+            schedule = season.to_dataframe()[[
+                "Name", "Round", "Circuit", "Location", "Race"
+            ]]
 
-        schedule = ergast.get_schedule(year).to_dataframe()[[
-            "Name", "Round", "Circuit", "Location", "Race"
-        ]]
-
-        if schedule is None:
-            raise none_df_error
+            if schedule is None:
+                raise none_df_error
 
-        schedule["Race"] = schedule["Race"].apply(lambda x: x.date())
-        schedule.rename({"Race": "Date"}, inplace=True)
+            schedule["Race"] = schedule["Race"].apply(lambda x: x.date())
+            schedule.rename({"Race": "Date"}, inplace=True)
+            schedules[year] = schedule
 
-        return schedule
+        if len(years) == 1:
+            return schedules[years[0]]
+        return frames.by_year(schedules)
 
@@ -1,38 +1,71 @@
 from f1bot import command as cmd
-from f1bot.lib import parsers
-from f1bot.lib.sessions import SessionType
+from f1bot.lib import fmt, frames
+from f1bot.lib.session_types import SessionType
 from f1bot.mysql import ergast
 import argparse
+import pandas
+
+from typing import Hashable
 
 class SessionResults(cmd.Command):
     """Returns the session results for a particular session."""
 
     @classmethod
-    def manifest(cls) -> cmd.Manifest:
-        return cmd.Manifest(
-            name='results',
-            description="Show the results for a session.",
-        )
-
-    @classmethod
-    def init_parser(cls, parser: argparse.ArgumentParser):
-        parser.add_argument('year', type=parsers.parse_year)
-        parser.add_argument('weekend', type=str)
-        parser.add_argument('session_type', type=SessionType.parse)
+    def normalize(cls, args: argparse.Namespace) -> Hashable:
+        # Keyed by the races the weekend resolves to, not how it was spelled.
+        race_ids = tuple(
+            (year, ergast.resolve_fuzzy_race_query(year, args.weekend))
+            for year in args.years)
+        # Unless a year doesn't resolve: the reply names the weekend as typed,
+        # and misspellings mustn't all share a key.
+        if any(race_id is None for _, race_id in race_ids):
+            return (race_ids, args.session_type, args.weekend)
+        return (race_ids, args.session_type)
 
     def run(self, args: argparse.Namespace) -> cmd.CommandValue:
-        year: int = args.year
+        years: list[int] = args.years
         weekend: str = args.weekend
         session_type: SessionType = args.session_type
-        race_id = ergast.resolve_fuzzy_race_query(year, weekend)
-        if race_id is None:
+        if session_type is None:
+            raise cmd.CommandError("Unknown session type.")
+        if session_type not in (SessionType.RACE, SessionType.QUALIFYING):
             raise cmd.CommandError(
-                f'Could not find race \'{weekend}\' in {year}.')
+                "We don't support that command type yet.")
+
+        race_ids = {}
+        missing = []
+        for year in years:
+            race_id = ergast.resolve_fuzzy_race_query(year, weekend)
+            if race_id is None:
+                missing.append(str(year))
+            else:
+                race_ids[year] = race_id
+        not_found = (
+            f'Could not find race \'{weekend}\' in {", ".join(missing)}.')
+        if not race_ids:
+            raise cmd.CommandError(not_found)
+
+        # Every year's session comes back from a single query.
         if session_type == SessionType.RACE:
-            return ergast.get_race_session(race_id)
-        elif session_type == SessionType.QUALIFYING:
-            return ergast.get_qualifying_session(race_id)
-        elif session_type is None:
-            raise cmd.CommandError("Unknown session type.")
-        raise cmd.CommandError(
-            "We don't support that command type yet.")
+            sessions = ergast.get_race_sessions(tuple(race_ids.values()))
+        else:
+            sessions = {
+                race_id: format_qualifying(session)
+                for race_id, session in ergast.get_qualifying_sessions(
+                    tuple(race_ids.values())).items()
+            }
+
+        if len(years) == 1:
+            return sessions[race_ids[years[0]]]
+        results = frames.by_year(
+            {year: sessions[race_id] for year, race_id in race_ids.items()},
+            column='year')
+        if missing:
+            return [not_found, results]
+        return results
+
+def format_qualifying(session: pandas.DataFrame) -> pandas.DataFrame:
+    return session.assign(**{
+        q: session[q].map(fmt.format_lap_time)
+        for q in ['q1', 'q2', 'q3']
+    })
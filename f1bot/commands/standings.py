@@ -1,12 +1,14 @@
 from f1bot import command as cmd
-from f1bot.lib import parsers
 
+from f1bot.lib import frames
 from f1bot.mysql import ergast
 
 import argparse
 import enum
 import pandas
 
+from typing import Hashable
+
 class StandingsType(enum.Enum):
     CONSTRUCTORS = 0
     DRIVERS = 1
@@ -20,41 +22,44 @@ def parse_standing_type(arg: str) -> StandingsType:
     raise cmd.CommandError(f"Invalid argument: {arg}")
 
 def standings_from_ergast(
-    standings_type: StandingsType, year: int
-) -> pandas.DataFrame:
+    standings_type: StandingsType, years: list[int]
+) -> dict[int, pandas.DataFrame]:
     if standings_type == StandingsType.DRIVERS:
         # TODO: This should merge the forename and surname column into one.
-        return ergast.get_driver_standings(year).to_dataframe()
-    return ergast.get_constructor_standings(year).to_dataframe()
+        standings = ergast.get_driver_standings_for_years(tuple(years))
+    else:
+        standings = ergast.get_constructor_standings_for_years(tuple(years))
+    return {year: season.to_dataframe() for year, season in standings.items()}
 
 class Standings(cmd.Command):
 
     @classmethod
-    def manifest(cls) -> cmd.Manifest:
-        return cmd.Manifest(
-            name='standings',
-            description="Returns the driver standings for the year.",
-        )
-
-    @classmethod
-    def init_parser(cls, parser: argparse.ArgumentParser):
-        parser.add_argument(
-            'standings_type',
-            choices=['drivers', 'wdc', 'constructors', 'wcc'],
-            default='drivers',
-            help="Determines which type of standings to fetch")
-        parser.add_argument('year', type=parsers.parse_year)
+    def normalize(cls, args: argparse.Namespace) -> Hashable:
+        return (
+            parse_standing_type(args.standings_type), tuple(args.years))
 
     def run(self, args: argparse.Namespace) -> cmd.CommandValue:
         standings_type = parse_standing_type(args.standings_type)
 
-        year: int = args.year
-        if standings_type == StandingsType.CONSTRUCTORS and year < 1958:
-            raise cmd.CommandError(
-                "The constructors championship was not awarded until 1958.")
+        years: list[int] = args.years
+        not_awarded = "The constructors championship was not awarded until 1958"
+        dropped: list[str] = []
+        if standings_type == StandingsType.CONSTRUCTORS:
+            dropped = [str(year) for year in years if year < 1958]
+            years = [year for year in years if year >= 1958]
+            if not years:
+                raise cmd.CommandError(f"{not_awarded}.")
 
         # TODO: Handle the current year differently. The database will usually
         # be a little stale, but for standings we want to always include the
         # most up to date information. Fastf1 doesn't seem to provide this,
         # so we'll probably want to get it from ergast.
-        return standings_from_ergast(standings_type, year)
+        standings = standings_from_ergast(standings_type, years)
+        if len(years) == 1:
+            result = standings[years[0]]
+        else:
+            result = frames.by_year(standings)
+        if dropped:
+            return [f"{not_awarded}, so {', '.join(dropped)} were left out.",
+                    result]
+        return result
@@ -0,0 +1,68 @@
+from f1bot import command as cmd
+from f1bot.command import metrics
+
+import argparse
+
+class Stats(cmd.Command):
+    """Reports the latencies, errors and pool counters of this process.
+
+    This is cheap to import, so unlike the other commands it's registered
+    by defining the class rather than declared lazily.
+    """
+
+    @classmethod
+    def manifest(cls) -> cmd.Manifest:
+        return cmd.Manifest(
+            name='stats',
+            description="Show latency percentiles for each command phase.",
+            admin_only=True,
+        )
+
+    @classmethod
+    def init_parser(cls, parser: argparse.ArgumentParser):
+        # 'command' is taken by the subcommand's own name.
+        parser.add_argument(
+            'only', metavar='command', nargs='?',
+            help="Only show this command's phases.")
+
+    def run(self, args: argparse.Namespace) -> cmd.CommandValue:
+        import pandas
+
+        phases = [
+            stats for stats in metrics.METRICS.phase_stats()
+            if args.only is None or stats.command == args.only
+        ]
+        if not phases:
+            return "No commands have run yet."
+
+        def ms(seconds: list[float]) -> list[float]:
+            return [round(s * 1000, 2) for s in seconds]
+
+        latencies = pandas.DataFrame({
+            'Command': [s.command for s in phases],
+            'Phase': [s.phase for s in phases],
+            'Count': [s.count for s in phases],
+            'p50 (ms)': ms([s.p50_seconds for s in phases]),
+            'p95 (ms)': ms([s.p95_seconds for s in phases]),
+            'p99 (ms)': ms([s.p99_seconds for s in phases]),
+        })
+
+        tables = [latencies]
+        errors = {
+            key: count for key, count in metrics.METRICS.errors().items()
+            if args.only is None or key[0] == args.only
+        }
+        if errors:
+            tables.append(pandas.DataFrame({
+                'Command': [command for command, _ in errors],
+                'Error': [kind for _, kind in errors],
+                'Count': list(errors.values()),
+            }))
+        # Not per command, so only shown in the full report.
+        samples = metrics.METRICS.samples()
+        if samples and args.only is None:
+            tables.append(pandas.DataFrame({
+                'Metric': [s.name for s in samples],
+                'Value': [round(s.value, 4) for s in samples],
+            }))
+        return tables[0] if len(tables) == 1 else tables
@@ -1,221 +1,124 @@
-from fastf1.core import SessionResults, Session
+from fastf1.core import Session
 from collections import defaultdict
-from attrs import define
-from typing import Optional
+from f1bot.lib import delta_store, teammate_deltas
 from f1bot.lib.sessions import SessionLoader, SessionPredicate, SessionType
 from f1bot import command as cmd
+from f1bot.command import jobs
 
 import argparse
+import logging
+import os
+import pandas
 
-DriverAbbrev = str
-DriverNum = str
 MINIMUM_SESSION_THRESHOLD = 18
 
+# How many sessions to load at once, and whether to use processes (better when
+# fastf1's cache is warm and loading is mostly parsing) instead of threads.
+SESSION_LOAD_WORKERS = int(os.getenv('F1_BOT_SESSION_LOAD_WORKERS', '8'))
+SESSION_LOAD_PROCESSES = os.getenv('F1_BOT_SESSION_LOAD_PROCESSES', '') == '1'
 
-class Average:
-    def __init__(self):
-        self.total = 0
-        self.count = 0
+YEARS = range(2010, 2022)
 
-    def add(self, num: int):
-        self.total += num
-        self.count += 1
+# Sessions that load without errors but have bad data.
+QUALIFYING_IGNORE = [
+    SessionPredicate(
+        name="Russian",
+        year=2018,
+        session=SessionType.QUALIFYING
+    ),
+    SessionPredicate(
+        name="Romagna",
+        year=2020,
+        session=SessionType.QUALIFYING
+    )
+]
 
-    def compute(self) -> float:
-        return self.total / self.count
+STORE = delta_store.DeltaStore()
 
-
-@define
-class DerivedDriverSessionData:
-    """Collection of driver data.
-
-    Some of this is pulled straight from fastf1.core.SessionResults, other
-    pieces are derived.
-    """
-
-    # SessionResults keys drivers by the string repr of their number
-    number: str
-
-    # Driver abbreviation, e.g. VER, HAM, GAS
-    abbreviation: str
-
-    full_name: str
-
-    # The integer position they finished in.
-    finish_pos: int
-
-    # The number of positions that they are ahead of their teammate.
-    # If driver A finishes 1st and driver B finishes 4th, their deltas are 3
-    # and -3, respectively.
-    teammate_delta: Optional[int] = None
-
-@define
-class AggregateDriverData:
-    name: str
-    abbreviation: str
-    avg_teammate_delta: float
-    num_sessions: int
+LOGGER = logging.getLogger(__name__)
 
 
 class TeammateDelta(cmd.Command):
-    @classmethod
-    def manifest(cls) -> cmd.Manifest:
-        return cmd.Manifest(
-            name="teammate_delta",
-            description=(
-                "Average delta between teammates for a given session type."),
-            disabled=True,
-        )
-
-    @classmethod
-    def init_parser(cls, parser: argparse.ArgumentParser):
-        parser.add_argument('session_type', choices=['race', 'qualifying'])
-
-    def run(self, args: argparse.Namespace) -> str:
 
+    def run(self, args: argparse.Namespace) -> cmd.CommandValue:
         if args.session_type == 'race':
-            self.race()
-        elif args.session_type == 'qualifying':
-            self.qualifying()
-
-        # TODO: Make these return the real output.
-        return ""
-
-
-    def get_teammates(
-        self, session_results: SessionResults
-    ) -> list[tuple[DriverNum, DriverNum]]:
-        """Returns pairings of driver abbrevs who were teammates in this session.
-
-        If a team ran only one driver (or >2) they'll be ommitted from the results.
-        
-        NOTE: Driver numbers are not stable across seasons, so this should only be
-        used when considering data from a single session.
-        """
-        teams = defaultdict(lambda: [])
-        for (driver_num, team_name) in session_results.TeamName.items():
-            teams[team_name].append(driver_num)
-
-        # Remove teams with fewer than 2 drivers (no teammates to consider)
-        driver_count = {team: len(drivers) for team, drivers in teams.items()}
-        for team_name, num_drivers in driver_count.items():
-            if num_drivers != 2:
-                teams.pop(team_name)
-
-        return [tuple(drivers) for drivers in teams.values()]
-
-    def compute_teammate_deltas(
-        self, session_results: SessionResults
-    ) -> list[DerivedDriverSessionData]:
-        """Converts session results to a numeric teammate delta map.
-
-        Args:
-            session_results: A session result for a single race.
-        Returns:
-            A mapping of driver number to the finishing delta to their teammate.
-            A positive delta indicates they were ahead, a negative delta indicates
-            they were behind.
-        """
-        def to_derived(driver_num: str) -> DerivedDriverSessionData:
-            return DerivedDriverSessionData(
-                number=driver_num,
-                full_name=session_results.FullName[driver_num],
-                abbreviation=session_results.Abbreviation[driver_num],
-                finish_pos=int(session_results.Position[driver_num]))
-
-
-        teammates = []
-        for d1, d2 in self.get_teammates(session_results):
-            teammates.append((to_derived(d1), to_derived(d2)))
-
-        for d1, d2 in teammates:
-            d1.teammate_delta = d2.finish_pos - d1.finish_pos
-            d2.teammate_delta = -d1.teammate_delta
-
-
-        return [driver for drivers in teammates for driver in drivers]
-
-    def compute_average_deltas_from_sessions(
-        self, sessions: list[Session]
-    ) -> dict[DriverAbbrev, AggregateDriverData]:
-        race_data = []
-        for session in sessions:
-            race_data.append(self.compute_teammate_deltas(session.results))
-
-        name_lookup = {}
-        for race in race_data:
-            for driver in race:
-                if driver.full_name in name_lookup:
-                    raise ValueError(f'Found duplicate driver code: {driver.full_name}')
-                name_lookup[driver.abbreviation] = driver.full_name
-
-        # maps driver abbreviation to average
-        delta_averages: dict[str, Average] = defaultdict(lambda: Average())
-
-        for race in race_data:
-            for driver in race:
-                delta_averages[driver.abbreviation].add(driver.teammate_delta)
-
-        average_deltas = {
-            abbrev: AggregateDriverData(
-                abbreviation=abbrev,
-                name=name_lookup[abbrev],
-                avg_teammate_delta=avg.compute(),
-                num_sessions=avg.count
-            )
-            for abbrev, avg in delta_averages.items()
-            if avg.count > MINIMUM_SESSION_THRESHOLD
-        }
-        return average_deltas
-
-
-    def race(self):
-        session_loader = SessionLoader(
-                session_types=[SessionType.RACE], laps=True)
-        sessions = session_loader.load_for_years(range(2010, 2022))
-
-        driver_averages: dict[DriverAbbrev, AggregateDriverData] = (
-            self.compute_average_deltas_from_sessions(sessions))
-
-        sorted_averages = sorted(
-            driver_averages.values(),
-            key=lambda dd: dd.avg_teammate_delta,
-            reverse=True)
-
-        for idx, data in enumerate(sorted_averages):
-            print(f'{idx+1}: {data.name} \n\tAvg: {data.avg_teammate_delta:7.4f}, #Sess: {data.num_sessions}')
-
-        print(f'Encountered {len(session_loader.corrupted_sessions())} errors.')
-
-    def qualifying(self):
-        ignore = [
-            SessionPredicate(
-                name="Russian",
-                year=2018,
-                session=SessionType.QUALIFYING
-            ),
-            SessionPredicate(
-                name="Romagna",
-                year=2020,
-                session=SessionType.QUALIFYING
-            )
-        ]
-        session_loader = SessionLoader(
+            loader = SessionLoader(
+                session_types=[SessionType.RACE],
+                laps=True,
+                workers=SESSION_LOAD_WORKERS,
+                use_processes=SESSION_LOAD_PROCESSES)
+            session_type = SessionType.RACE
+        else:
+            loader = SessionLoader(
                 session_types=[SessionType.QUALIFYING],
                 laps=True,
-                ignore=ignore)
-
-        sessions: list[Session] = session_loader.load_for_years(list(range(2010, 2022)))
-
-        driver_averages: dict[DriverAbbrev, AggregateDriverData] = (
-            self.compute_average_deltas_from_sessions(sessions))
-
-        sorted_averages = sorted(
-            driver_averages.values(),
-            key=lambda dd: dd.avg_teammate_delta,
-            reverse=True)
-
-        for idx, data in enumerate(sorted_averages):
-            print(f'{idx+1}: {data.name} \n\tAvg: {data.avg_teammate_delta:7.4f}, #Sess: {data.num_sessions}')
-
-        print(f'Encountered {len(session_loader.corrupted_sessions())} errors.')
+                ignore=QUALIFYING_IGNORE,
+                workers=SESSION_LOAD_WORKERS,
+                use_processes=SESSION_LOAD_PROCESSES)
+            session_type = SessionType.QUALIFYING
+
+        self.update_store(loader, session_type)
+        summary = teammate_deltas.aggregate(
+            STORE.load(session_type.value, YEARS),
+            min_sessions=MINIMUM_SESSION_THRESHOLD)
+
+        return pandas.DataFrame(
+            {
+                'Driver': summary['name'].astype(str).to_numpy(),
+                'Avg. Delta': summary['mean_delta'].round(4).to_numpy(),
+                'Median': summary['median_delta'].to_numpy(),
+                'Lap Delta %': summary['mean_lap_delta_pct'].round(3).to_numpy(),
+                'Sessions': summary['sessions'].to_numpy(),
+            },
+            index=range(1, len(summary) + 1))
+
+    def update_store(self, loader: SessionLoader, session_type: SessionType):
+        """Computes and saves deltas for sessions the store doesn't have.
+
+        Sessions are loaded a season at a time so that progress is saved even
+        if a cold run gets cut off.
+        """
+        def key(session: Session) -> delta_store.SessionKey:
+            return delta_store.SessionKey(
+                year=int(session.event.year),
+                round=int(session.event.RoundNumber),
+                session_type=session_type.value)
+
+        unloaded = {
+            key(session): session
+            for session in loader.unloaded_sessions_for_years(YEARS)
+        }
+        by_year: dict[int, list[Session]] = defaultdict(list)
+        for missing in STORE.missing(unloaded.keys()):
+            by_year[missing.year].append(unloaded[missing])
+
+        # When run as a job, progress is reported across every year at once.
+        report = jobs.progress_callback()
+        total = sum(len(sessions) for sessions in by_year.values())
+        done = 0
+        for year in sorted(by_year):
+            if report is not None:
+                loader.progress = (
+                    lambda completed, _, done=done: report(
+                        done + completed, total))
+            loaded = loader.load_sessions(by_year[year])
+            done += len(by_year[year])
+            if not loaded:
+                continue
+            keys = [key(session) for session in loaded]
+            drivers = pandas.concat(
+                [
+                    teammate_deltas.driver_frame(
+                        session.results, session.laps).assign(
+                            year=k.year,
+                            round=k.round,
+                            session_type=k.session_type)
+                    for k, session in zip(keys, loaded)
+                ],
+                ignore_index=True)
+            STORE.save(keys, teammate_deltas.compute_deltas(drivers))
+
+        # Corrupted sessions aren't saved, so they're retried on the next run.
+        corrupted = len(loader.corrupted_sessions())
+        if corrupted:
+            LOGGER.warning('%d sessions failed to load.', corrupted)
@@ -1,5 +1,5 @@
 from f1bot import command as cmd
-from f1bot.mysql import ergast
+from f1bot.mysql import ergast, generation
 from f1bot.data.schedule import Row as ScheduleRow
 
 import pandas
@@ -7,34 +7,138 @@ import pytz
 import attrs
 
 import argparse
+import bisect
 import datetime as dt
+import logging
+import os
+import threading
 
+from typing import Optional
 
-class Upcoming(cmd.Command):
-
-    @classmethod
-    def manifest(cls) -> cmd.Manifest:
-        return cmd.Manifest(
-            name="upcoming",
-            description="Show the results for a session.",
-        )
-
-    def run(self, _args: argparse.Namespace) -> cmd.CommandValue:
-        # The schedule is ordered by date
-        schedule = ergast.get_schedule(dt.date.today().year)
+LOGGER = logging.getLogger(__name__)
 
-        # The first race we find that hasn't happened yet must be the next one.
-        for event in schedule.rows:
-            start_time = event.race
-            has_happened = start_time < dt.datetime.now()
-            if not has_happened:
-                return format_event(event)
+# The index is rebuilt at least this often, and otherwise whenever a race
+# starts or the database is rebuilt.
+REFRESH_SECONDS = float(os.getenv('F1_BOT_UPCOMING_REFRESH_SECONDS', '3600'))
 
-        raise cmd.CommandError(
-            "Couldn't find an event that hasn't happened yet.")
 
+class Upcoming(cmd.Command):
 
-def format_event(event: ScheduleRow) -> cmd.CommandValue:
+    def run(self, _args: argparse.Namespace) -> cmd.CommandValue:
+        event = INDEX.next_event(utcnow())
+        if event is None:
+            raise cmd.CommandError(
+                "Couldn't find an event that hasn't happened yet.")
+        header, body = event
+        return [header, body.copy()]
+
+
+def utcnow() -> dt.datetime:
+    # Schedule times are naive UTC.
+    return dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+
+
+FormattedEvent = tuple[str, pandas.DataFrame]
+
+
+@attrs.frozen()
+class _Index:
+    generation: str
+    year: int
+    # Race start times in order, and each race's formatted event.
+    starts: list[dt.datetime]
+    events: list[FormattedEvent]
+
+
+class UpcomingIndex:
+    """This and next season's races, formatted ahead of time.
+
+    A background thread rebuilds the index as each race starts, so lookups
+    are a binary search over start times. Lookups only touch the database if
+    it was rebuilt since the index was.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[_Index] = None
+        self._refresher: Optional[threading.Thread] = None
+
+    def next_event(self, now: dt.datetime) -> Optional[FormattedEvent]:
+        index = self._get(now)
+        # A race that starts right now hasn't happened yet.
+        i = bisect.bisect_left(index.starts, now)
+        if i == len(index.starts):
+            return None
+        return index.events[i]
+
+    def _get(self, now: dt.datetime) -> _Index:
+        index = self._index
+        if index is None or self._is_stale(index, now):
+            with self._lock:
+                if self._index is None or self._is_stale(self._index, now):
+                    self._index = _build(now.year)
+                index = self._index
+                self._start_refresher()
+        return index
+
+    @staticmethod
+    def _is_stale(index: _Index, now: dt.datetime) -> bool:
+        return (
+            index.generation != generation.current() or index.year != now.year)
+
+    def _start_refresher(self):
+        if self._refresher is None:
+            self._refresher = threading.Thread(
+                target=self._refresh_forever, name='f1bot-upcoming',
+                daemon=True)
+            self._refresher.start()
+
+    def _refresh_forever(self):
+        while True:
+            now = utcnow()
+            index = self._index
+            wait = REFRESH_SECONDS
+            if index is not None:
+                i = bisect.bisect_left(index.starts, now)
+                if i < len(index.starts):
+                    wait = min(
+                        wait, (index.starts[i] - now).total_seconds() + 1)
+            threading.Event().wait(wait)
+
+            try:
+                index = _build(utcnow().year)
+            except Exception:
+                # Lookups rebuild the index themselves if it's stale, so just
+                # try again later.
+                LOGGER.exception('Refreshing the upcoming index failed')
+                continue
+            with self._lock:
+                self._index = index
+
+
+def _build(year: int) -> _Index:
+    loaded_generation = generation.current()
+    # Next season is included so there's an answer after the last race.
+    schedules = ergast.get_schedules_for_years((year, year + 1))
+    rows = sorted(
+        (
+            event
+            for schedule in schedules.values()
+            for event in schedule.rows
+            if event.race is not None
+        ),
+        key=lambda event: event.race)
+    return _Index(
+        generation=loaded_generation,
+        year=year,
+        starts=[event.race for event in rows],
+        events=[format_event(event) for event in rows])
+
+
+INDEX = UpcomingIndex()
+
+
+def format_event(event: ScheduleRow) -> FormattedEvent:
     header = f"Round {event.round_num}: {event.race_name} -- {event.circuit}"
 
     body_columns = [
@@ -55,7 +159,7 @@ def format_event(event: ScheduleRow) -> cmd.CommandValue:
 
     body = pandas.DataFrame(data=rows, columns=body_columns)
 
-    return [header, body]
+    return header, body
 
 @attrs.define()
 class DateTimeInfo:
@@ -69,17 +173,22 @@ class DateTimeInfo:
     def none(cls) -> 'DateTimeInfo':
         return DateTimeInfo(date="N/A", pt="N/A", mt="N/A", ct="N/A", et="N/A")
 
-def get_event_times(event_time: dt.datetime) -> DateTimeInfo:
+PACIFIC = pytz.timezone("US/Pacific")
+MOUNTAIN = pytz.timezone("US/Mountain")
+CENTRAL = pytz.timezone("US/Central")
+EASTERN = pytz.timezone("US/Eastern")
+
+def get_event_times(event_time: Optional[dt.datetime]) -> DateTimeInfo:
     """Returns formatted timezone dates and times for the specified datetime."""
 
-    if event_time is None or event_time is None:
+    if event_time is None:
         return DateTimeInfo.none()
 
     utc = event_time.replace(tzinfo=dt.timezone.utc)
-    pt = utc.astimezone(tz=pytz.timezone("US/Pacific"))
-    mt = utc.astimezone(tz=pytz.timezone("US/Mountain"))
-    ct = utc.astimezone(tz=pytz.timezone("US/Central"))
-    et = utc.astimezone(tz=pytz.timezone("US/Eastern"))
+    pt = utc.astimezone(tz=PACIFIC)
+    mt = utc.astimezone(tz=MOUNTAIN)
+    ct = utc.astimezone(tz=CENTRAL)
+    et = utc.astimezone(tz=EASTERN)
 
     time_format = "%-I:%M %p" # like "1:42 AM"
 
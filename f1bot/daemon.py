@@ -0,0 +1,146 @@
+"""Serves commands over a Unix domain socket.
+
+Starting cli.py means importing pandas (and often fastf1), building the
+argument parsers and connecting to the database. `cli.py --serve` pays those
+costs once in a long running process, and later cli.py invocations forward
+their arguments to it and print what comes back.
+
+The protocol is one line of JSON each way: {"argv": [...]} from the client,
+and {"ok": bool, "output": str} from the server, with the output already
+rendered as text.
+
+Only the client half runs on every cli.py invocation, so this module must
+stay cheap to import.
+"""
+import json
+import os
+import socket
+import socketserver
+
+from typing import Optional
+
+import attrs
+
+# Relative paths (like the default) are resolved against the working
+# directory, just like .f1-cache and the SQLite database.
+SOCKET_PATH = os.getenv('F1_BOT_DAEMON_SOCKET', '.f1bot.sock')
+
+
+@attrs.define()
+class Response:
+    ok: bool
+    output: str
+
+
+def request(argv: list[str], path: str = SOCKET_PATH) -> Optional[Response]:
+    """Runs a command on the daemon.
+
+    Returns:
+        The daemon's response, or None if no daemon is listening on path.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+    with sock, sock.makefile('rwb') as stream:
+        stream.write(json.dumps({'argv': argv}).encode('utf-8') + b'\n')
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError('The daemon closed the connection.')
+    response = json.loads(line)
+    return Response(ok=response['ok'], output=response['output'])
+
+
+def run_local(argv: list[str]) -> Response:
+    """Runs a command in this process, the same way the daemon would."""
+    import f1bot
+    import f1bot.commands
+
+    f1bot.init()
+    return _execute(argv)
+
+
+def _execute(argv: list[str]) -> Response:
+    from f1bot import command as cmd
+    from f1bot.command import metrics
+    from f1bot.lib import render
+
+    result = cmd.run_command(argv)
+    manifest = cmd.find_manifest(argv[0]) if len(argv) > 0 else None
+    with metrics.span(
+            'format', command=manifest.name if manifest else metrics.NO_COMMAND):
+        output = render.to_text(result.value)
+    return Response(ok=result.is_ok(), output=output)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            argv = json.loads(self.rfile.readline())['argv']
+            if not all(isinstance(arg, str) for arg in argv):
+                raise ValueError('argv must be a list of strings.')
+            response = _execute(argv)
+        except (ValueError, KeyError, TypeError) as e:
+            response = Response(ok=False, output=f'Bad request: {e}')
+        self.wfile.write(
+            json.dumps(attrs.asdict(response)).encode('utf-8') + b'\n')
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    # Don't let a stuck command keep the daemon from shutting down.
+    daemon_threads = True
+
+
+def _remove_stale_socket(path: str):
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        # Left behind by a daemon that didn't shut down cleanly.
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f'A daemon is already listening on {path}.')
+
+
+def _preload():
+    """Imports every command up front so the first request is fast too."""
+    from f1bot.command.command_registry import REGISTRY
+
+    for entry in REGISTRY.all():
+        entry.command_constructor
+
+
+def serve(path: str = SOCKET_PATH):
+    """Serves commands on path until interrupted."""
+    import f1bot
+    import f1bot.commands
+    from f1bot.command import metrics
+
+    f1bot.init()
+    metrics.maybe_serve_http()
+    _preload()
+    _remove_stale_socket(path)
+
+    # Only the user running the daemon may connect to it.
+    old_umask = os.umask(0o177)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+
+    print(f'Serving commands on {path}.')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
@@ -1,3 +1,5 @@
+from f1bot.command import metrics
+
 import attr
 import pandas
 import datetime as dt
@@ -32,26 +34,46 @@ class Row:
             "FP1"
         ]
 
-    def to_series(self) -> pandas.Series:
-        return pandas.Series(data={
-            "Name": self.race_name,
-            "Round": self.round_num,
-            "Circuit": self.circuit,
-            "Location": self.location,
-            "Race": self.race,
-            "Sprint": self.sprint,
-            "Qualifying": self.qualifying,
-            "FP3": self.fp3,
-            "FP2": self.fp2,
-            "FP1": self.fp1,
-        })
-
 @attr.define()
 class Schedule:
-    rows: list[Row]
+    """A season's schedule, stored column by column.
+
+    Every list holds one entry per event, in round order.
+    """
+    race_names: list[str]
+    round_nums: list[int]
+    circuits: list[str]
+    locations: list[str]
+    race: list[dt.datetime]
+    sprint: list[Optional[dt.datetime]]
+    qualifying: list[Optional[dt.datetime]]
+    fp3: list[Optional[dt.datetime]]
+    fp2: list[Optional[dt.datetime]]
+    fp1: list[Optional[dt.datetime]]
+
+    @property
+    def rows(self) -> list[Row]:
+        return [
+            Row(*values) for values in zip(
+                self.race_names, self.round_nums, self.circuits,
+                self.locations, self.race, self.sprint, self.qualifying,
+                self.fp3, self.fp2, self.fp1)
+        ]
 
     def to_dataframe(self) -> pandas.DataFrame:
-        return pandas.DataFrame(
-            columns=Row.keys(),
-            data=(r.to_series() for r in self.rows)
-        )
+        def times(values: list[Optional[dt.datetime]]) -> pandas.Series:
+            return pandas.Series(values, dtype='datetime64[ns]')
+
+        with metrics.span('dataframe'):
+            return pandas.DataFrame({
+                "Name": pandas.Series(self.race_names, dtype=object),
+                "Round": pandas.Series(self.round_nums, dtype='int64'),
+                "Circuit": pandas.Series(self.circuits, dtype=object),
+                "Location": pandas.Series(self.locations, dtype=object),
+                "Race": times(self.race),
+                "Sprint": times(self.sprint),
+                "Qualifying": times(self.qualifying),
+                "FP3": times(self.fp3),
+                "FP2": times(self.fp2),
+                "FP1": times(self.fp1),
+            }, columns=Row.keys())
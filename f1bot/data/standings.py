@@ -1,3 +1,5 @@
+from f1bot.command import metrics
+
 import attr
 import pandas
 
@@ -11,20 +13,27 @@ class Row:
     def keys(cls) -> list[str]:
         return ["Name", "Position", "Points"]
 
-    def to_series(self) -> pandas.Series:
-        return pandas.Series(data={
-            "Name": self.name,
-            "Position": self.position,
-            "Points": self.points,
-        })
-
 
 @attr.define()
 class Standings:
-    rows: list[Row]
+    """Championship standings, stored column by column."""
+    names: list[str]
+    positions: list[int]
+    points: list[float]
+
+    @property
+    def rows(self) -> list[Row]:
+        return [
+            Row(*values)
+            for values in zip(self.names, self.positions, self.points)
+        ]
 
     def to_dataframe(self) -> pandas.DataFrame:
-        return pandas.DataFrame(
-            columns=Row.keys(),
-            data=(r.to_series() for r in self.rows)
-        )
+        with metrics.span('dataframe'):
+            return pandas.DataFrame({
+                "Name": pandas.Series(self.names, dtype=object),
+                # Nullable, since drivers excluded from a championship have no
+                # position.
+                "Position": pandas.Series(self.positions, dtype='Int64'),
+                "Points": pandas.Series(self.points, dtype='float64'),
+            }, columns=Row.keys())
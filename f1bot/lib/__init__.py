@@ -1,3 +1,21 @@
-from .sessions import SessionLoader, SessionType, SessionPredicate
-from . import json, parsers, sessions, fmt
+import importlib
 
+from typing import Any
+
+from .session_types import SessionType
+
+# These pull in fastf1 and pandas, so they're only imported when used.
+_LAZY_SUBMODULES = {'fmt', 'frames', 'json', 'parsers', 'sessions'}
+_LAZY_ATTRIBUTES = {
+    'SessionLoader': 'sessions',
+    'SessionPredicate': 'sessions',
+}
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(
+            f'{__name__}.{_LAZY_ATTRIBUTES[name]}')
+        return getattr(module, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
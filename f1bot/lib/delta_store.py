@@ -0,0 +1,131 @@
+"""Local store of per-session teammate deltas.
+
+Results from past sessions never change, so once a session's teammate deltas
+have been computed they're saved here and the session never has to be loaded
+from fastf1 again.
+"""
+import os
+
+from f1bot.lib import sqlite_db, teammate_deltas
+
+from typing import Iterable
+
+import attrs
+import pandas
+
+STORE_PATH = os.getenv(
+    'F1_BOT_DELTA_STORE', os.path.join('.f1-cache', 'teammate_deltas.sqlite'))
+
+# Bump whenever the tables below (or how their values are computed) change.
+# Stores written with a different version are wiped and rebuilt.
+SCHEMA_VERSION = 2
+
+# Columns of the DataFrames passed to save() and returned by load().
+COLUMNS = (
+    teammate_deltas.SESSION_COLUMNS
+    + teammate_deltas.DRIVER_COLUMNS
+    + teammate_deltas.DELTA_COLUMNS)
+
+# Repeated a lot across sessions, so categoricals save most of the memory.
+_CATEGORICAL_COLUMNS = ['session_type', 'abbreviation', 'full_name', 'team']
+
+_SCHEMA = [
+    # One row per session that has been processed, even if it produced no
+    # deltas (e.g. every team ran a single driver).
+    '''
+    CREATE TABLE sessions (
+      year INTEGER NOT NULL,
+      round INTEGER NOT NULL,
+      session_type TEXT NOT NULL,
+      PRIMARY KEY (year, round, session_type)
+    )
+    ''',
+    '''
+    CREATE TABLE deltas (
+      year INTEGER NOT NULL,
+      round INTEGER NOT NULL,
+      session_type TEXT NOT NULL,
+      number TEXT NOT NULL,
+      abbreviation TEXT NOT NULL,
+      full_name TEXT NOT NULL,
+      team TEXT NOT NULL,
+      finish_pos INTEGER NOT NULL,
+      best_lap REAL,
+      teammate_delta INTEGER NOT NULL,
+      lap_delta_pct REAL,
+      PRIMARY KEY (year, round, session_type, number)
+    )
+    ''',
+    'CREATE INDEX deltas_session_type_year ON deltas (session_type, year)',
+]
+
+
+@attrs.frozen()
+class SessionKey:
+    year: int
+    round: int
+
+    # A SessionType value, e.g. 'R' or 'Q'.
+    session_type: str
+
+
+class DeltaStore:
+    """SQLite backed store of teammate deltas keyed by SessionKey."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self._db = sqlite_db.VersionedDatabase(
+            path, SCHEMA_VERSION, _SCHEMA, tables=['deltas', 'sessions'])
+
+    def missing(self, keys: Iterable[SessionKey]) -> list[SessionKey]:
+        """Returns the keys that haven't been saved yet, in the given order."""
+        with self._db.connect() as conn:
+            stored = {
+                SessionKey(year, round_num, session_type)
+                for year, round_num, session_type in conn.execute(
+                    'SELECT year, round, session_type FROM sessions')
+            }
+        return [key for key in keys if key not in stored]
+
+    def save(self, keys: Iterable[SessionKey], deltas: pandas.DataFrame):
+        """Replaces the deltas stored for some sessions.
+
+        Args:
+            keys: The sessions the deltas were computed from. Sessions without
+                any rows in deltas are still marked as processed.
+            deltas: A DataFrame with COLUMNS, from
+                teammate_deltas.compute_deltas.
+        """
+        sessions = [(key.year, key.round, key.session_type) for key in keys]
+        # NaN isn't a valid SQLite value, None is stored as NULL.
+        rows = [
+            tuple(None if pandas.isna(v) else v for v in values)
+            for values in deltas[COLUMNS].astype(object).itertuples(
+                index=False, name=None)
+        ]
+        placeholders = ', '.join('?' * len(COLUMNS))
+        with self._db.connect() as conn:
+            conn.executemany(
+                'DELETE FROM deltas '
+                'WHERE year = ? AND round = ? AND session_type = ?',
+                sessions)
+            conn.executemany(
+                f'INSERT INTO deltas ({", ".join(COLUMNS)}) '
+                f'VALUES ({placeholders})',
+                rows)
+            conn.executemany(
+                'INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)', sessions)
+
+    def load(
+        self, session_type: str, years: Iterable[int]
+    ) -> pandas.DataFrame:
+        """Returns every stored delta for a session type and set of years."""
+        years = list(years)
+        placeholders = ', '.join('?' * len(years))
+        with self._db.connect() as conn:
+            deltas = pandas.read_sql_query(
+                f'SELECT {", ".join(COLUMNS)} FROM deltas '
+                f'WHERE session_type = ? AND year IN ({placeholders}) '
+                'ORDER BY year, round, number',
+                conn,
+                params=[session_type, *years])
+        return deltas.astype({c: 'category' for c in _CATEGORICAL_COLUMNS})
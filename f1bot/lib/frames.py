@@ -0,0 +1,12 @@
+import pandas
+
+def by_year(
+    frames: dict[int, pandas.DataFrame], column: str = 'Year'
+) -> pandas.DataFrame:
+    """Stacks one DataFrame per year into one with a leading year column."""
+    return pandas.concat(
+        [
+            frame.assign(**{column: year})[[column, *frame.columns]]
+            for year, frame in frames.items()
+        ],
+        ignore_index=True)
@@ -0,0 +1,83 @@
+import collections
+import sys
+import threading
+
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+import attrs
+
+V = TypeVar('V')
+
+
+@attrs.define()
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+
+class LRUCache(Generic[V]):
+    """A thread-safe least-recently-used cache bounded by an estimated size.
+
+    Entries are evicted oldest-first until the sum of sizeof(value) fits in
+    max_bytes. Values larger than the whole budget are never stored.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        sizeof: Callable[[V], int] = sys.getsizeof,
+    ):
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: collections.OrderedDict[
+            Hashable, tuple[V, int]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: Hashable) -> Optional[tuple[V]]:
+        """Returns a 1-tuple holding the cached value, or None on a miss.
+
+        The tuple lets callers cache None as a legitimate value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return (entry[0],)
+
+    def put(self, key: Hashable, value: V):
+        size = self._sizeof(value)
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._stats.size_bytes -= previous[1]
+
+            self._entries[key] = (value, size)
+            self._stats.size_bytes += size
+            while self._stats.size_bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._stats.size_bytes -= evicted_size
+                self._stats.evictions += 1
+            self._stats.entries = len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.size_bytes = 0
+            self._stats.entries = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return attrs.evolve(self._stats)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,11 @@
 from datetime import date
 from f1bot import command as cmd
 
+import os
+
+# The most seasons a single command can ask for.
+MAX_YEARS = int(os.getenv('F1_BOT_MAX_YEARS', '30'))
+
 def parse_year(s: str) -> int:
     if not s.isdigit():
         raise cmd.CommandError(f"Could not parse {s} as a year.")
@@ -10,3 +15,29 @@ def parse_year(s: str) -> int:
     if year > date.today().year:
         raise cmd.CommandError("That year hasn't happened yet.")
     return year
+
+def parse_years(s: str) -> list[int]:
+    """Parses a year, a range like 2010-2020, or a list like 2019,2021.
+
+    Lists can include ranges, e.g. 2008,2010-2012. Returns the years sorted
+    with duplicates removed.
+    """
+    too_many = cmd.CommandError(
+        f"Only {MAX_YEARS} years can be asked for at once.")
+
+    years: set[int] = set()
+    for part in s.split(','):
+        first, dash, last = part.partition('-')
+        if not dash:
+            years.add(parse_year(part))
+        else:
+            start, end = parse_year(first), parse_year(last)
+            if start > end:
+                raise cmd.CommandError(f"{part} isn't a valid range of years.")
+            # Checked first so a huge range is never materialized.
+            if end - start + 1 > MAX_YEARS:
+                raise too_many
+            years.update(range(start, end + 1))
+        if len(years) > MAX_YEARS:
+            raise too_many
+    return sorted(years)
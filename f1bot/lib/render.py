@@ -0,0 +1,42 @@
+"""Renders command output as text for terminals and Discord."""
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from f1bot.command import CommandValue
+
+def to_text(value: 'CommandValue') -> str:
+    """Renders a CommandValue, with a blank line between multiple values."""
+    values = value if isinstance(value, list) else [value]
+    return '\n\n'.join(_primitive_to_text(v) for v in values)
+
+def _primitive_to_text(value) -> str:
+    if isinstance(value, str):
+        # Skip importing pandas for plain text (e.g. help) output.
+        return value
+
+    import pandas
+
+    # By default pandas.DataFrame.__repr__ only prints out the first and last
+    # few columns if the max is above a threshold. We want to always see the
+    # results, though.
+    with pandas.option_context(
+        'display.max_rows', None,
+        'display.max_columns', None,
+        'display.width', None,
+    ):
+        if isinstance(value, pandas.DataFrame):
+            return value.to_string(index=False)
+        return str(value)
+
+def to_discord(value: 'CommandValue') -> str:
+    """Renders a single (non-list) CommandValue as a Discord message."""
+    if isinstance(value, str):
+        return f"```{value}```"
+
+    import pandas
+    import tabulate
+
+    if isinstance(value, pandas.DataFrame):
+        tabulated = tabulate.tabulate(value, headers='keys', showindex=False)
+        return f"```{tabulated}```"
+    return f"Error, unrecognized type: {type(value)}"
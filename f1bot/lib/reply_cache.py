@@ -0,0 +1,55 @@
+"""Caches the rendered replies of cacheable commands.
+
+Entries are keyed by runner.cache_key and dropped whenever the ergast
+database is rebuilt, so a repeated lookup is just a dict lookup.
+"""
+from f1bot.lib.lru import LRUCache
+from f1bot.mysql import generation
+
+import os
+import sys
+import threading
+
+from typing import Any, Hashable, Optional
+
+MAX_BYTES = int(os.getenv('F1_BOT_REPLY_CACHE_BYTES', str(4 * 1024 * 1024)))
+
+Messages = tuple[str, ...]
+
+
+def _sizeof(messages: Messages) -> int:
+    return sys.getsizeof(messages) + sum(sys.getsizeof(m) for m in messages)
+
+
+class ReplyCache:
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self._replies: LRUCache[Messages] = LRUCache(max_bytes, sizeof=_sizeof)
+        self._lock = threading.Lock()
+        self._generation = generation.current()
+
+    def _sync_generation(self):
+        current = generation.current()
+        if current == self._generation:
+            return
+        with self._lock:
+            if current != self._generation:
+                self._replies.clear()
+                self._generation = current
+
+    def key(self, normalized: Hashable) -> tuple[str, Any]:
+        """Pins normalized args to the current database.
+
+        Take the key before running the command, so a reply computed while
+        the database was being swapped out is never stored.
+        """
+        return (generation.current(), normalized)
+
+    def get(self, key: tuple[str, Any]) -> Optional[Messages]:
+        self._sync_generation()
+        cached = self._replies.get(key)
+        return None if cached is None else cached[0]
+
+    def put(self, key: tuple[str, Any], messages: Messages):
+        self._sync_generation()
+        if key[0] == self._generation:
+            self._replies.put(key, messages)
@@ -0,0 +1,17 @@
+import enum
+
+from typing import Optional
+
+class SessionType(enum.Enum):
+    FREE_PRACTICE_1 = 'FP1'
+    FREE_PRACTICE_2 = 'FP2'
+    FREE_PRACTICE_3 = 'FP3'
+    QUALIFYING = 'Q'
+    RACE = 'R'
+
+    @staticmethod
+    def parse(s: str) -> Optional['SessionType']:
+        for session_type in SessionType:
+            if s.upper() == session_type.value:
+                return session_type
+        return None
@@ -1,24 +1,16 @@
+import f1bot
 import fastf1
 
-from attrs import define
-from typing import Iterable
+from attrs import define, field
+from typing import Callable, Iterable, Optional
 from fastf1.core import Session
-import enum
-from typing import Optional
-
-class SessionType(enum.Enum):
-    FREE_PRACTICE_1 = 'FP1'
-    FREE_PRACTICE_2 = 'FP2'
-    FREE_PRACTICE_3 = 'FP3'
-    QUALIFYING = 'Q'
-    RACE = 'R'
-
-    @staticmethod
-    def parse(s: str) -> Optional['SessionType']:
-        for session_type in SessionType:
-            if s.upper() == session_type.value:
-                return session_type
-        return None
+from f1bot.lib.session_types import SessionType
+import concurrent.futures
+
+f1bot.enable_fastf1_cache()
+
+# Called with (completed, total) as sessions finish loading.
+ProgressCallback = Callable[[int, int], None]
 
 @define
 class SessionPredicate:
@@ -32,6 +24,24 @@ class SessionPredicate:
                 self.session.value == session.name)
 
 
+def _load_session(
+    session: Session, load_args: dict[str, bool]
+) -> tuple[Session, bool]:
+    """Loads a single session, returning whether it loaded cleanly.
+
+    This is a module level function so it can be sent to worker processes.
+    The session is returned because, in a worker process, the loaded copy is
+    a different object than the one we were given.
+    """
+    # Sometimes sessions have bad data from Ergast. We'll keep going and
+    # deal with them later.
+    try:
+        session.load(**load_args)
+    except ValueError:
+        return session, False
+    return session, True
+
+
 @define
 class SessionLoader:
     # Values like 'R', 'Q', etc. that fastf1 accepts as valid session types.
@@ -46,10 +56,19 @@ class SessionLoader:
     # Random sessions will have bad data which cause failures that are hard to
     # catch generically (e.g. a try/except), so this let's me selectively omit
     # races where I find issues.
-    ignore: list[SessionPredicate] = []
+    ignore: list[SessionPredicate] = field(factory=list)
 
-    _corrupted_sessions: list[Session] = []
-    _ignored_sessions: list[Session] = []
+    # Number of sessions to load at once. Loads that mostly wait on the
+    # network (cache misses) do well with threads; loads that mostly parse
+    # already cached data are CPU bound and do better with processes.
+    workers: int = 1
+    use_processes: bool = False
+
+    # Called with (completed, total) as each session finishes.
+    progress: Optional[ProgressCallback] = None
+
+    _corrupted_sessions: list[Session] = field(factory=list)
+    _ignored_sessions: list[Session] = field(factory=list)
 
     def corrupted_sessions(self) -> list[Session]:
         return self._corrupted_sessions
@@ -58,12 +77,28 @@ class SessionLoader:
         return self._ignored_sessions
 
     def load_for_years(self, years: Iterable[int]) -> list[Session]:
-        unloaded_sessions: list[Session] = []
-        for year in years:
-            unloaded_sessions.extend(
-                    get_unloaded_sessions_for_year(year, self.session_types))
-        
-        return self._safe_load(unloaded_sessions)
+        return self._safe_load(self.unloaded_sessions_for_years(years))
+
+    def load_sessions(self, sessions: Iterable[Session]) -> list[Session]:
+        """Loads sessions from e.g. unloaded_sessions_for_years."""
+        return self._safe_load(sessions)
+
+    def unloaded_sessions_for_years(
+        self, years: Iterable[int]
+    ) -> list[Session]:
+        """Lists the sessions for each year without loading them.
+
+        Fetching each year's event schedule is I/O bound, so it's always done
+        on threads.
+        """
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers
+        ) as pool:
+            per_year = pool.map(
+                lambda year: get_unloaded_sessions_for_year(
+                    year, self.session_types),
+                years)
+            return [session for sessions in per_year for session in sessions]
 
     def load_for_weekend(self, year: int, weekend: str) -> list[Session]:
         unloaded_sessions: list[Session] = []
@@ -72,32 +107,64 @@ class SessionLoader:
                 fastf1.get_session(year, weekend, session_type.value))
         return self._safe_load(unloaded_sessions)
 
+    def _executor(self) -> concurrent.futures.Executor:
+        if self.use_processes:
+            return concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers)
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
 
     def _safe_load(
         self, sessions: Iterable[Session]
     ) -> list[Session]:
-        """Loads sessions and silences API errors that are encountered."""
-        loaded_sessions = []
+        """Loads sessions and silences API errors that are encountered.
+
+        Sessions are returned in the order they were given, no matter the
+        order they finish loading in.
+        """
+        to_load: list[Session] = []
         for session in sessions:
             if any(pred.matches(session) for pred in self.ignore):
                 self._ignored_sessions.append(session)
                 continue
+            to_load.append(session)
+
+        load_args = dict(
+            laps=self.laps,
+            telemetry=self.telemetry,
+            weather=self.weather,
+            livedata=self.livedata)
+
+        results: list[Optional[tuple[Session, bool]]] = [None] * len(to_load)
+        if self.workers <= 1:
+            for idx, session in enumerate(to_load):
+                results[idx] = _load_session(session, load_args)
+                self._report_progress(idx + 1, len(to_load))
+        else:
+            with self._executor() as pool:
+                futures = {
+                    pool.submit(_load_session, session, load_args): idx
+                    for idx, session in enumerate(to_load)
+                }
+                for completed, future in enumerate(
+                    concurrent.futures.as_completed(futures), start=1
+                ):
+                    results[futures[future]] = future.result()
+                    self._report_progress(completed, len(to_load))
 
-            # Sometimes sessions have bad data from Ergast. We'll keep going
-            # and deal with them later.
-            try:
-                session.load(
-                    laps=self.laps,
-                    telemetry=self.telemetry,
-                    weather=self.weather,
-                    livedata=self.livedata
-                )
-            except ValueError:
+        loaded_sessions = []
+        for result in results:
+            assert result is not None
+            session, ok = result
+            if ok:
+                loaded_sessions.append(session)
+            else:
                 self._corrupted_sessions.append(session)
-                continue
-            loaded_sessions.append(session)
         return loaded_sessions
 
+    def _report_progress(self, completed: int, total: int):
+        if self.progress is not None:
+            self.progress(completed, total)
+
 def get_unloaded_sessions_for_year(
     year: int, session_types: Iterable[SessionType]
 ) -> list[Session]:
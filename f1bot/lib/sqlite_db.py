@@ -0,0 +1,82 @@
+"""Local SQLite files with a versioned schema, shared by the bot's stores.
+
+Each file records its schema version in user_version. A file written with a
+different version has its tables dropped and recreated on first use, so a
+schema change never needs a migration.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+
+from typing import Iterator
+
+
+class VersionedDatabase:
+    """Hands out connections to a SQLite file, creating its schema first."""
+
+    def __init__(
+        self,
+        path: str,
+        version: int,
+        schema: list[str],
+        tables: list[str],
+        timeout: float = 5.0,
+        wal: bool = False,
+        immediate: bool = False,
+    ):
+        """
+        Args:
+            path: The database file. Its directory is created if needed.
+            version: Bump whenever schema changes.
+            schema: Statements that create the tables and their indexes.
+            tables: Every table in schema, dropped in this order when the
+                version changes.
+            timeout: Seconds to wait for another connection's lock.
+            wal: Whether to use write-ahead logging, for files that other
+                processes read and write at the same time.
+            immediate: Whether to take the write lock when each transaction
+                starts, so read-then-write steps are atomic across processes.
+        """
+        self.path = path
+        self._version = version
+        self._schema = schema
+        self._tables = tables
+        self._timeout = timeout
+        self._wal = wal
+        self._immediate = immediate
+        # Connections are used from whichever thread asks for one.
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """Yields a connection whose work is committed as one transaction."""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self._timeout)
+            try:
+                if not self._initialized:
+                    self._init_schema(conn)
+                    self._initialized = True
+                with conn:
+                    if self._immediate:
+                        conn.execute('BEGIN IMMEDIATE')
+                    yield conn
+            finally:
+                conn.close()
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        if self._wal:
+            conn.execute('PRAGMA journal_mode = WAL')
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version == self._version:
+            return
+        with conn:
+            for table in self._tables:
+                conn.execute(f'DROP TABLE IF EXISTS {table}')
+            for statement in self._schema:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {self._version}')
@@ -0,0 +1,114 @@
+"""Vectorized teammate comparisons.
+
+Everything here works on one DataFrame holding any number of sessions, so
+comparing every driver since 2010 is a handful of groupby/merge calls rather
+than a Python loop per driver per session.
+"""
+from typing import Optional
+
+import numpy
+import pandas
+
+# Columns identifying a session. Frames passed to compute_deltas need these
+# plus the DRIVER_COLUMNS.
+SESSION_COLUMNS = ['year', 'round', 'session_type']
+
+# One row per driver per session, as produced by driver_frame.
+DRIVER_COLUMNS = [
+    'number',
+    'abbreviation',
+    'full_name',
+    'team',
+    'finish_pos',
+    # Fastest lap in seconds, NaN when there's no lap timing.
+    'best_lap',
+]
+
+# Added by compute_deltas. Positive values mean the driver beat their
+# teammate: teammate_delta is in positions, lap_delta_pct is how much faster
+# (as a percentage of the teammate's time) their best lap was.
+DELTA_COLUMNS = ['teammate_delta', 'lap_delta_pct']
+
+
+def driver_frame(
+    results: pandas.DataFrame, laps: Optional[pandas.DataFrame] = None
+) -> pandas.DataFrame:
+    """Converts one session's fastf1 results (and laps) into DRIVER_COLUMNS.
+
+    Args:
+        results: fastf1.core.SessionResults, indexed by driver number.
+        laps: fastf1.core.Laps for the same session, if they were loaded.
+    """
+    frame = pandas.DataFrame({
+        'number': results.index.astype(str),
+        'abbreviation': results['Abbreviation'].to_numpy(),
+        'full_name': results['FullName'].to_numpy(),
+        'team': results['TeamName'].to_numpy(),
+        'finish_pos': pandas.to_numeric(
+            results['Position'], errors='coerce').to_numpy(),
+    })
+
+    if laps is None or laps.empty:
+        frame['best_lap'] = numpy.nan
+        return frame
+
+    best_laps = (
+        laps.groupby(laps['DriverNumber'].astype(str))['LapTime']
+        .min()
+        .dt.total_seconds())
+    frame['best_lap'] = frame['number'].map(best_laps)
+    return frame
+
+
+def compute_deltas(drivers: pandas.DataFrame) -> pandas.DataFrame:
+    """Pairs up teammates and computes the deltas between them.
+
+    Only teams that ran exactly two classified drivers in a session are
+    considered; everyone else is dropped.
+
+    Args:
+        drivers: SESSION_COLUMNS + DRIVER_COLUMNS for any number of sessions.
+    Returns:
+        The kept rows of drivers with DELTA_COLUMNS added.
+    """
+    drivers = drivers.dropna(subset=['finish_pos'])
+    team_keys = SESSION_COLUMNS + ['team']
+    team_size = drivers.groupby(team_keys)['number'].transform('size')
+    pairs = drivers[team_size == 2]
+
+    teammates = pairs[team_keys + ['number', 'finish_pos', 'best_lap']]
+    merged = pairs.merge(
+        teammates, on=team_keys, suffixes=('', '_teammate'))
+    merged = merged[merged['number'] != merged['number_teammate']].assign(
+        teammate_delta=lambda df: (
+            df['finish_pos_teammate'] - df['finish_pos']).astype('int64'),
+        lap_delta_pct=lambda df: (
+            (df['best_lap_teammate'] - df['best_lap'])
+            / df['best_lap_teammate'] * 100))
+    return merged[SESSION_COLUMNS + DRIVER_COLUMNS + DELTA_COLUMNS].reset_index(
+        drop=True)
+
+
+def aggregate(
+    deltas: pandas.DataFrame, min_sessions: int = 0
+) -> pandas.DataFrame:
+    """Summarizes deltas per driver, best average first.
+
+    Args:
+        deltas: Output of compute_deltas.
+        min_sessions: Drivers with this many sessions or fewer are dropped.
+    Returns:
+        A DataFrame indexed by abbreviation with the driver's name, the mean
+        and median teammate_delta, the mean lap_delta_pct and the number of
+        sessions.
+    """
+    grouped = deltas.groupby('abbreviation', sort=False, observed=True)
+    summary = grouped.agg(
+        name=('full_name', 'last'),
+        mean_delta=('teammate_delta', 'mean'),
+        median_delta=('teammate_delta', 'median'),
+        mean_lap_delta_pct=('lap_delta_pct', 'mean'),
+        sessions=('teammate_delta', 'size'),
+    )
+    summary = summary[summary['sessions'] > min_sessions]
+    return summary.sort_values('mean_delta', ascending=False)
@@ -0,0 +1,117 @@
+from f1bot.command import metrics
+from f1bot.lib.lru import LRUCache
+from f1bot.mysql import generation
+
+import functools
+import inspect
+import os
+import pickle
+import sys
+import threading
+
+from typing import Any, Callable, TypeVar
+
+import pandas
+
+T = TypeVar('T')
+
+MAX_BYTES = int(os.getenv('F1_BOT_ERGAST_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+
+def estimate_size(value: Any) -> int:
+    """Roughly estimates how much memory a cached query result holds onto."""
+    if isinstance(value, pandas.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(
+            sys.getsizeof(key) + estimate_size(item)
+            for key, item in value.items())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+RESULTS: LRUCache[Any] = LRUCache(MAX_BYTES, sizeof=estimate_size)
+
+
+def _samples() -> list[metrics.Sample]:
+    stats = RESULTS.stats()
+    return [
+        metrics.Sample(
+            'query_cache_hits_total', stats.hits, 'counter',
+            'Ergast queries answered from the cache.'),
+        metrics.Sample(
+            'query_cache_misses_total', stats.misses, 'counter',
+            'Ergast queries that had to hit the database.'),
+        metrics.Sample(
+            'query_cache_evictions_total', stats.evictions, 'counter',
+            'Cached results dropped to stay under the size budget.'),
+        metrics.Sample(
+            'query_cache_entries', stats.entries, 'gauge',
+            'Results currently cached.'),
+        metrics.Sample(
+            'query_cache_bytes', stats.size_bytes, 'gauge',
+            'Estimated memory held by cached results.'),
+    ]
+
+
+metrics.METRICS.register_collector(_samples)
+
+_generation_lock = threading.Lock()
+_cached_generation = generation.current()
+
+
+def _sync_generation() -> str:
+    """Drops every cached result if the database was rebuilt."""
+    global _cached_generation
+    current = generation.current()
+    if current == _cached_generation:
+        return current
+    with _generation_lock:
+        if current != _cached_generation:
+            RESULTS.clear()
+            _cached_generation = current
+    return current
+
+
+def memoize(func: Callable[..., T]) -> Callable[..., T]:
+    """Caches func's results keyed on its name and bound arguments.
+
+    The ergast data only changes when the database is rebuilt, so results are
+    kept until they're evicted or the generation stamp changes. DataFrames,
+    including those in a returned dict, are copied on the way out so callers
+    can't mutate the cached value.
+    """
+    signature = inspect.signature(func)
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> T:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        # The generation is part of the key so a result computed while the
+        # database was being swapped out can't outlive the swap.
+        key = (_sync_generation(), name, tuple(bound.arguments.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        cached = RESULTS.get(key)
+        if cached is None:
+            value = func(*args, **kwargs)
+            RESULTS.put(key, value)
+        else:
+            value = cached[0]
+
+        if isinstance(value, pandas.DataFrame):
+            return value.copy()
+        if isinstance(value, dict):
+            return {
+                key: item.copy() if isinstance(item, pandas.DataFrame)
+                else item
+                for key, item in value.items()
+            }
+        return value
+    return wrapper
@@ -0,0 +1,57 @@
+"""Environment driven settings for the ergast database.
+
+Kept free of heavy imports so scripts like init-ergast-db.py can read them
+without creating an engine.
+"""
+import os
+
+# Either 'mysql' (a MariaDB/MySQL server) or 'sqlite' (a local database file).
+BACKEND = os.getenv('F1_BOT_ERGAST_BACKEND', 'mysql')
+
+SQLITE_PATH = os.getenv('F1_BOT_ERGAST_SQLITE_PATH', 'ergast.db')
+
+MYSQL_USER = os.getenv('MYSQL_USER', 'evanhiggins')
+MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
+MYSQL_DATABASE = 'ergast'
+
+# Connection pool tuning. The bot runs commands on a small worker pool, so the
+# defaults leave a little headroom over F1_BOT_MAX_WORKERS.
+POOL_SIZE = int(os.getenv('F1_BOT_DB_POOL_SIZE', '5'))
+POOL_MAX_OVERFLOW = int(os.getenv('F1_BOT_DB_MAX_OVERFLOW', '5'))
+POOL_TIMEOUT_SECONDS = float(os.getenv('F1_BOT_DB_POOL_TIMEOUT', '10'))
+
+# MariaDB drops idle connections after wait_timeout (8h by default), so
+# recycle well before that and pre-ping to catch anything that slipped by.
+POOL_RECYCLE_SECONDS = int(os.getenv('F1_BOT_DB_POOL_RECYCLE', '3600'))
+
+# Statements slower than this are logged with their query plan. Zero logs
+# every statement.
+SLOW_QUERY_SECONDS = float(os.getenv('F1_BOT_SLOW_QUERY_MS', '100')) / 1000
+
+# Rotating log file for slow statements, empty to only count them in metrics.
+SLOW_QUERY_LOG = os.getenv('F1_BOT_SLOW_QUERY_LOG', 'slow-queries.log')
+SLOW_QUERY_LOG_BYTES = int(
+    os.getenv('F1_BOT_SLOW_QUERY_LOG_BYTES', str(4 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv('F1_BOT_SLOW_QUERY_LOG_BACKUPS', '3'))
+
+
+def mysql_url() -> str:
+    password = os.environ['MYSQL_PASSWORD']
+    return (
+        f"mysql+mysqldb://{MYSQL_USER}:{password}"
+        f"@{MYSQL_HOST}/{MYSQL_DATABASE}")
+
+
+def mysql_admin_url() -> str:
+    """URL used by init-ergast-db.py, which runs as root over the socket."""
+    return f"mysql+mysqldb://root@{MYSQL_HOST}/{MYSQL_DATABASE}"
+
+
+def sqlite_admin_url(path: str) -> str:
+    return f"sqlite:///{path}"
+
+
+def sqlite_url() -> str:
+    # Opened read-only so a missing database is an error rather than a new,
+    # empty file.
+    return f"sqlite:///file:{SQLITE_PATH}?mode=ro&uri=true"
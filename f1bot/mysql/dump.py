@@ -0,0 +1,218 @@
+"""Reads the mysqldump formatted ergast database dump.
+
+This is just enough of a parser to translate the ergast dump into other
+backends (e.g. SQLite) without a MySQL server. It understands the statements
+mysqldump emits for the ergast tables and skips everything else.
+"""
+import re
+import sqlite3
+
+from typing import Any, Iterable, Iterator, Optional
+
+import attrs
+
+Value = Any
+Row = tuple[Value, ...]
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """Groups dump lines into complete SQL statements.
+
+    mysqldump writes every INSERT on a single line and escapes newlines inside
+    strings, so a statement ends on the first line ending with ';'.
+    """
+    buffer: list[str] = []
+    for line in lines:
+        stripped = line.strip()
+        if not buffer and (not stripped or stripped.startswith('--')):
+            continue
+        buffer.append(stripped)
+        if stripped.endswith(';'):
+            yield '\n'.join(buffer)
+            buffer = []
+
+
+@attrs.define()
+class Index:
+    name: str
+    columns: list[str]
+    unique: bool = False
+
+
+@attrs.define()
+class TableSchema:
+    name: str
+
+    # Column names in table order.
+    columns: list[str]
+
+    # Column definitions, already translated for SQLite.
+    column_defs: list[str]
+
+    primary_key: list[str]
+    indexes: list[Index]
+
+    def sqlite_create_statements(self) -> list[str]:
+        definitions = list(self.column_defs)
+        if self.primary_key:
+            definitions.append(
+                f'PRIMARY KEY ({", ".join(_quote(c) for c in self.primary_key)})')
+        body = ',\n  '.join(definitions)
+        return [
+            f'DROP TABLE IF EXISTS {_quote(self.name)}',
+            f'CREATE TABLE {_quote(self.name)} (\n  {body}\n)',
+        ]
+
+    def sqlite_index_statements(self) -> list[str]:
+        # Index names are global in SQLite, but only per table in MySQL.
+        return [
+            f'CREATE {"UNIQUE " if index.unique else ""}INDEX '
+            f'{_quote(f"{self.name}_{index.name}")} ON {_quote(self.name)} '
+            f'({", ".join(_quote(c) for c in index.columns)})'
+            for index in self.indexes
+        ]
+
+
+def _quote(identifier: str) -> str:
+    return f'"{identifier}"'
+
+
+_CREATE_TABLE = re.compile(r'CREATE TABLE `(?P<name>\w+)` \(')
+_COLUMN = re.compile(r'`(?P<name>\w+)` (?P<definition>.*)')
+_KEY = re.compile(
+    r'(?P<kind>PRIMARY KEY|UNIQUE KEY|KEY)\s*(?:`(?P<name>\w+)`)?\s*'
+    r'\((?P<columns>[^)]*)\)')
+
+# MySQL-only column attributes that SQLite would reject or misread.
+_MYSQL_ONLY = [
+    (re.compile(r'\bint\(\d+\)', re.IGNORECASE), 'INTEGER'),
+    (re.compile(r'\s+unsigned\b', re.IGNORECASE), ''),
+    (re.compile(r'\s+AUTO_INCREMENT\b', re.IGNORECASE), ''),
+    (re.compile(r'\s+CHARACTER SET \w+', re.IGNORECASE), ''),
+    (re.compile(r'\s+COLLATE \w+', re.IGNORECASE), ''),
+    (re.compile(r"\s+COMMENT '(?:[^'\\]|\\.)*'", re.IGNORECASE), ''),
+    (re.compile(r'\s+ON UPDATE \w+', re.IGNORECASE), ''),
+]
+
+
+def parse_create_table(statement: str) -> Optional[TableSchema]:
+    """Parses a mysqldump CREATE TABLE statement."""
+    match = _CREATE_TABLE.search(statement)
+    if match is None:
+        return None
+
+    schema = TableSchema(
+        name=match.group('name'),
+        columns=[],
+        column_defs=[],
+        primary_key=[],
+        indexes=[])
+
+    for line in statement.splitlines()[1:]:
+        line = line.strip().rstrip(',')
+        if line.startswith(')'):
+            break
+
+        key = _KEY.match(line)
+        if key is not None:
+            columns = [
+                c.strip().strip('`').split('(')[0]
+                for c in key.group('columns').split(',')
+            ]
+            kind = key.group('kind')
+            if kind == 'PRIMARY KEY':
+                schema.primary_key = columns
+            else:
+                schema.indexes.append(Index(
+                    name=key.group('name') or '_'.join(columns),
+                    columns=columns,
+                    unique=kind == 'UNIQUE KEY'))
+            continue
+
+        column = _COLUMN.match(line)
+        if column is None:
+            continue
+        definition = column.group('definition')
+        for pattern, replacement in _MYSQL_ONLY:
+            definition = pattern.sub(replacement, definition)
+        schema.columns.append(column.group('name'))
+        schema.column_defs.append(f'{_quote(column.group("name"))} {definition}')
+
+    return schema
+
+
+_INSERT = re.compile(r'INSERT INTO `(?P<name>\w+)`(?: \([^)]*\))? VALUES ')
+_TOKEN = re.compile(
+    r"""'(?P<string>(?:[^'\\]|\\.)*)'"""
+    r'|(?P<null>NULL)'
+    r'|(?P<number>[-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?)'
+    r'|(?P<open>\()'
+    r'|(?P<close>\))',
+    re.DOTALL)
+_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+
+def _unescape(s: str) -> str:
+    if '\\' not in s:
+        return s
+    return _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), s)
+
+
+def _number(s: str) -> Value:
+    if '.' in s or 'e' in s or 'E' in s:
+        return float(s)
+    return int(s)
+
+
+def parse_insert(statement: str) -> Optional[tuple[str, list[Row]]]:
+    """Parses an extended mysqldump INSERT into its table name and rows."""
+    match = _INSERT.match(statement)
+    if match is None:
+        return None
+
+    rows: list[Row] = []
+    row: list[Value] = []
+    for token in _TOKEN.finditer(statement, match.end()):
+        kind = token.lastgroup
+        if kind == 'string':
+            row.append(_unescape(token.group('string')))
+        elif kind == 'number':
+            row.append(_number(token.group('number')))
+        elif kind == 'null':
+            row.append(None)
+        elif kind == 'open':
+            row = []
+        elif kind == 'close':
+            rows.append(tuple(row))
+    return match.group('name'), rows
+
+
+def load_into_sqlite(lines: Iterable[str], conn: sqlite3.Connection):
+    """Loads a mysqldump of the ergast database into a SQLite database."""
+    schemas: dict[str, TableSchema] = {}
+    for statement in iter_statements(lines):
+        if statement.startswith('CREATE TABLE'):
+            schema = parse_create_table(statement)
+            if schema is None:
+                continue
+            schemas[schema.name] = schema
+            for create in schema.sqlite_create_statements():
+                conn.execute(create)
+        elif statement.startswith('INSERT INTO'):
+            parsed = parse_insert(statement)
+            if parsed is None:
+                continue
+            table, rows = parsed
+            if not rows:
+                continue
+            placeholders = ', '.join('?' * len(rows[0]))
+            conn.executemany(
+                f'INSERT INTO {_quote(table)} VALUES ({placeholders})', rows)
+
+    # Building indexes once the data is loaded is much faster than keeping
+    # them up to date row by row.
+    for schema in schemas.values():
+        for statement in schema.sqlite_index_statements():
+            conn.execute(statement)
+    conn.commit()
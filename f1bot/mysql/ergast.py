@@ -1,93 +1,201 @@
 from f1bot import command as cmd
+from f1bot.command import metrics
 
-from f1bot.mysql import engine
+from f1bot.mysql import cache, engine, resolver
 
 from f1bot.data.standings import Standings
-from f1bot.data.standings import Row as StandingsRow
 from f1bot.data.schedule import Schedule
-from f1bot.data.schedule import Row as ScheduleRow
 
 import sqlalchemy as sql # type: ignore
 import sqlalchemy.engine as sqlengine
+import numpy
 import pandas
 import attr
 
 import datetime as dt
 
-from typing import Optional
+from typing import Any, Optional, Sequence
 
 RaceId = int
 
-def transform_to_dataframe(
-    result: sqlengine.CursorResult, columns: list[str]
+def to_columns(result: sqlengine.CursorResult) -> dict[str, list[Any]]:
+    """Transposes a result into one list per column in a single pass."""
+    keys = list(result.keys())
+    columns = list(zip(*result.all()))
+    if not columns:
+        return {key: [] for key in keys}
+    return {key: list(values) for key, values in zip(keys, columns)}
+
+def split_columns(
+    columns: dict[str, list[Any]], key: str, values: Sequence[Any]
+) -> dict[Any, dict[str, list[Any]]]:
+    """Splits to_columns output into the rows for each of values of key."""
+    indexes: dict[Any, list[int]] = {value: [] for value in values}
+    for i, value in enumerate(columns[key]):
+        indexes.setdefault(value, []).append(i)
+    return {
+        value: {
+            name: [column[i] for i in rows]
+            for name, column in columns.items()
+        }
+        for value, rows in indexes.items()
+    }
+
+def in_list(name: str) -> sql.sql.elements.BindParameter:
+    """A parameter that expands to a list, for `WHERE x IN :name`."""
+    return sql.bindparam(name, expanding=True)
+
+# A lap or session time like '1:23.456', which ergast stores as text.
+LAP_TIME = 'lap_time'
+
+_NAT = numpy.iinfo(numpy.int64).min
+
+def _lap_time_ns(value: Optional[str]) -> int:
+    if not value:
+        return _NAT
+    minutes, _, seconds = value.rpartition(':')
+    try:
+        return int(minutes or 0) * 60_000_000_000 + round(float(seconds) * 1e9)
+    except ValueError:
+        return _NAT
+
+def _typed_array(values: tuple[Any, ...], dtype: str) -> Any:
+    # Building the arrays directly is several times faster than letting
+    # pandas infer and convert the values, which matters for small results.
+    count = len(values)
+    if dtype == LAP_TIME:
+        return numpy.fromiter(
+            map(_lap_time_ns, values), dtype=numpy.int64, count=count
+        ).view('timedelta64[ns]')
+    if dtype == 'Int64':
+        mask = numpy.fromiter(
+            (value is None for value in values), dtype=bool, count=count)
+        data = numpy.fromiter(
+            (0 if value is None else value for value in values),
+            dtype=numpy.int64, count=count)
+        return pandas.arrays.IntegerArray(data, mask)
+    if dtype == 'float64':
+        return numpy.fromiter(
+            (numpy.nan if value is None else value for value in values),
+            dtype=numpy.float64, count=count)
+    if dtype == 'object':
+        return numpy.array(values, dtype=object)
+    return pandas.array(values, dtype=dtype)
+
+def fetch_dataframe(
+    result: sqlengine.CursorResult, dtypes: dict[str, str]
 ) -> pandas.DataFrame:
-    return pandas.DataFrame(
-        columns=columns, data=result.columns(*columns))
+    """Builds a DataFrame with one typed array per column of result.
+
+    dtypes maps each selected column, in order, to a pandas dtype or LAP_TIME.
+    Nullable dtypes (e.g. 'Int64') keep NULLs from turning ints into floats.
+    """
+    with metrics.span('dataframe'):
+        keys = list(result.keys())
+        assert keys == list(dtypes), f'{keys} != {list(dtypes)}'
+        columns = list(zip(*result.all())) or [()] * len(keys)
+        return pandas.DataFrame(
+            {
+                key: _typed_array(values, dtypes[key])
+                for key, values in zip(keys, columns)
+            },
+            copy=False)
+
+def _split_by_race(
+    frame: pandas.DataFrame, race_ids: Sequence[RaceId]
+) -> dict[RaceId, pandas.DataFrame]:
+    if len(race_ids) == 1:
+        return {race_ids[0]: frame.drop(columns='raceId')}
+    sessions = dict(list(frame.groupby('raceId', sort=False)))
+    empty = frame.iloc[0:0]
+    return {
+        race_id: sessions.get(race_id, empty)
+            .drop(columns='raceId').reset_index(drop=True)
+        for race_id in race_ids
+    }
 
+@cache.memoize
 @engine.with_ergast
-def get_qualifying_session(
-    conn: sqlengine.Connection, race_id: RaceId
-) -> cmd.CommandValue:
+def get_qualifying_sessions(
+    conn: sqlengine.Connection, race_ids: tuple[RaceId, ...]
+) -> dict[RaceId, pandas.DataFrame]:
     result = conn.execute(sql.text(
         f"""
-        SELECT *
+        SELECT q.raceId, q.number, d.forename, d.surname, q.position,
+            q.q1, q.q2, q.q3
         FROM qualifying q
         INNER JOIN drivers d
         ON q.driverId = d.driverId
-        where raceId = :race_id
+        where q.raceId IN :race_ids
         """
-    ), race_id=race_id)
-    return transform_to_dataframe(
-        result,
-        ['number', 'forename', 'surname', 'position', 'q1', 'q2', 'q3'])
+    ).bindparams(in_list('race_ids')), race_ids=list(race_ids))
+    return _split_by_race(fetch_dataframe(result, {
+        'raceId': 'int64',
+        'number': 'Int64',
+        'forename': 'object',
+        'surname': 'object',
+        'position': 'Int64',
+        'q1': LAP_TIME,
+        'q2': LAP_TIME,
+        'q3': LAP_TIME,
+    }), race_ids)
 
+def get_qualifying_session(race_id: RaceId) -> pandas.DataFrame:
+    return get_qualifying_sessions((race_id,))[race_id]
 
+
+@cache.memoize
 @engine.with_ergast
-def get_race_session(
-    conn: sqlengine.Connection, race_id: RaceId,
-) -> cmd.CommandValue:
+def get_race_sessions(
+    conn: sqlengine.Connection, race_ids: tuple[RaceId, ...]
+) -> dict[RaceId, pandas.DataFrame]:
     result = conn.execute(sql.text(
         f"""
-        SELECT *
+        SELECT r.raceId, r.number, d.forename, d.surname, r.position, r.time,
+            s.status
         FROM results r
         INNER JOIN drivers d
         ON r.driverId = d.driverId
         INNER JOIN status s
         ON s.statusId = r.statusId
-        WHERE r.raceId = :race_id
+        WHERE r.raceId IN :race_ids
         """
-    ), race_id=race_id)
-    return transform_to_dataframe(
-        result,
-        ['number', 'forename', 'surname', 'position', 'time', 'status'])
+    ).bindparams(in_list('race_ids')), race_ids=list(race_ids))
+    return _split_by_race(fetch_dataframe(result, {
+        'raceId': 'int64',
+        'number': 'Int64',
+        'forename': 'object',
+        'surname': 'object',
+        'position': 'Int64',
+        # Either the winner's race time or a gap like '+5.978', so it stays
+        # text.
+        'time': 'object',
+        'status': 'object',
+    }), race_ids)
+
+def get_race_session(race_id: RaceId) -> pandas.DataFrame:
+    return get_race_sessions((race_id,))[race_id]
 
 
+@cache.memoize
 @engine.with_ergast
 def get_last_race_of_year(conn: sqlengine.Connection, year: int) -> RaceId:
     """Returns the raceId for the last year in a particular race calendar."""
+    # season_final_race is built by init-ergast-db.py after every load.
     result = conn.execute(sql.text(
-        # Uses a window query to rank all races against other races in the
-        # same year against the "races.round" column and then selects the
-        # largest 1st rank.
-        f"""
-        SELECT
-            raceId, name
-        FROM (
-          SELECT
-            raceId,
-            name,
-            year,
-            ROW_NUMBER() OVER (PARTITION BY year ORDER BY round DESC) as rnk
-          FROM races) r
-        WHERE r.rnk = 1 AND r.year = {year}"""))
-    if result.rowcount != 1:
+        """
+        SELECT raceId
+        FROM season_final_race
+        WHERE year = :year"""), year=year)
+
+    # rowcount isn't reliable for SELECTs on every backend (SQLite always
+    # reports -1), so count the rows we actually get back.
+    rows = result.all()
+    if len(rows) != 1:
         raise cmd.CommandError(
                 f'Failed to find the last race of the year for {year}.'
-                f'Expected 1 result, found {result.rowcount}')
-    row = result.first()
-
-    # We've already made sure this isn't possible.
-    assert row is not None
+                f'Expected 1 result, found {len(rows)}')
+    row = rows[0]
 
     return row['raceId']
 
@@ -106,11 +214,15 @@ Qualifying, ...
 Azerbaijan GP, June 11th, PT, MT, CT, ET
 """
 
+@cache.memoize
 @engine.with_ergast
-def get_schedule(conn: sqlengine.Connection, year: int) -> pandas.DataFrame:
+def get_schedules_for_years(
+    conn: sqlengine.Connection, years: tuple[int, ...]
+) -> dict[int, Schedule]:
     result = conn.execute(sql.text(
         f"""
         SELECT
+            r.year as "year",
             r.name as "race_name",
             r.round as "round",
             c.name as "circuit_name",
@@ -125,128 +237,237 @@ def get_schedule(conn: sqlengine.Connection, year: int) -> pandas.DataFrame:
         FROM races r
             INNER JOIN circuits c
             ON r.circuitId = c.circuitId
-        WHERE year = {year}
-        ORDER BY round"""))
-
-    def to_dt(s: sqlengine.Row, prefix: str) -> Optional[dt.datetime]:
-        event_date = s[f"{prefix}_date"]
-        if event_date is None:
-            return None
-        event_time = s[f"{prefix}_time"]
-        return dt.datetime(
-            year=event_date.year, month=event_date.month, day=event_date.day
-        ) + event_time
+        WHERE r.year IN :years
+        ORDER BY r.year, r.round""").bindparams(in_list('years')).columns(
+            # Typing the date/time columns makes every backend hand back
+            # datetime.date and datetime.time values.
+            race_date=sql.Date, race_time=sql.Time,
+            fp1_date=sql.Date, fp1_time=sql.Time,
+            fp2_date=sql.Date, fp2_time=sql.Time,
+            fp3_date=sql.Date, fp3_time=sql.Time,
+            quali_date=sql.Date, quali_time=sql.Time,
+            sprint_date=sql.Date, sprint_time=sql.Time,
+        ), years=list(years))
 
-    return Schedule(
-        rows=[
-            ScheduleRow(
-                race_name=row['race_name'],
-                round_num=row['round'],
-                circuit=row['circuit_name'],
-                location=row['location'],
-                race=to_dt(row, 'race'),
-                sprint=to_dt(row, 'sprint'),
-                qualifying=to_dt(row, 'quali'),
-                fp1=to_dt(row, 'fp1'),
-                fp2=to_dt(row, 'fp2'),
-                fp3=to_dt(row, 'fp3'),
-            )
-            for row in result.all()
+    return {
+        year: _schedule_from_columns(columns)
+        for year, columns in split_columns(
+            to_columns(result), 'year', years).items()
+    }
+
+def _schedule_from_columns(columns: dict[str, list[Any]]) -> Schedule:
+    def to_dt(prefix: str) -> list[Optional[dt.datetime]]:
+        return [
+            # Older races don't have a start time.
+            None if event_date is None
+            else dt.datetime.combine(event_date, event_time or dt.time())
+            for event_date, event_time in zip(
+                columns[f"{prefix}_date"], columns[f"{prefix}_time"])
         ]
+
+    return Schedule(
+        race_names=columns['race_name'],
+        round_nums=columns['round'],
+        circuits=columns['circuit_name'],
+        locations=columns['location'],
+        race=to_dt('race'),
+        sprint=to_dt('sprint'),
+        qualifying=to_dt('quali'),
+        fp3=to_dt('fp3'),
+        fp2=to_dt('fp2'),
+        fp1=to_dt('fp1'),
     )
 
+def get_schedule(year: int) -> Schedule:
+    return get_schedules_for_years((year,))[year]
+
+
+def resolve_fuzzy_race_query(year: int, query: str) -> Optional[RaceId]:
+    """Finds the race in year best matching a name, circuit, place or round."""
+    with metrics.span('resolve'):
+        return resolver.RESOLVER.race(year, query)
+
+def resolve_driver(query: str) -> Optional[int]:
+    """Finds the driverId best matching a name, surname, code or ref."""
+    with metrics.span('resolve'):
+        return resolver.RESOLVER.driver(query)
+
+def resolve_constructor(query: str) -> Optional[int]:
+    """Finds the constructorId best matching a name, ref or alias."""
+    with metrics.span('resolve'):
+        return resolver.RESOLVER.constructor(query)
+
 
+def _require_seasons(conn: sqlengine.Connection, years: tuple[int, ...]):
+    """Raises if season_final_race has no race for one of years."""
+    result = conn.execute(sql.text(
+        """
+        SELECT year
+        FROM season_final_race
+        WHERE year IN :years"""
+    ).bindparams(in_list('years')), years=list(years))
+    found = {row[0] for row in result}
+    missing = [str(year) for year in years if year not in found]
+    if missing:
+        raise cmd.CommandError(
+            f'Failed to find the last race of the year for '
+            f'{", ".join(missing)}.')
+
+@cache.memoize
 @engine.with_ergast
-def resolve_fuzzy_race_query(
-    conn: sqlengine.Connection, year: int, query: str
-) -> Optional[RaceId]:
-    match_by_race_name = conn.execute(sql.text(
+def get_driver_standings_for_years(
+    conn: sqlengine.Connection, years: tuple[int, ...],
+) -> dict[int, Standings]:
+    _require_seasons(conn, years)
+    result = conn.execute(sql.text(
         """
-        SELECT *
-        FROM races
-        WHERE
-            name LIKE CONCAT('%', :race_name, '%')
-            AND year = :year
-        """), race_name=query, year=year)
-    if match_by_race_name.rowcount == 1:
-        race = match_by_race_name.first()
-        if race is None:
-            raise ValueError(
-                'Expected one result, found None?! For query '
-                f'(year={year}, q={query})')
-        return int(race['raceId'])
-
-    match_by_track_name = conn.execute(sql.text(
+        SELECT f.year, d.forename, d.surname, ds.position, ds.points
+        FROM season_final_race f
+        INNER JOIN driverStandings ds
+        ON ds.raceId = f.raceId
+        INNER JOIN drivers d
+        ON ds.driverId = d.driverId
+        WHERE f.year IN :years
+        ORDER BY f.year, ds.position
         """
-        SELECT *
-        FROM races r
-        INNER JOIN circuits c
-        ON r.circuitId = c.circuitId
-        WHERE
-            c.name LIKE CONCAT('%', :race_name, '%')
-            AND year = :year
-        """), race_name=query, year=year)
-    if match_by_track_name.rowcount == 1:
-        race = match_by_track_name.first()
-        if race is None:
-            raise ValueError(
-                'Expected one result, found None?! For query '
-                f'(year={year}, q={query})')
-        return int(race['raceId'])
+    ).bindparams(in_list('years')), years=list(years))
 
-    return None
+    return {
+        year: Standings(
+            names=[
+                f"{forename} {surname}"
+                for forename, surname in zip(
+                    columns["forename"], columns["surname"])
+            ],
+            positions=columns["position"],
+            points=columns["points"],
+        )
+        for year, columns in split_columns(
+            to_columns(result), 'year', years).items()
+    }
 
+def get_driver_standings(year: int) -> Standings:
+    return get_driver_standings_for_years((year,))[year]
 
+@cache.memoize
+@engine.with_ergast
+def get_constructor_standings_for_years(
+    conn: sqlengine.Connection, years: tuple[int, ...],
+) -> dict[int, Standings]:
+    _require_seasons(conn, years)
+    result = conn.execute(sql.text(
+        """
+        SELECT f.year, c.name, cs.position, cs.points
+        FROM season_final_race f
+        INNER JOIN constructorStandings cs
+        ON cs.raceId = f.raceId
+        INNER JOIN constructors c
+        ON cs.constructorId = c.constructorId
+        WHERE f.year IN :years
+        ORDER BY f.year, cs.position
+        """
+    ).bindparams(in_list('years')), years=list(years))
+
+    return {
+        year: Standings(
+            names=columns["name"],
+            positions=columns["position"],
+            points=columns["points"],
+        )
+        for year, columns in split_columns(
+            to_columns(result), 'year', years).items()
+    }
+
+def get_constructor_standings(year: int) -> Standings:
+    return get_constructor_standings_for_years((year,))[year]
 
+
+_CAREER_DTYPES = {
+    'seasons': 'Int64',
+    'first_year': 'Int64',
+    'last_year': 'Int64',
+    'starts': 'Int64',
+    'wins': 'Int64',
+    'podiums': 'Int64',
+    'poles': 'Int64',
+    'dnfs': 'Int64',
+    'points': 'float64',
+    'championships': 'Int64',
+}
+
+_SEASON_DTYPES = {
+    'year': 'Int64',
+    'starts': 'Int64',
+    'wins': 'Int64',
+    'podiums': 'Int64',
+    'poles': 'Int64',
+    'dnfs': 'Int64',
+    'points': 'float64',
+    'championship_position': 'Int64',
+}
+
+# The career tables are built by init-ergast-db.py after every load, see
+# schema.DERIVED_TABLES.
+
+@cache.memoize
 @engine.with_ergast
-def get_driver_standings(
-    conn: sqlengine.Connection, year: int,
-) -> Standings:
-    last_race_id = get_last_race_of_year(year)
+def get_driver_career(
+    conn: sqlengine.Connection, driver_id: int
+) -> pandas.DataFrame:
     result = conn.execute(sql.text(
         f"""
-        SELECT *
-        FROM driverStandings ds
+        SELECT d.forename, d.surname, {', '.join(_CAREER_DTYPES)}
+        FROM driver_career c
         INNER JOIN drivers d
-        ON ds.driverId = d.driverId
-        WHERE raceId = {last_race_id}
-        ORDER BY position
+        ON d.driverId = c.driverId
+        WHERE c.driverId = :driver_id
         """
-    ))
-
-    return Standings(
-        rows=[
-            StandingsRow(
-                name=" ".join([row["forename"], row["surname"]]),
-                position=row["position"],
-                points=row["points"]
-            )
-            for row in result.all()
-        ]
-    )
+    ), driver_id=driver_id)
+    return fetch_dataframe(
+        result, {'forename': 'object', 'surname': 'object', **_CAREER_DTYPES})
 
+@cache.memoize
 @engine.with_ergast
-def get_constructor_standings(
-    conn: sqlengine.Connection, year: int,
-) -> Standings:
-    last_race_id = get_last_race_of_year(year)
+def get_constructor_career(
+    conn: sqlengine.Connection, constructor_id: int
+) -> pandas.DataFrame:
     result = conn.execute(sql.text(
         f"""
-        SELECT *
-        FROM constructorStandings cs
+        SELECT c.name, {', '.join(_CAREER_DTYPES)}
+        FROM constructor_career cc
         INNER JOIN constructors c
-        ON cs.constructorId = c.constructorId
-        WHERE raceId = {last_race_id}
-        ORDER BY position
+        ON c.constructorId = cc.constructorId
+        WHERE cc.constructorId = :constructor_id
         """
-    ))
-    return Standings(
-        rows=[
-            StandingsRow(
-                name=row["name"],
-                position=row["position"],
-                points=row["points"]
-            )
-            for row in result.all()
-        ]
-    )
+    ), constructor_id=constructor_id)
+    return fetch_dataframe(result, {'name': 'object', **_CAREER_DTYPES})
+
+@cache.memoize
+@engine.with_ergast
+def get_driver_seasons(
+    conn: sqlengine.Connection, driver_id: int
+) -> pandas.DataFrame:
+    result = conn.execute(sql.text(
+        f"""
+        SELECT {', '.join(_SEASON_DTYPES)}
+        FROM driver_season_stats
+        WHERE driverId = :driver_id
+        ORDER BY year
+        """
+    ), driver_id=driver_id)
+    return fetch_dataframe(result, _SEASON_DTYPES)
+
+@cache.memoize
+@engine.with_ergast
+def get_constructor_seasons(
+    conn: sqlengine.Connection, constructor_id: int
+) -> pandas.DataFrame:
+    result = conn.execute(sql.text(
+        f"""
+        SELECT {', '.join(_SEASON_DTYPES)}
+        FROM constructor_season_stats
+        WHERE constructorId = :constructor_id
+        ORDER BY year
+        """
+    ), constructor_id=constructor_id)
+    return fetch_dataframe(result, _SEASON_DTYPES)
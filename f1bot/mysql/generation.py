@@ -0,0 +1,50 @@
+"""Tracks which build of the ergast database is currently loaded.
+
+init-ergast-db.py bumps the stamp after every rebuild, and anything that
+caches data derived from the database compares against it to know when it's
+stale.
+"""
+import os
+import threading
+import time
+import uuid
+
+GENERATION_FILE = os.getenv('F1_BOT_ERGAST_GENERATION', '.ergast-generation')
+
+# Returned when the database has never been stamped.
+INITIAL_GENERATION = '0'
+
+_lock = threading.Lock()
+_cached_stat: tuple[int, int] = (-1, -1)
+_cached_generation = INITIAL_GENERATION
+
+
+def current() -> str:
+    """Returns the current generation stamp.
+
+    The file is only re-read when its mtime or size changes, so this is cheap
+    enough to call on every query.
+    """
+    global _cached_stat, _cached_generation
+    try:
+        stat = os.stat(GENERATION_FILE)
+    except FileNotFoundError:
+        return INITIAL_GENERATION
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key != _cached_stat:
+            with open(GENERATION_FILE) as f:
+                _cached_generation = f.read().strip() or INITIAL_GENERATION
+            _cached_stat = key
+        return _cached_generation
+
+
+def bump() -> str:
+    """Writes a new generation stamp and returns it."""
+    generation = f'{int(time.time())}-{uuid.uuid4().hex[:8]}'
+    tmp_path = f'{GENERATION_FILE}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(generation)
+    os.replace(tmp_path, GENERATION_FILE)
+    return generation
@@ -0,0 +1,129 @@
+"""Applies only the new parts of an ergast dump to an existing database.
+
+Almost every refresh just adds the latest race weekend, so rather than
+reloading everything we stream the dump and insert the rows the live
+database doesn't have yet.
+"""
+from f1bot.mysql import dump, schema
+
+from typing import Callable, Iterable, Hashable
+
+import sqlalchemy as sql # type: ignore
+import sqlalchemy.engine as sqlengine
+
+# Tables with one or more rows per race. A race's rows for these tables are
+# only inserted if the table has nothing for that raceId yet.
+RACE_TABLES = {
+    'results',
+    'qualifying',
+    'sprintResults',
+    'driverStandings',
+    'constructorStandings',
+    'constructorResults',
+    'lapTimes',
+    'pitStops',
+}
+
+
+def _key_columns(table_schema: dump.TableSchema) -> list[str]:
+    if table_schema.name in RACE_TABLES and 'raceId' in table_schema.columns:
+        return ['raceId']
+    return table_schema.primary_key
+
+
+def _quote(conn: sqlengine.Connection, identifier: str) -> str:
+    # Some ergast columns (e.g. "rank") are reserved words in MySQL.
+    return conn.dialect.identifier_preparer.quote(identifier)
+
+
+def _existing_keys(
+    conn: sqlengine.Connection, table: str, columns: list[str]
+) -> set[Hashable]:
+    quoted = ", ".join(_quote(conn, c) for c in columns)
+    result = conn.execute(sql.text(
+        f'SELECT DISTINCT {quoted} FROM {_quote(conn, table)}'))
+    if len(columns) == 1:
+        return {row[0] for row in result}
+    return {tuple(row) for row in result}
+
+
+def _key_getter(
+    table_schema: dump.TableSchema, columns: list[str]
+) -> Callable[[dump.Row], Hashable]:
+    indexes = [table_schema.columns.index(c) for c in columns]
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda row: row[index]
+    return lambda row: tuple(row[i] for i in indexes)
+
+
+def _live_tables(conn: sqlengine.Connection) -> set[str]:
+    return set(sql.inspect(conn).get_table_names())
+
+
+def apply_new_rows(
+    lines: Iterable[str], conn: sqlengine.Connection
+) -> dict[str, int]:
+    """Inserts rows from the dump that the database doesn't have yet.
+
+    Tables in RACE_TABLES are diffed by raceId, every other table by its
+    primary key. Rows that changed in place are not picked up; those need a
+    full reload.
+
+    Returns:
+        The number of rows inserted into each table.
+    """
+    live_tables = _live_tables(conn)
+    schemas: dict[str, dump.TableSchema] = {}
+    existing: dict[str, set[Hashable]] = {}
+    inserted: dict[str, int] = {}
+
+    for statement in dump.iter_statements(lines):
+        if statement.startswith('CREATE TABLE'):
+            table_schema = dump.parse_create_table(statement)
+            if table_schema is not None:
+                schemas[table_schema.name] = table_schema
+            continue
+
+        if not statement.startswith('INSERT INTO'):
+            continue
+        parsed = dump.parse_insert(statement)
+        if parsed is None:
+            continue
+        table, rows = parsed
+        table_schema = schemas.get(table)
+        if table_schema is None or table not in live_tables:
+            raise ValueError(
+                f"Table '{table}' isn't in the live database. "
+                'Run a full refresh instead.')
+
+        key_columns = _key_columns(table_schema)
+        if table not in existing:
+            existing[table] = _existing_keys(conn, table, key_columns)
+        get_key = _key_getter(table_schema, key_columns)
+        new_rows = [row for row in rows if get_key(row) not in existing[table]]
+        if not new_rows:
+            continue
+
+        columns = ', '.join(_quote(conn, c) for c in table_schema.columns)
+        placeholders = ', '.join(
+            f':p{i}' for i in range(len(table_schema.columns)))
+        conn.execute(
+            sql.text(
+                f'INSERT INTO {_quote(conn, table)} ({columns}) '
+                f'VALUES ({placeholders})'),
+            [{f'p{i}': v for i, v in enumerate(row)} for row in new_rows])
+        inserted[table] = inserted.get(table, 0) + len(new_rows)
+
+    if inserted:
+        # Even the career aggregates only take a pass over results, so
+        # rebuilding the derived tables is simpler than patching them. They're
+        # built next to the live ones and swapped in, so commands running
+        # meanwhile never see them missing or half-filled.
+        statements = (
+            schema.derived_table_statements(schema.STAGING_SUFFIX)
+            + schema.swap_derived_table_statements(
+                conn.dialect.name, live_tables))
+        for statement in statements:
+            conn.execute(sql.text(statement))
+    return inserted
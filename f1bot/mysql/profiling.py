@@ -0,0 +1,148 @@
+"""Times every statement run on an engine and logs the slow ones.
+
+Each statement's duration is recorded as the current command's 'sql' phase.
+Statements over config.SLOW_QUERY_SECONDS are also recorded as 'slow_sql' and
+written to a rotating log along with their row count, the f1bot function that
+ran them and the database's plan for them, which is the quickest way to spot a
+full scan or a missing index.
+"""
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+
+from typing import Any, Optional
+
+import attrs
+import sqlalchemy as sql # type: ignore
+import sqlalchemy.engine as sqlengine
+
+from f1bot.command import metrics
+from f1bot.mysql import config
+
+# Frames in these modules are plumbing, the caller is whoever called them.
+_PLUMBING_MODULES = {
+    __name__, 'f1bot.mysql.engine', 'f1bot.mysql.cache',
+}
+
+_EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+}
+
+LOGGER = logging.getLogger('f1bot.slow_queries')
+LOGGER.propagate = False
+
+_handler_lock = threading.Lock()
+
+
+@attrs.define()
+class QueryRecord:
+    statement: str
+    parameters: Any
+    seconds: float
+    # None when the driver doesn't know, e.g. SQLite before rows are fetched.
+    rows: Optional[int]
+    caller: str
+    command: str
+    plan: Optional[str] = None
+
+    def format(self) -> str:
+        rows = '?' if self.rows is None else self.rows
+        lines = [
+            f'{self.seconds * 1000:.1f} ms, {rows} rows, '
+            f'command={self.command}, caller={self.caller}',
+            self.statement.strip(),
+            f'parameters: {self.parameters!r}',
+        ]
+        if self.plan is not None:
+            lines += ['plan:', self.plan]
+        return '\n'.join(lines) + '\n'
+
+
+def find_caller() -> str:
+    """Returns the innermost f1bot function outside the database plumbing."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('f1bot.') and module not in _PLUMBING_MODULES:
+            return f'{module}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return '?'
+
+
+def explain(
+    conn: sqlengine.Connection, statement: str, parameters: Any
+) -> Optional[str]:
+    """Returns the plan for a SELECT, one row per line."""
+    prefix = _EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(
+            ('SELECT', 'WITH')):
+        return None
+
+    # Runs on the raw DBAPI connection so it doesn't trigger these events.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        columns = [column[0] for column in cursor.description]
+        return '\n'.join(
+            '  ' + ', '.join(f'{c}={v}' for c, v in zip(columns, row))
+            for row in cursor.fetchall())
+    except Exception as e:
+        return f'  EXPLAIN failed: {e}'
+    finally:
+        cursor.close()
+
+
+def _ensure_handler():
+    if LOGGER.handlers or not config.SLOW_QUERY_LOG:
+        return
+    with _handler_lock:
+        if LOGGER.handlers:
+            return
+        handler = logging.handlers.RotatingFileHandler(
+            config.SLOW_QUERY_LOG,
+            maxBytes=config.SLOW_QUERY_LOG_BYTES,
+            backupCount=config.SLOW_QUERY_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        LOGGER.addHandler(handler)
+        LOGGER.setLevel(logging.INFO)
+
+
+def log_slow_query(record: QueryRecord):
+    _ensure_handler()
+    LOGGER.info(record.format())
+
+
+def profile_queries(
+    engine: sqlengine.Engine,
+    threshold_seconds: float = config.SLOW_QUERY_SECONDS,
+):
+    """Times engine's statements and logs those over threshold_seconds."""
+    # The start time lives on the statement's own context, so a statement
+    # that fails (and never reaches after_execute) can't skew the next one.
+    def before_execute(_conn, _cursor, _statement, _params, context, _many):
+        context._f1bot_query_start = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, params, context, many):
+        seconds = time.perf_counter() - context._f1bot_query_start
+        command = metrics.current_command()
+        metrics.METRICS.observe(command, 'sql', seconds)
+        if seconds < threshold_seconds:
+            return
+
+        metrics.METRICS.observe(command, 'slow_sql', seconds)
+        record = QueryRecord(
+            statement=statement,
+            parameters=params,
+            seconds=seconds,
+            rows=cursor.rowcount if cursor.rowcount >= 0 else None,
+            caller=find_caller(),
+            command=command)
+        if not many:
+            record.plan = explain(conn, statement, params)
+        log_slow_query(record)
+
+    sql.event.listen(engine, 'before_cursor_execute', before_execute)
+    sql.event.listen(engine, 'after_cursor_execute', after_execute)
@@ -0,0 +1,249 @@
+"""Resolves free-text names to ergast ids without touching the database.
+
+Races, circuits, drivers and constructors are loaded once per database
+generation into small in-memory trigram indexes. A lookup narrows the
+candidates with the index and ranks them with thefuzz, so "spain",
+"barcelona" and "catalunya" all find the Spanish Grand Prix.
+"""
+from f1bot.mysql import engine, generation
+
+import collections
+import threading
+import unicodedata
+
+from typing import Iterable, Optional
+
+import attrs
+import sqlalchemy as sql # type: ignore
+import sqlalchemy.engine as sqlengine
+from thefuzz import fuzz
+
+# Matches scoring below this (out of 100) are treated as "not found".
+MIN_SCORE = 75
+
+# How many trigram candidates are ranked with thefuzz.
+MAX_CANDIDATES = 25
+
+# Terms matched against the entity's own name score slightly higher than
+# secondary terms (location, country, aliases), which breaks ties like
+# "austria" matching both the Austrian and Styrian Grand Prix.
+SECONDARY_TERM_WEIGHT = 0.95
+
+# Extra names people use for circuits, keyed by circuitRef.
+CIRCUIT_ALIASES: dict[str, list[str]] = {
+    'albert_park': ['melbourne'],
+    'americas': ['cota', 'austin', 'texas'],
+    'bahrain': ['sakhir'],
+    'baku': ['azerbaijan'],
+    'catalunya': ['barcelona', 'catalunya', 'montmelo'],
+    'hungaroring': ['budapest'],
+    'imola': ['san marino', 'emilia romagna'],
+    'interlagos': ['sao paulo', 'brazil'],
+    'jeddah': ['saudi'],
+    'losail': ['qatar'],
+    'marina_bay': ['singapore'],
+    'monaco': ['monte carlo'],
+    'nurburgring': ['eifel'],
+    'red_bull_ring': ['spielberg', 'styria'],
+    'ricard': ['paul ricard', 'le castellet'],
+    'rodriguez': ['mexico city'],
+    'spa': ['spa francorchamps', 'belgium'],
+    'villeneuve': ['montreal', 'canada'],
+    'yas_marina': ['abu dhabi'],
+    'zandvoort': ['dutch', 'netherlands'],
+}
+
+# Extra names people use for constructors, keyed by constructorRef.
+CONSTRUCTOR_ALIASES: dict[str, list[str]] = {
+    'alphatauri': ['toro rosso', 'tauri'],
+    'mercedes': ['merc', 'silver arrows'],
+    'red_bull': ['rbr'],
+    'ferrari': ['scuderia'],
+}
+
+
+def normalize(text: str) -> str:
+    """Lowercases and strips accents, e.g. "Montmeló" -> "montmelo"."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f'  {normalize(text)} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@attrs.define()
+class Entity:
+    id: int
+
+    # Matched with full weight.
+    names: list[str]
+
+    # Matched with SECONDARY_TERM_WEIGHT.
+    extra_terms: list[str] = attrs.field(factory=list)
+
+    def score(self, query: str) -> float:
+        best = max(
+            (fuzz.WRatio(query, normalize(name)) for name in self.names),
+            default=0)
+        extra = max(
+            (fuzz.WRatio(query, normalize(term)) for term in self.extra_terms),
+            default=0)
+        return max(best, extra * SECONDARY_TERM_WEIGHT)
+
+
+class NgramIndex:
+    """Finds entities sharing trigrams with a query and ranks them."""
+
+    def __init__(self, entities: Iterable[Entity]):
+        self._entities = list(entities)
+        self._postings: dict[str, list[int]] = collections.defaultdict(list)
+        for idx, entity in enumerate(self._entities):
+            grams: set[str] = set()
+            for term in entity.names + entity.extra_terms:
+                grams |= trigrams(term)
+            for gram in grams:
+                self._postings[gram].append(idx)
+
+    def _candidates(self, query: str) -> list[int]:
+        overlap: collections.Counter[int] = collections.Counter()
+        for gram in trigrams(query):
+            overlap.update(self._postings.get(gram, ()))
+        return [idx for idx, _ in overlap.most_common(MAX_CANDIDATES)]
+
+    def search(self, query: str) -> Optional[Entity]:
+        query = normalize(query.strip())
+        if not query:
+            return None
+
+        # Ties go to whichever entity was added first.
+        scored = [
+            (self._entities[idx].score(query), -idx)
+            for idx in self._candidates(query)
+        ]
+        if not scored:
+            return None
+        best_score, best_idx = max(scored)
+        if best_score < MIN_SCORE:
+            return None
+        return self._entities[-best_idx]
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+
+@attrs.define()
+class _Indexes:
+    generation: str
+    circuits: NgramIndex
+    drivers: NgramIndex
+    constructors: NgramIndex
+
+    # Races are only ever searched within a season, so each year gets its own
+    # (tiny) index.
+    races_by_year: dict[int, NgramIndex]
+
+    # (year, round) -> raceId
+    rounds: dict[tuple[int, int], int]
+
+
+@engine.with_ergast
+def _load(conn: sqlengine.Connection) -> _Indexes:
+    loaded_generation = generation.current()
+
+    circuits = {}
+    circuit_terms = {}
+    for row in conn.execute(sql.text(
+        "SELECT circuitId, circuitRef, name, location, country FROM circuits"
+    )):
+        aliases = CIRCUIT_ALIASES.get(row['circuitRef'], [])
+        terms = [t for t in [row['location'], row['country']] if t] + aliases
+        circuits[row['circuitId']] = Entity(
+            id=row['circuitId'], names=[row['name']], extra_terms=terms)
+        circuit_terms[row['circuitId']] = [row['name']] + terms
+
+    races_by_year: dict[int, list[Entity]] = collections.defaultdict(list)
+    rounds = {}
+    for row in conn.execute(sql.text(
+        "SELECT raceId, year, round, circuitId, name FROM races "
+        "ORDER BY year, round"
+    )):
+        races_by_year[row['year']].append(Entity(
+            id=row['raceId'],
+            names=[row['name']],
+            extra_terms=circuit_terms.get(row['circuitId'], [])))
+        rounds[(row['year'], row['round'])] = row['raceId']
+
+    drivers = [
+        Entity(
+            id=row['driverId'],
+            names=[f"{row['forename']} {row['surname']}", row['surname']],
+            extra_terms=[t for t in [row['code'], row['driverRef']] if t])
+        for row in conn.execute(sql.text(
+            "SELECT driverId, driverRef, code, forename, surname FROM drivers"))
+    ]
+
+    constructors = [
+        Entity(
+            id=row['constructorId'],
+            names=[row['name']],
+            extra_terms=[row['constructorRef']] + CONSTRUCTOR_ALIASES.get(
+                row['constructorRef'], []))
+        for row in conn.execute(sql.text(
+            "SELECT constructorId, constructorRef, name FROM constructors"))
+    ]
+
+    return _Indexes(
+        generation=loaded_generation,
+        circuits=NgramIndex(circuits.values()),
+        drivers=NgramIndex(drivers),
+        constructors=NgramIndex(constructors),
+        races_by_year={
+            year: NgramIndex(races) for year, races in races_by_year.items()
+        },
+        rounds=rounds)
+
+
+class Resolver:
+    """Thread-safe access to the indexes, reloaded when the DB is rebuilt."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes: Optional[_Indexes] = None
+
+    def _get(self) -> _Indexes:
+        indexes = self._indexes
+        current = generation.current()
+        if indexes is not None and indexes.generation == current:
+            return indexes
+        with self._lock:
+            if self._indexes is None or self._indexes.generation != current:
+                self._indexes = _load()
+            return self._indexes
+
+    def race(self, year: int, query: str) -> Optional[int]:
+        """Returns the raceId for a race name, circuit, place or round."""
+        indexes = self._get()
+        if query.isdigit():
+            return indexes.rounds.get((year, int(query)))
+        races = indexes.races_by_year.get(year)
+        if races is None:
+            return None
+        match = races.search(query)
+        return None if match is None else match.id
+
+    def circuit(self, query: str) -> Optional[int]:
+        match = self._get().circuits.search(query)
+        return None if match is None else match.id
+
+    def driver(self, query: str) -> Optional[int]:
+        match = self._get().drivers.search(query)
+        return None if match is None else match.id
+
+    def constructor(self, query: str) -> Optional[int]:
+        match = self._get().constructors.search(query)
+        return None if match is None else match.id
+
+
+RESOLVER = Resolver()
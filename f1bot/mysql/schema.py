@@ -0,0 +1,287 @@
+"""Indexes and tables layered on top of the raw ergast dump.
+
+The dump ships very few indexes of its own, so after every load we add
+indexes for each access pattern in ergast.py and build small derived tables
+that turn the common lookups into indexed point reads.
+"""
+import re
+
+# (table, columns) for every index the queries in ergast.py rely on. Columns
+# after the lookup key are there so the index covers the query.
+INDEXES: list[tuple[str, list[str]]] = [
+    # get_schedules_for_years, resolve_fuzzy_race_query
+    ('races', ['year', 'round']),
+    # get_race_sessions
+    ('results', ['raceId', 'driverId', 'statusId']),
+    # get_qualifying_sessions
+    ('qualifying', ['raceId', 'driverId']),
+    # get_driver_standings_for_years
+    ('driverStandings', ['raceId', 'position', 'driverId', 'points']),
+    # get_constructor_standings_for_years
+    ('constructorStandings', [
+        'raceId', 'position', 'constructorId', 'points']),
+]
+
+# positionText of entries that never took the start: failed to qualify
+# ('F') and withdrawn ('W').
+_STARTED = "r.positionText NOT IN ('F', 'W')"
+
+
+def _season_totals(key: str) -> str:
+    """Sums results per season for key, either driverId or constructorId.
+
+    Poles come from qualifying where the race has any, and from the grid for
+    older races, since qualifying only goes back to 1994. DNFs are
+    retirements ('R'), not disqualifications or non-starters.
+    """
+    starts = (
+        f'SUM(CASE WHEN {_STARTED} THEN 1 ELSE 0 END)' if key == 'driverId'
+        else f'COUNT(DISTINCT CASE WHEN {_STARTED} THEN r.raceId END)')
+    return f"""
+        SELECT
+            r.{key}, ra.year,
+            {starts} AS starts,
+            SUM(CASE WHEN r.position = 1 THEN 1 ELSE 0 END) AS wins,
+            SUM(CASE WHEN r.position <= 3 THEN 1 ELSE 0 END) AS podiums,
+            SUM(CASE
+                WHEN qr.raceId IS NOT NULL THEN
+                    CASE WHEN q.position = 1 THEN 1 ELSE 0 END
+                WHEN r.grid = 1 THEN 1
+                ELSE 0 END) AS poles,
+            SUM(CASE WHEN r.positionText = 'R' THEN 1 ELSE 0 END) AS dnfs,
+            SUM(r.points) AS race_points
+        FROM results r
+        INNER JOIN races ra
+        ON ra.raceId = r.raceId
+        LEFT JOIN (SELECT DISTINCT raceId FROM qualifying) qr
+        ON qr.raceId = r.raceId
+        LEFT JOIN qualifying q
+        ON q.raceId = r.raceId AND q.driverId = r.driverId
+        GROUP BY r.{key}, ra.year"""
+
+
+_CAREER_STATS = [
+    'seasons', 'first_year', 'last_year', 'starts', 'wins', 'podiums', 'poles',
+    'dnfs', 'points', 'championships',
+]
+
+
+def _career_totals(season_table: str, key: str) -> str:
+    return f"""
+        SELECT
+            {key}, COUNT(*), MIN(year), MAX(year), SUM(starts), SUM(wins),
+            SUM(podiums), SUM(poles), SUM(dnfs), SUM(points),
+            SUM(CASE WHEN championship_position = 1 THEN 1 ELSE 0 END)
+        FROM {season_table}
+        GROUP BY {key}"""
+
+
+# Tables derived from the dump, as (name, create statement, populate
+# statement). Both statements work on MySQL and SQLite.
+DERIVED_TABLES: list[tuple[str, str, str]] = [
+    (
+        # The raceId of the last round of every season. The window ranks
+        # each season's races by round and keeps the highest.
+        'season_final_race',
+        """
+        CREATE TABLE season_final_race (
+            year INT NOT NULL PRIMARY KEY,
+            raceId INT NOT NULL
+        )""",
+        """
+        INSERT INTO season_final_race (year, raceId)
+        SELECT year, raceId
+        FROM (
+          SELECT
+            year,
+            raceId,
+            ROW_NUMBER() OVER (PARTITION BY year ORDER BY round DESC) as rnk
+          FROM races) r
+        WHERE r.rnk = 1""",
+    ),
+    (
+        # Per-season totals for every driver, for the career command, see
+        # _season_totals. Points and position are from the final standings,
+        # which account for dropped scores.
+        'driver_season_stats',
+        """
+        CREATE TABLE driver_season_stats (
+            driverId INT NOT NULL,
+            year INT NOT NULL,
+            starts INT NOT NULL,
+            wins INT NOT NULL,
+            podiums INT NOT NULL,
+            poles INT NOT NULL,
+            dnfs INT NOT NULL,
+            points FLOAT NOT NULL,
+            championship_position INT,
+            PRIMARY KEY (driverId, year)
+        )""",
+        f"""
+        INSERT INTO driver_season_stats (
+            driverId, year, starts, wins, podiums, poles, dnfs, points,
+            championship_position)
+        SELECT
+            s.driverId, s.year, s.starts, s.wins, s.podiums, s.poles, s.dnfs,
+            COALESCE(ds.points, s.race_points), ds.position
+        FROM ({_season_totals('driverId')}) s
+        LEFT JOIN season_final_race f
+        ON f.year = s.year
+        LEFT JOIN driverStandings ds
+        ON ds.raceId = f.raceId AND ds.driverId = s.driverId""",
+    ),
+    (
+        'driver_career',
+        """
+        CREATE TABLE driver_career (
+            driverId INT NOT NULL PRIMARY KEY,
+            seasons INT NOT NULL,
+            first_year INT NOT NULL,
+            last_year INT NOT NULL,
+            starts INT NOT NULL,
+            wins INT NOT NULL,
+            podiums INT NOT NULL,
+            poles INT NOT NULL,
+            dnfs INT NOT NULL,
+            points FLOAT NOT NULL,
+            championships INT NOT NULL
+        )""",
+        f"""
+        INSERT INTO driver_career (driverId, {', '.join(_CAREER_STATS)})
+        {_career_totals('driver_season_stats', 'driverId')}""",
+    ),
+    (
+        # Like driver_season_stats, but starts counts races entered rather
+        # than cars, and the championship only exists from 1958.
+        'constructor_season_stats',
+        """
+        CREATE TABLE constructor_season_stats (
+            constructorId INT NOT NULL,
+            year INT NOT NULL,
+            starts INT NOT NULL,
+            wins INT NOT NULL,
+            podiums INT NOT NULL,
+            poles INT NOT NULL,
+            dnfs INT NOT NULL,
+            points FLOAT NOT NULL,
+            championship_position INT,
+            PRIMARY KEY (constructorId, year)
+        )""",
+        f"""
+        INSERT INTO constructor_season_stats (
+            constructorId, year, starts, wins, podiums, poles, dnfs, points,
+            championship_position)
+        SELECT
+            s.constructorId, s.year, s.starts, s.wins, s.podiums, s.poles,
+            s.dnfs, COALESCE(cs.points, s.race_points), cs.position
+        FROM ({_season_totals('constructorId')}) s
+        LEFT JOIN season_final_race f
+        ON f.year = s.year
+        LEFT JOIN constructorStandings cs
+        ON cs.raceId = f.raceId AND cs.constructorId = s.constructorId""",
+    ),
+    (
+        'constructor_career',
+        """
+        CREATE TABLE constructor_career (
+            constructorId INT NOT NULL PRIMARY KEY,
+            seasons INT NOT NULL,
+            first_year INT NOT NULL,
+            last_year INT NOT NULL,
+            starts INT NOT NULL,
+            wins INT NOT NULL,
+            podiums INT NOT NULL,
+            poles INT NOT NULL,
+            dnfs INT NOT NULL,
+            points FLOAT NOT NULL,
+            championships INT NOT NULL
+        )""",
+        f"""
+        INSERT INTO constructor_career (
+            constructorId, {', '.join(_CAREER_STATS)})
+        {_career_totals('constructor_season_stats', 'constructorId')}""",
+    ),
+]
+
+
+def create_index_statements() -> list[str]:
+    return [
+        f'CREATE INDEX idx_{table}_{columns[0]}_covering '
+        f'ON {table} ({", ".join(columns)})'
+        for table, columns in INDEXES
+    ]
+
+
+# Derived tables that are no longer built, dropped by incremental loads.
+# Full loads start from an empty database.
+_DROPPED_TABLES = ['season_rounds']
+
+# Suffixes of the derived tables while they're rebuilt next to the live ones,
+# and of the live ones while they're swapped out.
+STAGING_SUFFIX = '_staging'
+RETIRED_SUFFIX = '_retired'
+
+
+def _with_suffix(statement: str, suffix: str) -> str:
+    """Points statement at the derived tables named with suffix."""
+    for name, _, _ in DERIVED_TABLES:
+        statement = re.sub(rf'\b{name}\b', name + suffix, statement)
+    return statement
+
+
+def derived_table_statements(suffix: str = '') -> list[str]:
+    """Builds the derived tables, named with suffix."""
+    statements = []
+    for name, create, populate in DERIVED_TABLES:
+        statements.extend([
+            f'DROP TABLE IF EXISTS {name}{suffix}',
+            _with_suffix(create, suffix),
+            _with_suffix(populate, suffix),
+        ])
+    return statements
+
+
+def swap_derived_table_statements(
+    backend: str, live_tables: set[str]
+) -> list[str]:
+    """Replaces the live derived tables with the STAGING_SUFFIX ones.
+
+    Queries see either every old table or every new one, never a missing or
+    half-filled one. On MySQL that takes a single RENAME TABLE, since every
+    DDL statement commits on its own. SQLite's DDL is transactional, so there
+    it's atomic as long as the caller runs these in one transaction.
+    """
+    names = [name for name, _, _ in DERIVED_TABLES]
+    dropped = [f'DROP TABLE IF EXISTS {name}' for name in _DROPPED_TABLES]
+    if backend == 'sqlite':
+        return (
+            dropped
+            + [f'DROP TABLE IF EXISTS {name}' for name in names]
+            + [f'ALTER TABLE {name}{STAGING_SUFFIX} RENAME TO {name}'
+               for name in names])
+
+    renames = [
+        f'{name} TO {name}{RETIRED_SUFFIX}'
+        for name in names if name in live_tables
+    ] + [f'{name}{STAGING_SUFFIX} TO {name}' for name in names]
+    return (
+        [f'DROP TABLE IF EXISTS {name}{RETIRED_SUFFIX}' for name in names]
+        + [f'RENAME TABLE {", ".join(renames)}']
+        + [f'DROP TABLE IF EXISTS {name}{RETIRED_SUFFIX}' for name in names]
+        + dropped)
+
+
+def analyze_statements(backend: str) -> list[str]:
+    if backend == 'sqlite':
+        return ['ANALYZE']
+    tables = sorted(
+        {table for table, _ in INDEXES} | {name for name, _, _ in DERIVED_TABLES})
+    return [f'ANALYZE TABLE {", ".join(tables)}']
+
+
+def post_load_statements(backend: str) -> list[str]:
+    """Everything that should run once a fresh dump has been loaded."""
+    return (
+        create_index_statements()
+        + derived_table_statements()
+        + analyze_statements(backend))
@@ -1,51 +1,263 @@
 import requests
 from clint.textui import progress
+import argparse
+import hashlib
+import json
+import sqlite3
+import subprocess
 import tempfile
-import gzip
-import shutil
+import zlib
 import os
 
+from typing import Any, BinaryIO, Iterable, Iterator, Optional
+
+import sqlalchemy as sql # type: ignore
+
+from f1bot.mysql import config, dump, generation, incremental, schema
+
 ergast_sqlite_db_url = 'https://ergast.com/downloads/f1db.sql.gz'
-output_temp_file_name = 'f1db.sql.gz'
-db_file_name = 'f1db.sql'
 db_name = 'ergast'
 
-def get_length(r: requests.Response) -> int:
+# The new dump is loaded here and only swapped into db_name once it's complete.
+staging_db_name = 'ergast_staging'
+
+# The old tables are moved here during the swap and then dropped.
+retired_db_name = 'ergast_retired'
+
+# Remembers what was last loaded so unchanged dumps can be skipped.
+refresh_state_file = '.ergast-refresh.json'
+
+# Large reads keep the number of Python-level iterations (and syscalls) down.
+chunk_size = 1024 * 1024
+
+def get_length(r: requests.Response) -> Optional[int]:
     header_val = r.headers.get('content-length')
     if header_val is None:
-        raise ValueError('Request did not have a "content-length" header.')
+        return None
     return int(header_val)
 
 
-def download_zipped(file_name: str):
-    r = requests.get(ergast_sqlite_db_url, stream=True)
-    with open(file_name, 'wb') as f:
-        total_length = get_length(r)
-        for chunk in progress.bar(r.iter_content(chunk_size=1024), expected_size=(total_length/1024) + 1):
-            f.write(chunk)
-            f.flush()
+def load_refresh_state() -> dict[str, Any]:
+    if not os.path.exists(refresh_state_file):
+        return {}
+    with open(refresh_state_file) as f:
+        return json.load(f)
+
+
+def save_refresh_state(state: dict[str, Any]):
+    tmp_path = f'{refresh_state_file}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, refresh_state_file)
+
+
+def conditional_headers(state: dict[str, Any]) -> dict[str, str]:
+    """Headers asking the server to skip the body if it hasn't changed."""
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+    return headers
+
+
+def download(r: requests.Response, out: BinaryIO) -> str:
+    """Writes the compressed dump to out.
+
+    Returns:
+        The dump's sha256, so an unchanged dump can be skipped before loading.
+    """
+    total_length = get_length(r)
+    bar = progress.Bar(
+        expected_size=(total_length // chunk_size) + 1 if total_length else None)
+    checksum = hashlib.sha256()
+    downloaded = 0
+    for chunk in r.iter_content(chunk_size=chunk_size):
+        downloaded += len(chunk)
+        checksum.update(chunk)
+        out.write(chunk)
+        bar.show(downloaded // chunk_size)
+    bar.done()
+    out.seek(0)
+    return checksum.hexdigest()
+
+
+def stream_dump(compressed: BinaryIO) -> Iterator[bytes]:
+    """Yields the decompressed dump."""
+    # 16 + MAX_WBITS tells zlib to expect a gzip header.
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    while True:
+        chunk = compressed.read(chunk_size)
+        if not chunk:
+            break
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
 
 
-def unzip(src: str, dst: str):
-    with gzip.open(src, 'rb') as f_in:
-        with open(dst, 'wb') as f_out:
-            shutil.copyfileobj(f_in, f_out)
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Splits a stream of bytes into decoded lines."""
+    remainder = b''
+    for chunk in chunks:
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8')
+    if remainder:
+        yield remainder.decode('utf-8')
 
 
-def replace_mysql_db(db_path: str):
-    os.system(f"echo 'drop database {db_name}; create database {db_name};' | mysql -u root")
-    os.system(f"mysql -u root {db_name} < {db_path}")
+def run_mysql(statements: str, database: Optional[str] = None) -> str:
+    """Runs statements with the mysql client and returns its output."""
+    command = ['mysql', '-u', 'root', '--batch', '--skip-column-names']
+    if database is not None:
+        command.append(database)
+    return subprocess.run(
+        command, input=statements, text=True, capture_output=True, check=True
+    ).stdout
 
-    # clean up unzipped db file.
-    os.remove(db_file_name)
+
+def list_tables(database: str) -> list[str]:
+    return run_mysql('SHOW TABLES;', database).split()
+
+
+def replace_mysql_db(dump_stream: Iterable[bytes]):
+    """Loads the dump into a staging database and swaps it in atomically."""
+    run_mysql(
+        f'DROP DATABASE IF EXISTS {staging_db_name}; '
+        f'CREATE DATABASE {staging_db_name}; '
+        f'CREATE DATABASE IF NOT EXISTS {db_name};')
+
+    loader = subprocess.Popen(
+        ['mysql', '-u', 'root', staging_db_name], stdin=subprocess.PIPE)
+    assert loader.stdin is not None
+    try:
+        for chunk in dump_stream:
+            loader.stdin.write(chunk)
+    finally:
+        loader.stdin.close()
+    if loader.wait() != 0:
+        raise RuntimeError(
+            f'Loading the dump into {staging_db_name} failed. '
+            f'{db_name} was left untouched.')
+
+    run_mysql(
+        ';\n'.join(schema.post_load_statements('mysql')) + ';\n',
+        staging_db_name)
+
+    # A single RENAME TABLE statement is atomic, so queries see either the
+    # complete old database or the complete new one.
+    renames = [
+        f'{db_name}.{table} TO {retired_db_name}.{table}'
+        for table in list_tables(db_name)
+    ] + [
+        f'{staging_db_name}.{table} TO {db_name}.{table}'
+        for table in list_tables(staging_db_name)
+    ]
+    run_mysql(
+        f'DROP DATABASE IF EXISTS {retired_db_name}; '
+        f'CREATE DATABASE {retired_db_name}; '
+        f'RENAME TABLE {", ".join(renames)}; '
+        f'DROP DATABASE {retired_db_name}; '
+        f'DROP DATABASE {staging_db_name};')
+
+
+def replace_sqlite_db(dump_stream: Iterable[bytes], sqlite_path: str):
+    """Converts the dump into a SQLite database at sqlite_path.
+
+    The database is built next to the old one and moved into place once it's
+    complete, so the bot never sees a half-loaded file.
+    """
+    staging_path = f'{sqlite_path}.staging'
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+
+    conn = sqlite3.connect(staging_path)
+    try:
+        dump.load_into_sqlite(iter_lines(dump_stream), conn)
+        for statement in schema.post_load_statements('sqlite'):
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(staging_path, sqlite_path)
+
+
+def update_db(dump_stream: Iterable[bytes], url: str) -> bool:
+    """Inserts only the rows the live database is missing.
+
+    Returns:
+        Whether anything changed.
+    """
+    engine = sql.create_engine(url)
+    with engine.begin() as conn:
+        inserted = incremental.apply_new_rows(iter_lines(dump_stream), conn)
+    for table, count in sorted(inserted.items()):
+        print(f'Inserted {count} rows into {table}.')
+    return len(inserted) > 0
 
 
 def main():
-    tmp = tempfile.NamedTemporaryFile()
-    download_zipped(tmp.name)
-    unzip(tmp.name, db_file_name)
-    replace_mysql_db(db_file_name)
+    parser = argparse.ArgumentParser(
+        description='Downloads the ergast database dump and loads it.')
+    parser.add_argument(
+        '--backend', choices=['mysql', 'sqlite'], default=config.BACKEND)
+    parser.add_argument(
+        '--sqlite-path', default=config.SQLITE_PATH,
+        help='Where to write the database when using the sqlite backend.')
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help=(
+            'Only insert rows for races (and drivers, teams, etc.) the '
+            'database doesn\'t have yet, instead of reloading everything.'))
+    parser.add_argument(
+        '--force', action='store_true',
+        help='Reload even if the dump hasn\'t changed since the last run.')
+    args = parser.parse_args()
+
+    state = {} if args.force else load_refresh_state()
+    with tempfile.TemporaryFile() as compressed:
+        with requests.get(
+            ergast_sqlite_db_url, stream=True,
+            headers=conditional_headers(state),
+        ) as r:
+            if r.status_code == requests.codes.not_modified:
+                print('The ergast dump hasn\'t changed since the last refresh.')
+                return
+            r.raise_for_status()
+            new_state = {
+                'etag': r.headers.get('etag'),
+                'last_modified': r.headers.get('last-modified'),
+                'sha256': download(r, compressed),
+            }
+
+        # Servers don't always honor conditional requests, so also compare
+        # against what we loaded last time before loading anything.
+        if new_state['sha256'] == state.get('sha256'):
+            print('The ergast dump hasn\'t changed since the last refresh.')
+            save_refresh_state(new_state)
+            return
+
+        dump_stream = stream_dump(compressed)
+        changed = True
+        if args.incremental:
+            url = (
+                config.sqlite_admin_url(args.sqlite_path)
+                if args.backend == 'sqlite' else config.mysql_admin_url())
+            changed = update_db(dump_stream, url)
+        elif args.backend == 'sqlite':
+            replace_sqlite_db(dump_stream, args.sqlite_path)
+        else:
+            replace_mysql_db(dump_stream)
 
+    save_refresh_state(new_state)
+    if changed:
+        # Tell running bots that anything cached from the old database is
+        # stale.
+        generation.bump()
 
 if __name__ == '__main__':
     main()